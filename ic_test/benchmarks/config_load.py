@@ -0,0 +1,107 @@
+"""Benchmark for register-map / pin-map loading and test collection.
+
+    python -m ic_test.benchmarks.config_load [--scale X]
+
+``yaml_parse`` and ``lookup_uncompiled`` time the uncached path (a full
+PyYAML parse, base + offset per access) for comparison with the cached
+loaders and the compiled address table.
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+from ..utils import reg_parser
+from ..utils.reg_parser import load_gpio_regs, load_pin_map
+
+_CONFIG_DIR = Path(__file__).resolve().parents[1] / "config"
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+_GPIO_YAML = _CONFIG_DIR / "regs" / "gpio.yaml"
+_PIN_MAP_YAML = _CONFIG_DIR / "pin_map.yaml"
+
+
+def _per_call(func, n: int) -> float:
+    """Microseconds per call."""
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def bench_yaml_parse(n: int) -> float:
+    """Parse both YAML files with yaml.safe_load, as every load did before caching."""
+    def run():
+        for path in (_GPIO_YAML, _PIN_MAP_YAML):
+            with open(path, "r", encoding="utf-8") as f:
+                yaml.safe_load(f)
+    return _per_call(run, n)
+
+
+def bench_disk_cache(n: int) -> float:
+    """Load both files from the on-disk pickle (new process, unchanged files)."""
+    load_gpio_regs(_GPIO_YAML), load_pin_map(_PIN_MAP_YAML)  # make sure it exists
+
+    def run():
+        reg_parser._loaded.clear()
+        load_gpio_regs(_GPIO_YAML)
+        load_pin_map(_PIN_MAP_YAML)
+    return _per_call(run, n)
+
+
+def bench_memory_cache(n: int) -> float:
+    """Load both files again in the same process (stat + dict lookup)."""
+    def run():
+        load_gpio_regs(_GPIO_YAML)
+        load_pin_map(_PIN_MAP_YAML)
+    return _per_call(run, n)
+
+
+def bench_lookup_uncompiled(n: int) -> float:
+    """Register address as base + offset from the port and register dicts."""
+    reg_map = load_gpio_regs(_GPIO_YAML)
+    ports, registers = reg_map.ports, reg_map.registers
+    return _per_call(lambda: ports["GPIOB"].base_addr + registers["ODR"].offset, n)
+
+
+def bench_get_reg_addr(n: int) -> float:
+    """Register address from the compiled table."""
+    reg_map = load_gpio_regs(_GPIO_YAML)
+    return _per_call(lambda: reg_map.get_reg_addr("GPIOB", "ODR"), n)
+
+
+def bench_collection(n: int) -> float:
+    """Wall time of ``pytest --collect-only`` on the mock suite, in ms."""
+    cmd = [sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider",
+           f"--rootdir={_PROJECT_ROOT}", "ic_test/tests", "--use-mock"]
+    best = float("inf")
+    for _ in range(n):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=_PROJECT_ROOT, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+BENCHMARKS = {
+    "yaml_parse": (bench_yaml_parse, "us/load", 50),
+    "disk_cache": (bench_disk_cache, "us/load", 500),
+    "memory_cache": (bench_memory_cache, "us/load", 10_000),
+    "lookup_uncompiled": (bench_lookup_uncompiled, "us/access", 1_000_000),
+    "get_reg_addr": (bench_get_reg_addr, "us/access", 1_000_000),
+    "collection": (bench_collection, "ms (best)", 3),
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Config loading and collection cost")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every benchmark's iteration count")
+    args = parser.parse_args(argv)
+    for name, (func, unit, n) in BENCHMARKS.items():
+        print(f"{name:18s} {func(max(1, int(n * args.scale))):12.3f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
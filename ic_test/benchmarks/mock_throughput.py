@@ -0,0 +1,147 @@
+"""Throughput benchmark for the MockJtagImpl simulation core.
+
+    python -m ic_test.benchmarks.mock_throughput [--ops N]
+"""
+import argparse
+import time
+from pathlib import Path
+
+from ..drivers.jtag_impl import MockBoard, MockJtagImpl
+from ..utils.gpio_helper import GpioHelper
+from ..utils.reg_parser import load_gpio_regs, load_pin_map
+
+_CONFIG_DIR = Path(__file__).resolve().parents[1] / "config"
+
+_GPIOA = 0x40020000
+_MODER = _GPIOA + 0x00
+_IDR = _GPIOA + 0x10
+_ODR = _GPIOA + 0x14
+_EXTI_BASE = 0x40013C00
+_SRAM = 0x20000000
+_MEM_BLOCK = 64 * 1024
+
+
+def _pair():
+    a = MockJtagImpl("BENCH-A", name="MCU-A")
+    b = MockJtagImpl("BENCH-B", name="MCU-B")
+    a.set_peer(b)
+    return a, b
+
+
+def _rate(func, n: int) -> float:
+    start = time.perf_counter()
+    func(n)
+    return n / (time.perf_counter() - start)
+
+
+def bench_reg_rw(n: int) -> float:
+    """Plain register write + read pairs per second."""
+    a, _ = _pair()
+
+    def run(count):
+        for i in range(count):
+            a.reg_write(_MODER, i)
+            a.reg_read(_MODER)
+    return _rate(run, n)
+
+
+def bench_idr(n: int) -> float:
+    """IDR resolutions per second with a peer driving half the port."""
+    a, b = _pair()
+    b.reg_write(_MODER, 0x55555555 & 0x0000FFFF)
+    b.reg_write(_ODR, 0xA5)
+    a.reg_write(_GPIOA + 0x0C, 0x55550000)
+
+    def run(count):
+        for _ in range(count):
+            a.reg_read(_IDR)
+    return _rate(run, n)
+
+
+def bench_exti(n: int) -> float:
+    """ODR toggles per second propagating edges to the peer's EXTI."""
+    a, b = _pair()
+    b.reg_write(_EXTI_BASE + 0x00, 0xFFFF)
+    b.reg_write(_EXTI_BASE + 0x08, 0xFFFF)
+    b.reg_write(_EXTI_BASE + 0x0C, 0xFFFF)
+
+    def run(count):
+        for i in range(count):
+            a.reg_write(_ODR, 0xFFFF if i & 1 else 0)
+    return _rate(run, n)
+
+
+def bench_board(n: int) -> float:
+    """IDR reads per second on an 8-chip board: every pin on a net shared
+    by all chips, wired to the mirrored pin (15 - n) of the next port."""
+    chips = [MockJtagImpl(f"BENCH-{i}", name=f"MCU-{i}") for i in range(8)]
+    nets = [[(i, _GPIOA + 0x400 * ((port + i) % 3), pin if i % 2 else 15 - pin)
+             for i in range(len(chips))]
+            for port in range(3) for pin in range(16)]
+    MockBoard(chips, nets)
+    chips[1].reg_write(_MODER, 0x55555555)
+    chips[1].reg_write(_GPIOA + 0x400 + 0x14, 0x1234)
+    reader = chips[0]
+
+    def run(count):
+        for i in range(count):
+            reader.reg_read(_IDR + 0x400 * (i % 3))
+    return _rate(run, n)
+
+
+def bench_sessions(n: int) -> float:
+    """Mock sessions per second: G-01 (output high) over every pin pair."""
+    reg_map = load_gpio_regs(_CONFIG_DIR / "regs" / "gpio.yaml")
+    pairs = load_pin_map(_CONFIG_DIR / "pin_map.yaml").pin_pairs
+
+    def run(count):
+        for _ in range(count):
+            a, b = _pair()
+            gpio_a, gpio_b = GpioHelper(a, reg_map), GpioHelper(b, reg_map)
+            for pp in pairs:
+                gpio_a.reset_pin(pp.mcu_a_port, pp.mcu_a_pin)
+                gpio_b.reset_pin(pp.mcu_b_port, pp.mcu_b_pin)
+                gpio_a.set_mode(pp.mcu_a_port, pp.mcu_a_pin, GpioHelper.MODE_INPUT)
+                gpio_b.set_mode(pp.mcu_b_port, pp.mcu_b_pin, GpioHelper.MODE_OUTPUT)
+                gpio_b.write_pin(pp.mcu_b_port, pp.mcu_b_pin, 1)
+                assert gpio_a.read_pin(pp.mcu_a_port, pp.mcu_a_pin) == 1
+    return _rate(run, n)
+
+
+def bench_mem(n: int) -> float:
+    """Mock memory bandwidth in MB/s: a 64 KiB write, read and readinto per op."""
+    a, _ = _pair()
+    block = bytes(range(256)) * (_MEM_BLOCK // 256)
+    buf = bytearray(_MEM_BLOCK)
+
+    def run(count):
+        for i in range(count):
+            addr = _SRAM + (i % 16) * _MEM_BLOCK + 3  # deliberately unaligned
+            a.mem_write(addr, block)
+            a.mem_read(addr, _MEM_BLOCK)
+            a.mem_readinto(addr, buf)
+    return _rate(run, n) * 3 * _MEM_BLOCK / 1e6
+
+
+BENCHMARKS = {
+    "reg_rw": (bench_reg_rw, "write+read/s"),
+    "idr": (bench_idr, "IDR reads/s"),
+    "exti": (bench_exti, "ODR edges/s"),
+    "board": (bench_board, "IDR reads/s"),
+    "sessions": (bench_sessions, "sessions/s"),
+    "mem": (bench_mem, "MB/s"),
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="MockJtagImpl throughput")
+    parser.add_argument("--ops", type=int, default=100_000,
+                        help="Operations per micro-benchmark")
+    args = parser.parse_args(argv)
+    for name, (func, unit) in BENCHMARKS.items():
+        n = max(1, args.ops // 1000) if name in ("sessions", "mem") else args.ops
+        print(f"{name:10s} {func(n):14,.0f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
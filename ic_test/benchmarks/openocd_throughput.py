@@ -0,0 +1,94 @@
+"""Throughput of the OpenOCD TCL RPC backend against the local stand-in.
+
+    python -m ic_test.benchmarks.openocd_throughput [--ops N] [--latency S]
+
+``--latency`` delays each server answer to model a probe behind USB or a
+network; the gap between ``reg_rw`` and ``batched`` is then the saving of
+pipelining a transaction into one round trip.
+"""
+import argparse
+import os
+import time
+
+from ..drivers.jtag_impl import MockJtagImpl
+from ..drivers.openocd import OpenOcdJtagImpl
+from ..drivers.openocd_standin import OpenOcdStandIn
+
+_ODR = 0x40020014
+_SRAM = 0x20000000
+_MEM_BLOCK = 256 * 1024
+
+
+def _rate(func, n: int) -> float:
+    start = time.perf_counter()
+    func(n)
+    return n / (time.perf_counter() - start)
+
+
+def bench_reg_rw(chip: OpenOcdJtagImpl, n: int) -> float:
+    """Register write + read pairs per second, one round trip each."""
+    def run(count):
+        for i in range(count):
+            chip.reg_write(_ODR, i)
+            chip.reg_read(_ODR)
+    return _rate(run, n)
+
+
+def bench_batched(chip: OpenOcdJtagImpl, n: int) -> float:
+    """Register write + read pairs per second, queued in one transaction."""
+    def run(count):
+        with chip.transaction() as tx:
+            for i in range(count):
+                tx.reg_write(_ODR, i)
+                tx.reg_read(_ODR)
+    return _rate(run, n)
+
+
+def bench_mem(chip: OpenOcdJtagImpl, n: int) -> float:
+    """Memory bandwidth in MB/s: a 256 KiB write and read back per op."""
+    block = os.urandom(_MEM_BLOCK)
+
+    def run(count):
+        for _ in range(count):
+            chip.mem_write(_SRAM, block)
+            chip.mem_read(_SRAM, _MEM_BLOCK)
+    return _rate(run, n) * 2 * _MEM_BLOCK / 1e6
+
+
+def bench_reconnect(chip: OpenOcdJtagImpl, server: OpenOcdStandIn, n: int) -> float:
+    """Accesses per second when the server drops the connection before each one."""
+    def run(count):
+        for _ in range(count):
+            server.drop_connections()
+            chip.reg_read(_ODR)
+    return _rate(run, n)
+
+
+BENCHMARKS = {
+    "reg_rw": (bench_reg_rw, "write+read/s"),
+    "batched": (bench_batched, "write+read/s"),
+    "mem": (bench_mem, "MB/s"),
+    "reconnect": (bench_reconnect, "reads/s"),
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="OpenOCD backend throughput (stand-in server)")
+    parser.add_argument("--ops", type=int, default=10_000,
+                        help="Operations per micro-benchmark")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds the server waits before each answer")
+    args = parser.parse_args(argv)
+    with OpenOcdStandIn(MockJtagImpl("BENCH", name="MCU-A"), latency=args.latency) as server:
+        chip = OpenOcdJtagImpl("BENCH", name="MCU-A", address=server.address)
+        for name, (func, unit) in BENCHMARKS.items():
+            n = max(1, args.ops // 1000) if name in ("mem", "reconnect") else args.ops
+            if args.latency and name == "reg_rw":
+                n = max(1, min(n, int(1 / args.latency)))
+            extra = (server,) if name == "reconnect" else ()
+            print(f"{name:10s} {func(chip, *extra, n):14,.0f} {unit}")
+        chip.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""Framework benchmark suite with a stored baseline and a regression gate.
+
+    python -m ic_test.benchmarks.suite run [--out FILE] [--scale X] [--repeat N]
+    python -m ic_test.benchmarks.suite compare BASELINE [--current FILE] [--threshold T]
+
+``run`` measures the framework hot paths on the mock and writes them to a
+JSON file (``baseline.json`` next to this module by default).  ``compare``
+measures again (or reads ``--current``) and exits with status 1 when any
+metric is worse than the baseline by more than its threshold.  Each
+metric is the best of ``--repeat`` runs, to keep scheduler noise out of
+the gate.  Everything runs offline; baselines are only comparable on the
+same machine.  The micro-benchmarks of ``config_load`` and
+``openocd_throughput`` (against a local stand-in server) are gated too.
+``compare`` exits with status 2 when a result file does not exist.
+"""
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, NamedTuple
+
+from ..drivers.jtag_impl import MockJtagImpl
+from ..drivers.openocd import OpenOcdJtagImpl
+from ..drivers.openocd_standin import OpenOcdStandIn
+from ..utils import reg_parser
+from ..utils.report import CsvReportPlugin
+from . import config_load, mock_throughput, openocd_throughput
+
+_CONFIG_DIR = Path(__file__).resolve().parents[1] / "config"
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+_DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+_FORMAT_VERSION = 1
+
+
+class Metric(NamedTuple):
+    func: Callable[[int], float]
+    n: int                  # iterations at --scale 1
+    unit: str
+    higher_is_better: bool
+    threshold: float        # allowed relative regression
+
+
+def _per_call_us(func, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def _cold_load(loader, name: str, n: int) -> float:
+    """Microseconds per load of config/*name* with both caches cold: YAML
+    parse, dataclass build and cache write."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / Path(name).name
+        shutil.copyfile(_CONFIG_DIR / name, path)
+        cache_dir = path.parent / "__pycache__"
+
+        def run():
+            reg_parser._loaded.clear()
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            loader(path)
+        result = _per_call_us(run, n)
+    reg_parser._loaded.clear()
+    return result
+
+
+def bench_load_gpio_regs(n: int) -> float:
+    return _cold_load(reg_parser.load_gpio_regs, "regs/gpio.yaml", n)
+
+
+def bench_load_pin_map(n: int) -> float:
+    return _cold_load(reg_parser.load_pin_map, "pin_map.yaml", n)
+
+
+def bench_get_reg_addr(n: int) -> float:
+    """Nanoseconds per lookup in the compiled address table."""
+    return config_load.bench_get_reg_addr(n) * 1e3
+
+
+def _openocd(bench, with_server: bool = False) -> Callable[[int], float]:
+    """*bench* from openocd_throughput, run against a fresh local stand-in."""
+    def run(n: int) -> float:
+        with OpenOcdStandIn(MockJtagImpl("BENCH", name="MCU-A")) as server:
+            chip = OpenOcdJtagImpl("BENCH", name="MCU-A", address=server.address)
+            try:
+                return bench(chip, *((server,) if with_server else ()), n)
+            finally:
+                chip.close()
+    return run
+
+
+def _pytest_ms(args: list[str], n: int) -> float:
+    """Best wall time of a pytest subprocess, in ms."""
+    cmd = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider",
+           f"--rootdir={_PROJECT_ROOT}", "--use-mock", *args]
+    best = float("inf")
+    for _ in range(n):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=_PROJECT_ROOT, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def bench_collect_gpio(n: int) -> float:
+    """``pytest --collect-only`` of test_gpio.py, in ms."""
+    return _pytest_ms(["--collect-only", "ic_test/tests/test_gpio.py"], n)
+
+
+def bench_mock_suite(n: int) -> float:
+    """The whole mock suite, in ms."""
+    return _pytest_ms(["ic_test"], n)
+
+
+def bench_csv_rows(n: int) -> float:
+    """Rows per second through CsvReportPlugin's makereport hook and
+    writer thread, with the --jtag-stats columns."""
+    props = (("chip", "MCU-B"), ("pin", "MCU-B-PA0"), ("test_id", "G-01"),
+             ("test_name", "output_high"), ("expected", "1"), ("actual", "1"),
+             ("jtag_execute_ops", 2), ("jtag_batched_ops", 6), ("jtag_time_ns", 81234))
+    item = SimpleNamespace(user_properties=list(props))
+    outcome = SimpleNamespace(get_result=lambda: SimpleNamespace(when="call", passed=True))
+    with tempfile.TemporaryDirectory() as tmp:
+        plugin = CsvReportPlugin(str(Path(tmp) / "bench.csv"),
+                                 extra_fields=[key for key, _ in props[6:]])
+        start = time.perf_counter()
+        for _ in range(n):
+            hook = plugin.pytest_runtest_makereport(item, None)
+            next(hook)
+            try:
+                hook.send(outcome)
+            except StopIteration:
+                pass
+        plugin.pytest_sessionfinish(None, 0)
+        elapsed = time.perf_counter() - start
+    return plugin.rows_written / elapsed
+
+
+METRICS = {
+    "mock_reg_rw": Metric(mock_throughput.bench_reg_rw, 100_000, "write+read/s", True, 0.15),
+    "mock_idr": Metric(mock_throughput.bench_idr, 100_000, "IDR reads/s", True, 0.15),
+    "mock_exti": Metric(mock_throughput.bench_exti, 100_000, "ODR edges/s", True, 0.15),
+    "mock_mem": Metric(mock_throughput.bench_mem, 100, "MB/s", True, 0.15),
+    "load_gpio_regs": Metric(bench_load_gpio_regs, 50, "us/load", False, 0.20),
+    "load_pin_map": Metric(bench_load_pin_map, 50, "us/load", False, 0.20),
+    "load_disk_cache": Metric(config_load.bench_disk_cache, 500, "us/load", False, 0.20),
+    "load_mem_cache": Metric(config_load.bench_memory_cache, 10_000, "us/load", False, 0.20),
+    "get_reg_addr": Metric(bench_get_reg_addr, 500_000, "ns/access", False, 0.20),
+    "openocd_reg_rw": Metric(_openocd(openocd_throughput.bench_reg_rw), 5_000,
+                             "write+read/s", True, 0.25),
+    "openocd_batched": Metric(_openocd(openocd_throughput.bench_batched), 20_000,
+                              "write+read/s", True, 0.25),
+    "openocd_mem": Metric(_openocd(openocd_throughput.bench_mem), 5, "MB/s", True, 0.25),
+    "openocd_reconnect": Metric(_openocd(openocd_throughput.bench_reconnect, with_server=True),
+                                500, "reads/s", True, 0.25),
+    "collect_gpio": Metric(bench_collect_gpio, 3, "ms", False, 0.25),
+    "mock_suite": Metric(bench_mock_suite, 1, "ms", False, 0.25),
+    "csv_rows": Metric(bench_csv_rows, 20_000, "rows/s", True, 0.20),
+}
+
+
+def measure(names=None, scale: float = 1.0, repeat: int = 3, progress=None) -> dict:
+    """Run the selected metrics; return the JSON-ready result document."""
+    results = {}
+    for name in names or METRICS:
+        metric = METRICS[name]
+        n = max(1, int(metric.n * scale))
+        values = [metric.func(n) for _ in range(repeat)]
+        value = max(values) if metric.higher_is_better else min(values)
+        results[name] = {"value": value, "unit": metric.unit,
+                         "higher_is_better": metric.higher_is_better}
+        if progress is not None:
+            progress(f"{name:18s} {value:14,.1f} {metric.unit}")
+    return {
+        "version": _FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "scale": scale,
+        "metrics": results,
+    }
+
+
+def load(path: str | Path) -> dict:
+    doc = json.loads(Path(path).read_text(encoding="utf-8"))
+    if doc.get("version") != _FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported benchmark file version")
+    return doc
+
+
+def regression(baseline: dict, current: dict) -> float:
+    """Relative slowdown of *current* against *baseline* for one metric
+    (positive is worse, -0.1 is 10 % better)."""
+    base, cur = baseline["value"], current["value"]
+    if baseline["higher_is_better"]:
+        return (base - cur) / base
+    return (cur - base) / base
+
+
+def compare(baseline: dict, current: dict, threshold: float | None = None) -> list[tuple]:
+    """Rows (metric, baseline, current, slowdown, status) for every metric
+    in either document; status is ``ok``, ``REGRESSED``, ``new`` or
+    ``missing``.  *threshold* overrides the per-metric thresholds."""
+    rows = []
+    base_metrics, cur_metrics = baseline["metrics"], current["metrics"]
+    for name in dict.fromkeys([*base_metrics, *cur_metrics]):
+        base, cur = base_metrics.get(name), cur_metrics.get(name)
+        if base is None or cur is None:
+            rows.append((name, base, cur, None, "new" if base is None else "missing"))
+            continue
+        limit = threshold if threshold is not None else \
+            METRICS[name].threshold if name in METRICS else 0.15
+        slowdown = regression(base, cur)
+        rows.append((name, base, cur, slowdown, "REGRESSED" if slowdown > limit else "ok"))
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Framework benchmarks with a regression gate")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("run", "compare"):
+        p = sub.add_parser(name)
+        p.add_argument("--scale", type=float, default=None,
+                       help="Multiply every metric's iteration count "
+                            "(compare: default the baseline's)")
+        p.add_argument("--repeat", type=int, default=3, help="Runs per metric; the best counts")
+        p.add_argument("--only", action="append", choices=list(METRICS),
+                       help="Measure only this metric (repeatable)")
+    sub.choices["run"].add_argument("--out", default=str(_DEFAULT_BASELINE),
+                                    help="JSON file to write")
+    sub.choices["compare"].add_argument("baseline", nargs="?", default=str(_DEFAULT_BASELINE))
+    sub.choices["compare"].add_argument("--current", default=None,
+                                        help="Compare this result file instead of measuring")
+    sub.choices["compare"].add_argument("--threshold", type=float, default=None,
+                                        help="Allowed relative regression for every metric "
+                                             "(default: per metric, 0.15 - 0.25)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        doc = measure(args.only, args.scale or 1.0, args.repeat, progress=print)
+        Path(args.out).write_text(json.dumps(doc, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote {args.out}")
+        return 0
+
+    try:
+        baseline = load(args.baseline)
+        current = load(args.current) if args.current else None
+    except FileNotFoundError as exc:
+        print(f"{exc.filename}: no such benchmark file; "
+              f"run `python -m ic_test.benchmarks.suite run` first", file=sys.stderr)
+        return 2
+    if current is None:
+        names = args.only or [n for n in baseline["metrics"] if n in METRICS]
+        current = measure(names, args.scale or baseline.get("scale", 1.0), args.repeat)
+    if args.only:
+        baseline, current = ({**doc, "metrics": {n: v for n, v in doc["metrics"].items()
+                                                 if n in args.only}}
+                             for doc in (baseline, current))
+    failed = False
+    print(f"{'metric':18s} {'baseline':>14s} {'current':>14s} {'unit':14s} {'change':>7s}")
+    for name, base, cur, slowdown, status in compare(baseline, current, args.threshold):
+        unit = (base or cur)["unit"]
+        base_s = f"{base['value']:14,.1f}" if base else f"{'-':>14s}"
+        cur_s = f"{cur['value']:14,.1f}" if cur else f"{'-':>14s}"
+        change = f"{0.0 - slowdown:+7.1%}" if slowdown is not None else f"{'':>7s}"
+        print(f"{name:18s} {base_s} {cur_s} {unit:14s} {change}  {status}")
+        failed |= status == "REGRESSED"
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,73 @@
+import asyncio
 from pathlib import Path
 
 import pytest
 
-from .drivers.jtag_impl import JtagImpl, MockJtagImpl
-from .utils.reg_parser import load_gpio_regs, load_pin_map
+from .drivers.async_chip import ExecutorChip
+from .drivers.dual_chip import DualChipExecutor
+from .drivers.instrumented import OPS, PROPERTY_NAMES, InstrumentedChip
+from .drivers.chip_interface import JtagError
+from .drivers.jtag_impl import FaultyJtagImpl, JtagImpl, MockBoard, MockJtagImpl, RetryBudget
+from .drivers.openocd import OpenOcdJtagImpl
+from .drivers.openocd_standin import OpenOcdStandIn
+from .drivers.profiling import ProfilingChip
+from .drivers.shadow_regs import ShadowRegChip
+from .drivers.trace import RecordingChip, ReplayChipInterface, trace_path
+from .drivers.write_tracker import WriteTracker
+from .utils.reg_coverage import mock_specs, synthetic_table
+from .utils.reg_parser import load_gpio_regs, load_pin_map, load_reg_table, load_result_regions
 from .utils.gpio_helper import GpioHelper
+from .utils.gpio_vectors import VectorEngine
+from .utils.ordering import GpioOrderPlugin
+from .utils.profiler import JtagProfiler
+from .utils.farm import DurationRecorder
 from .utils.report import CsvReportPlugin
+from .utils.results_db import ResultsDbPlugin
+from .utils.stability import StabilityMonitor
 
 _CONFIG_DIR = Path(__file__).parent / "config"
+_GPIO_REGS = _CONFIG_DIR / "regs" / "gpio.yaml"
+
+_shadow_chips_key = pytest.StashKey[list]()
+_reg_tables_key = pytest.StashKey[list]()
+_instrumented_key = pytest.StashKey[list]()
+_jtag_tests_key = pytest.StashKey[list]()
+_probes_key = pytest.StashKey[list]()
+_mocks_key = pytest.StashKey[list]()
+_replays_key = pytest.StashKey[list]()
+_retry_budget_key = pytest.StashKey[RetryBudget]()
+_profiler_key = pytest.StashKey[JtagProfiler]()
+_setup_error_key = pytest.StashKey[JtagError]()
 
 
 def pytest_configure(config):
     csv_path = config.getoption("--csv-report", default=None)
     if csv_path:
-        plugin = CsvReportPlugin(csv_path)
+        # pytest-xdist: workers write their own part, the controller merges them
+        worker_id = getattr(config, "workerinput", {}).get("workerid")
+        plugin = CsvReportPlugin(
+            csv_path,
+            append=config.getoption("--csv-append"),
+            worker_id=worker_id,
+            merge_workers=worker_id is None and bool(getattr(config.option, "numprocesses", None)),
+            extra_fields=PROPERTY_NAMES if config.getoption("--jtag-stats") else None,
+        )
         config.pluginmanager.register(plugin, "csv_report")
+    db_path = config.getoption("--results-db", default=None)
+    if db_path and not hasattr(config, "workerinput"):
+        config.pluginmanager.register(ResultsDbPlugin(db_path), "results_db")
+    durations_path = config.getoption("--durations-out", default=None)
+    if durations_path:
+        config.pluginmanager.register(DurationRecorder(durations_path), "duration_recorder")
+    config.pluginmanager.register(
+        GpioOrderPlugin(_GPIO_REGS, keep_order=config.getoption("--keep-order", default=False)),
+        "gpio_order")
+    profile_dir = config.getoption("--profile-jtag", default=None)
+    if profile_dir:
+        worker_id = getattr(config, "workerinput", {}).get("workerid")
+        profiler = JtagProfiler(Path(profile_dir) / worker_id if worker_id else profile_dir)
+        config.pluginmanager.register(profiler, "jtag_profiler")
+        config.stash[_profiler_key] = profiler
 
 
 def pytest_addoption(parser):
@@ -24,38 +77,323 @@ def pytest_addoption(parser):
                      help="JTAG probe ID for MCU-A")
     parser.addoption("--jtag-b", default="FT232H-B",
                      help="JTAG probe ID for MCU-B")
+    parser.addoption("--openocd-a", default=None, metavar="HOST[:PORT]",
+                     help="Drive MCU-A through the OpenOCD TCL RPC server at this address")
+    parser.addoption("--openocd-b", default=None, metavar="HOST[:PORT]",
+                     help="Drive MCU-B through the OpenOCD TCL RPC server at this address")
+    parser.addoption("--openocd-standin", action="store_true", default=False,
+                     help="Run the OpenOCD backend against local stand-in servers backed by mock chips")
     parser.addoption("--csv-report", default=None,
                      help="Path to CSV report output file")
+    parser.addoption("--csv-append", action="store_true", default=False,
+                     help="Append to an existing CSV report (e.g. to resume after a crash)")
+    parser.addoption("--results-db", default=None,
+                     help="SQLite results store to record this run into")
+    parser.addoption("--pin-map", default=str(_CONFIG_DIR / "pin_map.yaml"),
+                     help="Pin map YAML describing this rig's wiring")
+    parser.addoption("--durations-out", default=None,
+                     help="Write per-test durations (JSON) for the farm scheduler")
+    parser.addoption("--run-only", default=None,
+                     help="File listing the node IDs to run (one per line); others are deselected")
+    parser.addoption("--shadow-regs", action="store_true", default=False,
+                     help="Cache non-volatile registers to skip the reads of GpioHelper / "
+                          "register field writes; G-01..G-16 plan plain writes and gain nothing")
+    parser.addoption("--parallel-probes", action="store_true", default=False,
+                     help="Drive the MCU-A and MCU-B probes from concurrent threads")
+    parser.addoption("--port-parallel", action="store_true", default=False,
+                     help="Run GPIO tests once per port and role instead of per pin")
+    parser.addoption("--jtag-stats", action="store_true", default=False,
+                     help="Count and time probe accesses per test (CSV columns + summary)")
+    parser.addoption("--profile-jtag", nargs="?", const="jtag-profile", default=None,
+                     metavar="DIR",
+                     help="Break each test's time into setup, driver calls, helper and report "
+                          "overhead; write sampled stacks (flamegraph input) to DIR "
+                          "(default jtag-profile)")
+    parser.addoption("--retry-budget", type=int, default=1000,
+                     help="JTAG retries allowed per session across both probes")
+    parser.addoption("--fault-rate", type=float, default=0.0,
+                     help="With --use-mock, fail this fraction of probe accesses with JtagError")
+    parser.addoption("--stability-dir", default=None,
+                     help="Checkpoint long-duration monitors here and resume from existing checkpoints")
+    parser.addoption("--record-trace", default=None, metavar="DIR",
+                     help="Record every probe access to DIR/<chip>.jtrace")
+    parser.addoption("--replay-trace", default=None, metavar="DIR",
+                     help="Answer probe accesses from DIR/<chip>.jtrace instead of a probe")
+    parser.addoption("--replay-loose", action="store_true", default=False,
+                     help="With --replay-trace, match reads per address instead of "
+                          "failing on the first access that differs from the trace")
+    parser.addoption("--keep-order", action="store_true", default=False,
+                     help="Run the GPIO tests in collection order instead of grouping them "
+                          "by role and pins to cut reconfiguration writes")
+    parser.addoption("--reg-table", action="append", default=[],
+                     help="Register table YAML for the R-01..R-06 coverage tests (repeatable)")
+    parser.addoption("--synthetic-regs", type=int, default=0, metavar="N",
+                     help="With --use-mock and no --reg-table, run R-01..R-06 on a synthetic "
+                          "table of N registers modelled by the mock (exercises the coverage "
+                          "engine, not the chip; R-01 resets the chips)")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    for chip in item.config.stash.get(_instrumented_key, []):
+        chip.begin_test()
+    yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """Mark probe failures as ERROR (test plan 17.1) and attach the probe
+    accesses of setup + call to the test (--jtag-stats)."""
+    outcome = yield
+    if outcome.excinfo is not None and isinstance(outcome.excinfo[1], JtagError):
+        item.user_properties.append(("status", "ERROR"))
+    chips = item.config.stash.get(_instrumented_key, [])
+    if not chips:
+        return
+    totals = dict.fromkeys(PROPERTY_NAMES, 0)
+    for chip in chips:
+        for key, value in chip.end_test().items():
+            totals[f"jtag_{key}"] += value
+    item.user_properties.extend(totals.items())
+    item.config.stash.setdefault(_jtag_tests_key, []).append((item.nodeid, totals))
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Fail the test with the probe error ``gpio_clean_state`` hit in setup."""
+    error = pyfuncitem.stash.get(_setup_error_key, None)
+    if error is not None:
+        raise error
+
+
+def pytest_report_teststatus(report, config):
+    """Report tests that failed on a JTAG error as errors, not failures."""
+    if report.when == "call" and report.failed and ("status", "ERROR") in report.user_properties:
+        return "error", "E", "ERROR"
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    chips = config.stash.get(_shadow_chips_key, [])
+    if chips:
+        terminalreporter.section("shadow registers")
+        for chip in chips:
+            stats = chip.stats()
+            terminalreporter.write_line(
+                f"{chip.name}: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hits']} JTAG reads saved)"
+            )
+
+    probes = [p for p in config.stash.get(_probes_key, []) if p.retry_count or p.failure_count]
+    if probes:
+        terminalreporter.section("JTAG retries")
+        for probe in probes:
+            stats = probe.retry_stats()
+            terminalreporter.write_line(
+                f"{probe.name}: {stats['retries']} retries, {stats['failures']} failed accesses, "
+                f"breaker {stats['breaker_state']} ({stats['breaker_trips']} trips, "
+                f"{stats['fast_fails']} fast fails)")
+        budget = config.stash[_retry_budget_key]
+        terminalreporter.write_line(f"retry budget: {budget.used}/{budget.max_retries} used")
+
+    replays = config.stash.get(_replays_key, [])
+    if replays:
+        terminalreporter.section("trace replay")
+        for chip in replays:
+            stats = chip.stats()
+            if chip.strict:
+                terminalreporter.write_line(
+                    f"{chip.name}: {stats['position']}/{stats['records']} records replayed")
+            else:
+                terminalreporter.write_line(
+                    f"{chip.name}: {stats['served']} accesses served, "
+                    f"{stats['misses']} reads not in the trace")
+
+    chips = config.stash.get(_instrumented_key, [])
+    if chips:
+        terminalreporter.section("JTAG statistics")
+        for chip in chips:
+            for op in OPS:
+                stats = chip.session[op]
+                if stats.calls:
+                    terminalreporter.write_line(
+                        f"{chip.name} {op:12s} {stats.calls:8d} calls "
+                        f"{stats.total_ns / 1e6:10.1f} ms  "
+                        f"p50 <{stats.percentile_ns(0.5) / 1e3:.0f} us  "
+                        f"p99 <{stats.percentile_ns(0.99) / 1e3:.0f} us")
+        tests = config.stash.get(_jtag_tests_key, [])
+        top = sorted(tests, key=lambda t: -t[1]["jtag_time_ns"])[:10]
+        if top:
+            terminalreporter.write_line("top JTAG-heavy tests:")
+        for nodeid, totals in top:
+            ops = sum(totals[f"jtag_{op}"] for op in OPS)
+            terminalreporter.write_line(
+                f"{totals['jtag_time_ns'] / 1e6:9.1f} ms {ops:6d} accesses "
+                f"{totals['jtag_retries']:3d} retries  {nodeid}")
 
 
 @pytest.fixture(scope="session")
 def gpio_reg_map():
-    return load_gpio_regs(_CONFIG_DIR / "regs" / "gpio.yaml")
+    return load_gpio_regs(_GPIO_REGS)
+
+
+@pytest.fixture(scope="session")
+def pin_map(request):
+    return load_pin_map(request.config.getoption("--pin-map"))
+
+
+@pytest.fixture(scope="session")
+def result_regions():
+    """Firmware result-region layouts by name (``result``, ``stats``, ...);
+    decode them with ``utils.result_decoder.RegionDecoder``."""
+    return load_result_regions(_CONFIG_DIR / "results" / "firmware.yaml")
+
+
+def _wrap_chip(config, chip, reg_map):
+    """Apply the optional driver layers selected on the command line."""
+    if config.getoption("--jtag-stats"):
+        # Innermost, so only accesses that reach the probe are counted
+        chip = InstrumentedChip(chip)
+        config.stash.setdefault(_instrumented_key, []).append(chip)
+    if config.getoption("--shadow-regs"):
+        chip = ShadowRegChip.from_reg_map(chip, reg_map)
+        config.stash.setdefault(_shadow_chips_key, []).append(chip)
+    if _profiler_key in config.stash:
+        # Above the other layers: times the ChipInterface calls the tests make
+        chip = ProfilingChip(chip)
+        config.stash[_profiler_key].chips.append(chip)
+    # Outermost, so restoring the GPIO baseline sees every write (gpio_clean_state)
+    return WriteTracker.from_reg_map(chip, reg_map)
+
+
+def _make_chip(config, probe_id, name, openocd=None):
+    """Create the driver for one probe; every JtagImpl shares the session retry budget."""
+    if config.getoption("--replay-trace"):
+        chip = ReplayChipInterface.from_file(trace_path(config.getoption("--replay-trace"), name),
+                                             strict=not config.getoption("--replay-loose"))
+        config.stash.setdefault(_replays_key, []).append(chip)
+        return chip
+    if _retry_budget_key not in config.stash:
+        config.stash[_retry_budget_key] = RetryBudget(config.getoption("--retry-budget"))
+    budget = config.stash[_retry_budget_key]
+    if openocd:
+        chip = OpenOcdJtagImpl(probe_id, name=name, address=openocd, budget=budget)
+    elif config.getoption("--use-mock"):
+        chip = MockJtagImpl(probe_id, name=name)
+        config.stash.setdefault(_mocks_key, []).append(chip)
+        if config.getoption("--fault-rate"):
+            chip = FaultyJtagImpl(chip, config.getoption("--fault-rate"), budget=budget)
+    else:
+        chip = JtagImpl(probe_id, name=name, budget=budget)
+    if isinstance(chip, JtagImpl):
+        config.stash.setdefault(_probes_key, []).append(chip)
+    if config.getoption("--record-trace"):
+        # Outside the retry logic: only accesses that completed are recorded
+        chip = RecordingChip(chip, trace_path(config.getoption("--record-trace"), name))
+    return chip
+
+
+def _close_chip(chip):
+    """Close the connection or trace file of a chip made by _make_chip, if any."""
+    close = getattr(chip, "close", None)
+    if close is not None:
+        close()
+
+
+@pytest.fixture(scope="session")
+def openocd_addresses(request, pin_map, gpio_reg_map):
+    """OpenOCD addresses for (MCU-A, MCU-B); with --openocd-standin, those
+    of two stand-in servers backed by mock chips wired per the pin map and
+    modelling the register tables under test."""
+    config = request.config
+    if not config.getoption("--openocd-standin"):
+        yield config.getoption("--openocd-a"), config.getoption("--openocd-b")
+        return
+    chip_a = MockJtagImpl(config.getoption("--jtag-a"), name="MCU-A")
+    chip_b = MockJtagImpl(config.getoption("--jtag-b"), name="MCU-B")
+    MockBoard.from_pin_map(pin_map, [chip_a, chip_b], gpio_reg_map)
+    # The register tests cannot reach these mocks through the OpenOCD driver
+    for table in _reg_tables(config):
+        for chip in (chip_a, chip_b):
+            chip.define_registers(mock_specs(table))
+    with OpenOcdStandIn(chip_a) as server_a, OpenOcdStandIn(chip_b) as server_b:
+        yield server_a.address, server_b.address
+
+
+@pytest.fixture(scope="session")
+def mcu_a(request, gpio_reg_map, openocd_addresses):
+    chip = _make_chip(request.config, request.config.getoption("--jtag-a"), "MCU-A",
+                      openocd_addresses[0])
+    yield _wrap_chip(request.config, chip, gpio_reg_map)
+    _close_chip(chip)
+
+
+@pytest.fixture(scope="session")
+def mcu_b(request, mcu_a, pin_map, gpio_reg_map, openocd_addresses):
+    chip = _make_chip(request.config, request.config.getoption("--jtag-b"), "MCU-B",
+                      openocd_addresses[1])
+    mocks = request.config.stash.get(_mocks_key, [])
+    if len(mocks) == 2:
+        # Wire the two mock chips as this rig's pin map says
+        MockBoard.from_pin_map(pin_map, mocks, gpio_reg_map)
+    yield _wrap_chip(request.config, chip, gpio_reg_map)
+    _close_chip(chip)
 
 
 @pytest.fixture(scope="session")
-def pin_map():
-    return load_pin_map(_CONFIG_DIR / "pin_map.yaml")
+def dual(request, mcu_a, mcu_b):
+    """Executor running independent per-chip steps on both probes at once."""
+    executor = DualChipExecutor(mcu_a, mcu_b,
+                                parallel=request.config.getoption("--parallel-probes"))
+    yield executor
+    executor.close()
 
 
 @pytest.fixture(scope="session")
-def mcu_a(request):
-    use_mock = request.config.getoption("--use-mock")
-    probe_id = request.config.getoption("--jtag-a")
-    if use_mock:
-        return MockJtagImpl(probe_id, name="MCU-A")
-    return JtagImpl(probe_id, name="MCU-A")
+def aio():
+    """Session event loop for async chip code: ``aio.run(coro)`` from a test."""
+    with asyncio.Runner() as runner:
+        yield runner
 
 
 @pytest.fixture(scope="session")
-def mcu_b(request, mcu_a):
-    use_mock = request.config.getoption("--use-mock")
-    probe_id = request.config.getoption("--jtag-b")
-    if use_mock:
-        b = MockJtagImpl(probe_id, name="MCU-B")
-        mcu_a.set_peer(b)
-        return b
-    return JtagImpl(probe_id, name="MCU-B")
+def async_mcu_a(mcu_a):
+    """MCU-A as an AsyncChipInterface (same probe and driver layers as mcu_a)."""
+    chip = ExecutorChip(mcu_a)
+    yield chip
+    chip.close()
+
+
+@pytest.fixture(scope="session")
+def async_mcu_b(mcu_b):
+    """MCU-B as an AsyncChipInterface (same probe and driver layers as mcu_b)."""
+    chip = ExecutorChip(mcu_b)
+    yield chip
+    chip.close()
+
+
+@pytest.fixture
+def stability_monitor(request, async_mcu_a, async_mcu_b):
+    """Factory for a StabilityMonitor over both chips:
+    ``stability_monitor(stats_addr, interval=..., error_threshold=...)``.
+    With --stability-dir the monitor checkpoints to ``<dir>/<test>.json``
+    and resumes from it when the session is restarted.  With -v the status
+    line of every poll goes to the terminal (not the captured output)."""
+    reporter = request.config.pluginmanager.get_plugin("terminalreporter")
+    capture = request.config.pluginmanager.get_plugin("capturemanager")
+
+    def show(line):
+        with capture.global_and_fixture_disabled():
+            reporter.write_line(line)
+
+    def make(stats_addr, **kwargs):
+        directory = request.config.getoption("--stability-dir")
+        if directory:
+            kwargs.setdefault("checkpoint", Path(directory) / f"{request.node.name}.json")
+        if reporter is not None and capture is not None and request.config.get_verbosity() > 0:
+            kwargs.setdefault("progress", show)
+        return StabilityMonitor({async_mcu_a.name: async_mcu_a, async_mcu_b.name: async_mcu_b},
+                                stats_addr, **kwargs)
+    return make
 
 
 @pytest.fixture(scope="session")
@@ -68,27 +406,130 @@ def gpio_b(mcu_b, gpio_reg_map):
     return GpioHelper(mcu_b, gpio_reg_map)
 
 
+@pytest.fixture(scope="session")
+def gpio_baseline(gpio_a, gpio_b, dual):
+    """GPIO/EXTI snapshots of (MCU-A, MCU-B) taken right after reset:
+    ``snap_a, snap_b = gpio_baseline()``.  They are taken on first use; a
+    capture that fails on a probe error is retried by the next call
+    instead of failing the fixture for the rest of the session."""
+    snaps = []
+
+    def capture(gpio):
+        gpio.chip.reset()
+        return gpio.snapshot()
+
+    def get():
+        if not snaps:
+            snaps.extend(dual.pair(lambda: capture(gpio_a), lambda: capture(gpio_b)))
+        return tuple(snaps)
+    return get
+
+
+@pytest.fixture(scope="session")
+def gpio_engine(gpio_a, gpio_b, gpio_reg_map):
+    """VectorEngine for G-01 ~ G-16; ``gpio_clean_state`` gives it the
+    ``gpio_baseline`` snapshots as its known state."""
+    return VectorEngine(gpio_reg_map, None, gpio_a, gpio_b)
+
+
+@pytest.fixture(autouse=True)
+def gpio_clean_state(request):
+    """Start every GPIO test (one using ``gpio_a``) from the post-reset
+    state: both chips' GPIO and EXTI registers are restored from
+    ``gpio_baseline``.  Only the registers written since the last restore
+    are written back, in one batch per chip; nothing is read.
+
+    While the engine's model of the registers is current (nothing but
+    ``gpio_engine`` wrote them since), the registers to write back are
+    those the model shows differing from the baseline, e.g. EXTI lines
+    left enabled by G-08 ~ G-15 on other pins; otherwise WriteTracker
+    says which were written.
+
+    A probe error while taking the baseline or restoring is raised when
+    the test is called (``pytest_pyfunc_call``), so it is that test's
+    ERROR, with its CSV row, and the next test tries again."""
+    if "gpio_a" not in request.fixturenames:
+        return
+    engine = None
+    dirty_a = dirty_b = None
+    if "gpio_engine" in request.fixturenames:
+        engine = request.getfixturevalue("gpio_engine")
+        if engine.in_sync():
+            dirty_a, dirty_b = engine.changed()
+    gpio_a = request.getfixturevalue("gpio_a")
+    gpio_b = request.getfixturevalue("gpio_b")
+    try:
+        snap_a, snap_b = request.getfixturevalue("gpio_baseline")()
+        request.getfixturevalue("dual").pair(lambda: gpio_a.restore(snap_a, dirty_a),
+                                             lambda: gpio_b.restore(snap_b, dirty_b))
+    except JtagError as exc:
+        request.node.stash[_setup_error_key] = exc
+        return
+    if engine is not None:
+        engine.reset_state(tuple(
+            {addr: value for addr, value in snap.values.items() if addr not in snap.w1c}
+            for snap in (snap_a, snap_b)))
+
+
 @pytest.fixture(scope="session")
 def all_pin_pairs(pin_map):
     return pin_map.pin_pairs
 
 
+def _port_group_id(group):
+    """Generate an ID like GPIOA, or GPIOA-GPIOB for crossed wiring."""
+    if group.mcu_a_port == group.mcu_b_port:
+        return group.mcu_a_port
+    return f"{group.mcu_a_port}-{group.mcu_b_port}"
+
+
 def _pin_pair_id(pp):
     """Generate short ID like A0, B5, C15 from a PinPair."""
     port_letter = pp.mcu_a_port[-1]  # 'A', 'B', 'C'
     return f"{port_letter}{pp.mcu_a_pin}"
 
 
+def _reg_tables(config):
+    """Register tables under test: --reg-table files, else a synthetic one on
+    the mock when --synthetic-regs asks for it."""
+    if _reg_tables_key not in config.stash:
+        if config.getoption("--reg-table"):
+            tables = [load_reg_table(path) for path in config.getoption("--reg-table")]
+        elif config.getoption("--use-mock") and config.getoption("--synthetic-regs"):
+            tables = [synthetic_table(config.getoption("--synthetic-regs"))]
+        else:
+            tables = []
+        config.stash[_reg_tables_key] = tables
+    return config.stash[_reg_tables_key]
+
+
 def pytest_generate_tests(metafunc):
-    """Auto-parametrize tests that request the 'pin_pair' fixture."""
-    if "pin_pair" in metafunc.fixturenames:
-        pin_map_cfg = load_pin_map(_CONFIG_DIR / "pin_map.yaml")
-        pairs = pin_map_cfg.pin_pairs
-        ids = [_pin_pair_id(pp) for pp in pairs]
-        metafunc.parametrize("pin_pair", pairs, ids=ids, scope="function")
-
-
-def reset_pin_pair(gpio_a, gpio_b, pin_pair):
-    """Reset both sides of a pin pair to default state."""
-    gpio_a.reset_pin(pin_pair.mcu_a_port, pin_pair.mcu_a_pin)
-    gpio_b.reset_pin(pin_pair.mcu_b_port, pin_pair.mcu_b_pin)
+    """Auto-parametrize tests that request the 'gpio_pins' fixture: one
+    pin pair per test, or one port group with --port-parallel."""
+    if "gpio_pins" in metafunc.fixturenames:
+        pin_map_cfg = load_pin_map(metafunc.config.getoption("--pin-map"))
+        if metafunc.config.getoption("--port-parallel"):
+            groups = pin_map_cfg.port_groups()
+            metafunc.parametrize("gpio_pins", groups, ids=[_port_group_id(g) for g in groups],
+                                 scope="function")
+        else:
+            pairs = pin_map_cfg.pin_pairs
+            metafunc.parametrize("gpio_pins", pairs, ids=[_pin_pair_id(pp) for pp in pairs],
+                                 scope="function")
+    if "reg_table" in metafunc.fixturenames:
+        tables = _reg_tables(metafunc.config)
+        metafunc.parametrize("reg_table", tables, ids=[t.name for t in tables],
+                             scope="session")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Apply the --run-only shard list."""
+    if not config.getoption("--run-only"):
+        return
+    run_only = set(Path(config.getoption("--run-only")).read_text(encoding="utf-8").split())
+    kept, deselected = [], []
+    for item in items:
+        (kept if item.nodeid in run_only else deselected).append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = kept
@@ -0,0 +1,176 @@
+"""asyncio counterpart of ChipInterface.
+
+Firmware-mode and stability tests spend most of their time waiting for a
+done flag or for the next statistics poll.  With AsyncChipInterface those
+waits are ``asyncio.sleep`` calls on one event loop, so a single thread can
+watch dozens of probes; only the probe accesses themselves run on a
+thread.
+
+ExecutorChip adapts any synchronous ChipInterface (JtagImpl,
+MockJtagImpl, or a wrapped chip) by running its calls on a one-thread
+executor per probe: accesses to one probe stay serialized and in order,
+while different probes proceed in parallel.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator
+
+from .chip_interface import ChipInterface, RegOp
+
+if TYPE_CHECKING:
+    from .firmware import FirmwareReport
+
+
+class AsyncChipInterface(ABC):
+    """Abstract base class for chip operations via JTAG, as coroutines."""
+
+    def __init__(self, probe_id: str, name: str = ""):
+        self.probe_id = probe_id
+        self.name = name or probe_id
+
+    @abstractmethod
+    async def reg_read(self, addr: int) -> int:
+        """Read a 32-bit register."""
+        ...
+
+    @abstractmethod
+    async def reg_write(self, addr: int, value: int) -> None:
+        """Write a 32-bit register."""
+        ...
+
+    async def reg_read_field(self, addr: int, bit_offset: int, bit_width: int) -> int:
+        """Read a bit field from a register."""
+        val = await self.reg_read(addr)
+        return (val >> bit_offset) & ((1 << bit_width) - 1)
+
+    async def execute_ops(self, ops: list[RegOp]) -> None:
+        """Execute queued register operations in order (see ChipInterface.execute_ops)."""
+        for op in ops:
+            if op.kind == "write":
+                await self.reg_write(op.addr, op.value)
+            elif op.kind == "modify":
+                reg_val = (await self.reg_read(op.addr) & ~op.mask) | (op.value & op.mask)
+                await self.reg_write(op.addr, reg_val)
+                op.resolve(reg_val)
+            else:
+                op.resolve(await self.reg_read(op.addr))
+
+    @abstractmethod
+    async def mem_read(self, addr: int, size: int) -> bytes:
+        """Read a block of memory."""
+        ...
+
+    @abstractmethod
+    async def mem_write(self, addr: int, data: bytes) -> None:
+        """Write a block of memory."""
+        ...
+
+    async def mem_readinto(self, addr: int, buf) -> int:
+        """Read ``len(buf)`` bytes of memory into a writable buffer; return
+        the number of bytes read (see ChipInterface.mem_readinto)."""
+        dest = memoryview(buf).cast("B")
+        data = await self.mem_read(addr, len(dest))
+        dest[:len(data)] = data
+        return len(data)
+
+    @abstractmethod
+    async def reset(self) -> None:
+        """Reset the chip."""
+        ...
+
+    @abstractmethod
+    async def halt(self) -> None:
+        """Halt the CPU core."""
+        ...
+
+    @abstractmethod
+    async def run(self) -> None:
+        """Resume CPU execution."""
+        ...
+
+    @abstractmethod
+    async def download_firmware(self, path: str) -> "FirmwareReport | None":
+        """Download firmware to the chip."""
+        ...
+
+    async def wait_reg(self, addr: int, mask: int, expected: int, timeout: float,
+                       interval: float = 0.01) -> int:
+        """Poll *addr* every *interval* seconds until ``value & mask ==
+        expected``; return the value.  Raises TimeoutError after *timeout*
+        seconds.  Waiting does not hold a thread."""
+        async with asyncio.timeout(timeout):
+            while True:
+                value = await self.reg_read(addr)
+                if value & mask == expected:
+                    return value
+                await asyncio.sleep(interval)
+
+    async def poll_mem(self, addr: int, size: int, interval: float,
+                       count: int | None = None) -> AsyncIterator[bytes]:
+        """Yield the memory block at *addr* every *interval* seconds,
+        *count* times or until the consumer stops."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        n = 0
+        while count is None or n < count:
+            yield await self.mem_read(addr, size)
+            n += 1
+            # Fixed schedule: a slow read does not push later polls back
+            deadline += interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+
+class ExecutorChip(AsyncChipInterface):
+    """AsyncChipInterface running a synchronous chip's calls on an executor.
+
+    By default each instance owns a one-thread executor, so calls to its
+    probe run one at a time in submission order.  ``sync`` is the wrapped
+    chip, for code that still needs the blocking interface."""
+
+    def __init__(self, chip: ChipInterface, executor: Executor | None = None):
+        super().__init__(chip.probe_id, chip.name)
+        self.sync = chip
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"probe-{chip.name}")
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def reg_read(self, addr: int) -> int:
+        return await self._call(self.sync.reg_read, addr)
+
+    async def reg_write(self, addr: int, value: int) -> None:
+        await self._call(self.sync.reg_write, addr, value)
+
+    async def reg_read_field(self, addr: int, bit_offset: int, bit_width: int) -> int:
+        return await self._call(self.sync.reg_read_field, addr, bit_offset, bit_width)
+
+    async def execute_ops(self, ops: list[RegOp]) -> None:
+        await self._call(self.sync.execute_ops, ops)
+
+    async def mem_read(self, addr: int, size: int) -> bytes:
+        return await self._call(self.sync.mem_read, addr, size)
+
+    async def mem_write(self, addr: int, data: bytes) -> None:
+        await self._call(self.sync.mem_write, addr, data)
+
+    async def mem_readinto(self, addr: int, buf) -> int:
+        return await self._call(self.sync.mem_readinto, addr, buf)
+
+    async def reset(self) -> None:
+        await self._call(self.sync.reset)
+
+    async def halt(self) -> None:
+        await self._call(self.sync.halt)
+
+    async def run(self) -> None:
+        await self._call(self.sync.run)
+
+    async def download_firmware(self, path: str) -> "FirmwareReport | None":
+        return await self._call(self.sync.download_firmware, path)
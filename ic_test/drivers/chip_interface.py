@@ -1,4 +1,11 @@
+import zlib
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable
+
+if TYPE_CHECKING:
+    from .firmware import FirmwareReport
 
 
 class JtagError(Exception):
@@ -6,9 +13,122 @@ class JtagError(Exception):
     pass
 
 
+class ProbeUnavailableError(JtagError):
+    """The probe's circuit breaker is open: the access was not attempted."""
+    pass
+
+
+class RegFuture:
+    """Result of a queued register read, resolved when its transaction
+    is flushed."""
+
+    def __init__(self, convert: Callable[[int], object] | None = None):
+        self._convert = convert
+        self._done = False
+        self._value = None
+        self._children: list["RegFuture"] = []
+
+    def done(self) -> bool:
+        return self._done
+
+    def result(self):
+        """Return the read value; only valid after the flush."""
+        if not self._done:
+            raise RuntimeError("register read not flushed yet")
+        return self._value
+
+    def then(self, func: Callable[[object], object]) -> "RegFuture":
+        """Return a future resolving to *func* applied to this one's value."""
+        child = RegFuture(func)
+        if self._done:
+            child.set_result(self._value)
+        else:
+            self._children.append(child)
+        return child
+
+    def set_result(self, value) -> None:
+        self._value = self._convert(value) if self._convert else value
+        self._done = True
+        for child in self._children:
+            child.set_result(self._value)
+        self._children.clear()
+
+
+@dataclass
+class RegOp:
+    """One queued register access.
+
+    *kind* is ``"read"``, ``"write"`` or ``"modify"`` (read-modify-write of
+    the bits in *mask*).  Once executed, *value* holds the raw register
+    value read (``read``) or finally written (``modify``) and *future*, if
+    any, is resolved."""
+    kind: str
+    addr: int
+    value: int = 0
+    mask: int = 0
+    future: RegFuture | None = None
+
+    def resolve(self, raw: int) -> None:
+        self.value = raw
+        if self.future is not None:
+            self.future.set_result(raw)
+
+
+class Transaction:
+    """Register accesses queued against a chip and flushed in one batch.
+
+    Exposes the same register methods as ChipInterface, so helpers can be
+    pointed at a transaction instead of a chip.  Reads return RegFuture
+    objects that resolve at flush time."""
+
+    def __init__(self, chip: "ChipInterface"):
+        self.chip = chip
+        self.ops: list[RegOp] = []
+
+    def reg_read(self, addr: int) -> RegFuture:
+        future = RegFuture()
+        self.ops.append(RegOp("read", addr, future=future))
+        return future
+
+    def reg_write(self, addr: int, value: int) -> None:
+        self.ops.append(RegOp("write", addr, value & 0xFFFFFFFF))
+
+    def reg_read_field(self, addr: int, bit_offset: int, bit_width: int) -> RegFuture:
+        mask = (1 << bit_width) - 1
+        future = RegFuture(lambda val: (val >> bit_offset) & mask)
+        self.ops.append(RegOp("read", addr, future=future))
+        return future
+
+    def reg_write_field(self, addr: int, bit_offset: int, bit_width: int, value: int) -> None:
+        mask = ((1 << bit_width) - 1) << bit_offset
+        self.reg_write_masked(addr, mask, value << bit_offset)
+
+    def reg_write_masked(self, addr: int, mask: int, value: int) -> None:
+        self.ops.append(RegOp("modify", addr, value & mask, mask))
+
+    def flush(self) -> None:
+        """Send all queued operations to the chip."""
+        ops, self.ops = self.ops, []
+        if ops:
+            self.chip.execute_ops(ops)
+
+
+@dataclass
+class RegSnapshot:
+    """Register values captured by ``ChipInterface.snapshot``, in restore
+    order.  Registers in *w1c* are write-1-to-clear: restoring them clears
+    the bits set since the snapshot."""
+    values: dict[int, int]
+    w1c: frozenset[int] = frozenset()
+
+
 class ChipInterface(ABC):
     """Abstract base class for chip operations via JTAG."""
 
+    # mem_crc32 runs on the target (no read-back); firmware.download only
+    # verifies pages on chips that set this
+    target_crc = False
+
     def __init__(self, probe_id: str, name: str = ""):
         self.probe_id = probe_id
         self.name = name or probe_id
@@ -31,11 +151,78 @@ class ChipInterface(ABC):
 
     def reg_write_field(self, addr: int, bit_offset: int, bit_width: int, value: int) -> None:
         """Read-modify-write a bit field in a register."""
-        reg_val = self.reg_read(addr)
         mask = ((1 << bit_width) - 1) << bit_offset
-        reg_val = (reg_val & ~mask) | ((value << bit_offset) & mask)
+        self.reg_write_masked(addr, mask, value << bit_offset)
+
+    def reg_write_masked(self, addr: int, mask: int, value: int) -> None:
+        """Read-modify-write the bits selected by *mask* in a register."""
+        reg_val = self.reg_read(addr)
+        reg_val = (reg_val & ~mask) | (value & mask)
         self.reg_write(addr, reg_val)
 
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        """Execute queued register operations in order.
+
+        The default issues one access per operation; backends that can
+        pipeline accesses into a single scan sequence override this."""
+        for op in ops:
+            if op.kind == "write":
+                self.reg_write(op.addr, op.value)
+            elif op.kind == "modify":
+                reg_val = self.reg_read(op.addr)
+                reg_val = (reg_val & ~op.mask) | (op.value & op.mask)
+                self.reg_write(op.addr, reg_val)
+                op.resolve(reg_val)
+            else:
+                op.resolve(self.reg_read(op.addr))
+
+    @contextmanager
+    def transaction(self):
+        """Queue register accesses made on the yielded Transaction and
+        flush them in one batch when the block exits without error."""
+        tx = Transaction(self)
+        yield tx
+        tx.flush()
+
+    def snapshot(self, addrs: Iterable[int], w1c: Iterable[int] = ()) -> RegSnapshot:
+        """Read the registers at *addrs* in one batch.  *w1c* lists the
+        write-1-to-clear registers among them."""
+        with self.transaction() as tx:
+            reads = {addr: tx.reg_read(addr) for addr in addrs}
+        return RegSnapshot({addr: f.result() for addr, f in reads.items()}, frozenset(w1c))
+
+    def restore(self, snapshot: RegSnapshot, dirty: Iterable[int] | None = None) -> int:
+        """Put the registers of *snapshot* back to their captured values;
+        return the number of registers written.
+
+        Without *dirty*, one batch reads them all and a second writes only
+        those that differ.  With *dirty* (the registers that may have
+        changed, e.g. from a WriteTracker) nothing is read: those registers
+        are written back, plus the write-1-to-clear ones, in one batch, and
+        an empty *dirty* costs no access at all."""
+        if dirty is None:
+            with self.transaction() as tx:
+                reads = {addr: tx.reg_read(addr) for addr in snapshot.values}
+            current = {addr: f.result() for addr, f in reads.items()}
+        else:
+            dirty = set(dirty)
+            if not dirty:
+                return 0
+            # Assume every dirty register changed and every pending flag is set
+            current = {addr: ~snapshot.values[addr] & 0xFFFFFFFF
+                       for addr in snapshot.values if addr in dirty or addr in snapshot.w1c}
+        with self.transaction() as tx:
+            for addr, value in snapshot.values.items():
+                now = current.get(addr, value)
+                if now == value:
+                    continue
+                if addr in snapshot.w1c:
+                    tx.reg_write(addr, now & ~value)
+                else:
+                    tx.reg_write(addr, value)
+            written = len(tx.ops)
+        return written
+
     @abstractmethod
     def mem_read(self, addr: int, size: int) -> bytes:
         """Read a block of memory."""
@@ -46,6 +233,21 @@ class ChipInterface(ABC):
         """Write a block of memory."""
         ...
 
+    def mem_readinto(self, addr: int, buf) -> int:
+        """Read ``len(buf)`` bytes of memory into a writable buffer
+        (bytearray, memoryview, array); return the number of bytes read.
+        Implementations override this to avoid the intermediate copy."""
+        dest = memoryview(buf).cast("B")
+        data = self.mem_read(addr, len(dest))
+        dest[:len(data)] = data
+        return len(data)
+
+    def mem_crc32(self, addr: int, size: int) -> int:
+        """CRC-32 (zlib polynomial) of a block of memory.  The default reads
+        the block back; backends with an on-chip CRC unit or flash stub
+        override this to avoid the transfer and set ``target_crc``."""
+        return zlib.crc32(self.mem_read(addr, size))
+
     @abstractmethod
     def reset(self) -> None:
         """Reset the MCU."""
@@ -62,6 +264,63 @@ class ChipInterface(ABC):
         ...
 
     @abstractmethod
-    def download_firmware(self, path: str) -> None:
-        """Download firmware to the MCU."""
+    def download_firmware(self, path: str) -> "FirmwareReport | None":
+        """Download firmware to the MCU; return the transfer report if the
+        implementation produces one."""
         ...
+
+
+class ChipProxy(ChipInterface):
+    """ChipInterface that forwards every operation to an inner chip.
+
+    Subclass and override individual methods to layer behaviour (caching,
+    instrumentation, ...) on top of any concrete implementation.  Attributes
+    not defined on the proxy (e.g. ``MockJtagImpl.set_peer``) are looked up
+    on the inner chip."""
+
+    def __init__(self, inner: ChipInterface):
+        super().__init__(inner.probe_id, inner.name)
+        self.inner = inner
+
+    def __getattr__(self, name):
+        # Only reached for attributes missing on the proxy itself
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    @property
+    def target_crc(self) -> bool:
+        return self.inner.target_crc
+
+    def reg_read(self, addr: int) -> int:
+        return self.inner.reg_read(addr)
+
+    def reg_write(self, addr: int, value: int) -> None:
+        self.inner.reg_write(addr, value)
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        self.inner.execute_ops(ops)
+
+    def mem_read(self, addr: int, size: int) -> bytes:
+        return self.inner.mem_read(addr, size)
+
+    def mem_write(self, addr: int, data: bytes) -> None:
+        self.inner.mem_write(addr, data)
+
+    def mem_readinto(self, addr: int, buf) -> int:
+        return self.inner.mem_readinto(addr, buf)
+
+    def mem_crc32(self, addr: int, size: int) -> int:
+        return self.inner.mem_crc32(addr, size)
+
+    def reset(self) -> None:
+        self.inner.reset()
+
+    def halt(self) -> None:
+        self.inner.halt()
+
+    def run(self) -> None:
+        self.inner.run()
+
+    def download_firmware(self, path: str) -> "FirmwareReport | None":
+        return self.inner.download_firmware(path)
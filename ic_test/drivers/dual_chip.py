@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from .chip_interface import ChipInterface
+
+T = TypeVar("T")
+
+
+class DualChipExecutor:
+    """Run independent work on MCU-A and MCU-B concurrently.
+
+    The two chips sit behind separate probes, so resets, halts, firmware
+    downloads and configuration that does not depend on the other side can
+    overlap.  Each call blocks until both sides finish; an exception from
+    either side is re-raised.  Ordered steps (configure the reader before
+    the driver, stimulus before sampling) must still be issued one after
+    the other by the caller.
+
+    With *parallel* False everything runs inline, A then B."""
+
+    def __init__(self, chip_a: ChipInterface, chip_b: ChipInterface, parallel: bool = True):
+        self.chip_a = chip_a
+        self.chip_b = chip_b
+        self.parallel = parallel
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="probe") \
+            if parallel else None
+
+    def both(self, func: Callable[[ChipInterface], T]) -> tuple[T, T]:
+        """Call ``func(chip)`` for both chips; return (result_a, result_b)."""
+        return self.pair(lambda: func(self.chip_a), lambda: func(self.chip_b))
+
+    def pair(self, func_a: Callable[[], T], func_b: Callable[[], T]) -> tuple[T, T]:
+        """Run two zero-argument callables, one per probe; return both results."""
+        if self._pool is None:
+            return func_a(), func_b()
+        fut_a = self._pool.submit(func_a)
+        fut_b = self._pool.submit(func_b)
+        try:
+            return fut_a.result(), fut_b.result()
+        finally:
+            # Never leave the other probe mid-operation when one side fails
+            fut_b.exception()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
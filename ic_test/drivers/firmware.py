@@ -0,0 +1,239 @@
+"""Incremental firmware download over ``mem_write``.
+
+Images (ELF or Intel HEX) are parsed into load segments, adjacent segments
+are coalesced into contiguous blocks and each block is compared with the
+chip page by page using ``mem_crc32``.  Only pages whose CRC differs are
+written, as one ``mem_write`` burst per run of consecutive dirty pages.
+
+A per-probe cache remembers the page CRCs last loaded, so re-flashing an
+image the probe already holds costs one CRC check per block instead of one
+per page.
+
+The comparison only pays off when ``mem_crc32`` runs on the target
+(``chip.target_crc``).  Other chips would read every page back, which
+costs more than writing it, so there the cache is trusted instead: pages
+it says are loaded are skipped without any access and all the others are
+written.  Call ``forget_probe`` after the chip was flashed by other means.
+"""
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from .chip_interface import ChipInterface
+
+PAGE_SIZE = 0x400
+FILL_BYTE = 0xFF   # erased flash; used to pad the gaps between merged segments
+MAX_GAP = 0x100    # segments closer than this are merged into one block
+
+_PT_LOAD = 1
+
+
+@dataclass
+class Segment:
+    addr: int
+    data: bytes
+
+    @property
+    def end(self) -> int:
+        return self.addr + len(self.data)
+
+
+@dataclass
+class FirmwareReport:
+    """Outcome of one download: what was sent vs found already in place."""
+    path: str
+    bytes_total: int = 0
+    bytes_transferred: int = 0
+    bytes_skipped: int = 0
+    pages_written: int = 0
+    pages_skipped: int = 0
+    bursts: int = 0
+    elapsed: float = 0.0
+
+    def __str__(self) -> str:
+        return (f"{Path(self.path).name}: {self.bytes_transferred} B transferred, "
+                f"{self.bytes_skipped} B skipped ({self.pages_written} pages written, "
+                f"{self.pages_skipped} skipped, {self.bursts} bursts) in {self.elapsed:.2f}s")
+
+
+# ---------------------------------------------------------------------------
+# Image parsing
+# ---------------------------------------------------------------------------
+
+def parse_elf(blob: bytes) -> list[Segment]:
+    """Return the PT_LOAD segments of an ELF image at their load (physical) address."""
+    if blob[:4] != b"\x7fELF":
+        raise ValueError("not an ELF image")
+    is_64 = blob[4] == 2
+    endian = "<" if blob[5] == 1 else ">"
+    if is_64:
+        phoff, = struct.unpack_from(endian + "Q", blob, 0x20)
+        phentsize, phnum = struct.unpack_from(endian + "HH", blob, 0x36)
+        ph_fmt = endian + "IIQQQQQQ"  # type, flags, offset, vaddr, paddr, filesz, memsz, align
+    else:
+        phoff, = struct.unpack_from(endian + "I", blob, 0x1C)
+        phentsize, phnum = struct.unpack_from(endian + "HH", blob, 0x2A)
+        ph_fmt = endian + "IIIIIIII"  # type, offset, vaddr, paddr, filesz, memsz, flags, align
+
+    segments = []
+    for i in range(phnum):
+        fields = struct.unpack_from(ph_fmt, blob, phoff + i * phentsize)
+        if is_64:
+            p_type, _, offset, _, paddr, filesz = fields[:6]
+        else:
+            p_type, offset, _, paddr, filesz = fields[:5]
+        # .bss and friends have no file contents; the startup code zeroes them
+        if p_type == _PT_LOAD and filesz:
+            segments.append(Segment(paddr, bytes(blob[offset:offset + filesz])))
+    return segments
+
+
+def parse_ihex(text: str) -> list[Segment]:
+    """Return the data records of an Intel HEX file, merged where contiguous."""
+    segments: list[Segment] = []
+    base = 0
+    chunk_addr, chunk = None, bytearray()
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith(":"):
+            raise ValueError(f"line {lineno}: missing ':' record mark")
+        record = bytes.fromhex(line[1:])
+        if len(record) < 5 or len(record) != record[0] + 5:
+            raise ValueError(f"line {lineno}: bad record length")
+        if sum(record) & 0xFF:
+            raise ValueError(f"line {lineno}: checksum mismatch")
+        count, offset, rtype = record[0], (record[1] << 8) | record[2], record[3]
+        payload = record[4:4 + count]
+
+        if rtype == 0x00:
+            addr = base + offset
+            if chunk_addr is not None and addr == chunk_addr + len(chunk):
+                chunk += payload
+            else:
+                if chunk:
+                    segments.append(Segment(chunk_addr, bytes(chunk)))
+                chunk_addr, chunk = addr, bytearray(payload)
+        elif rtype == 0x01:
+            break
+        elif rtype == 0x02:
+            base = int.from_bytes(payload, "big") << 4
+        elif rtype == 0x04:
+            base = int.from_bytes(payload, "big") << 16
+        # 0x03 / 0x05 (start address) do not affect memory contents
+    if chunk:
+        segments.append(Segment(chunk_addr, bytes(chunk)))
+    return segments
+
+
+def load_image(path: str | Path) -> list[Segment]:
+    """Parse an ELF or Intel HEX image, detected from its contents."""
+    blob = Path(path).read_bytes()
+    if blob[:4] == b"\x7fELF":
+        return parse_elf(blob)
+    if blob.lstrip()[:1] == b":":
+        return parse_ihex(blob.decode("ascii"))
+    raise ValueError(f"{path}: unsupported firmware format (expected ELF or Intel HEX)")
+
+
+def coalesce(segments: list[Segment], max_gap: int = MAX_GAP) -> list[Segment]:
+    """Merge segments that touch, overlap or lie within *max_gap* bytes of
+    each other; gaps are padded with FILL_BYTE and later segments win on
+    overlap."""
+    blocks: list[tuple[int, bytearray]] = []
+    for seg in sorted(segments, key=lambda s: s.addr):
+        if blocks and seg.addr <= blocks[-1][0] + len(blocks[-1][1]) + max_gap:
+            start, buf = blocks[-1]
+            rel = seg.addr - start
+            if rel > len(buf):
+                buf += bytes([FILL_BYTE]) * (rel - len(buf))
+            buf[rel:rel + len(seg.data)] = seg.data
+        else:
+            blocks.append((seg.addr, bytearray(seg.data)))
+    return [Segment(start, bytes(buf)) for start, buf in blocks]
+
+
+# ---------------------------------------------------------------------------
+# Download
+# ---------------------------------------------------------------------------
+
+# probe_id -> {page address: CRC32 of the bytes last loaded there}
+_loaded_pages: dict[str, dict[int, int]] = {}
+_cache_lock = threading.Lock()
+
+
+def forget_probe(probe_id: str | None = None) -> None:
+    """Drop the loaded-page cache of one probe, or of all probes."""
+    with _cache_lock:
+        if probe_id is None:
+            _loaded_pages.clear()
+        else:
+            _loaded_pages.pop(probe_id, None)
+
+
+def _pages(block: Segment, page_size: int):
+    """Yield (addr, view) for the page-aligned pieces of *block*."""
+    view = memoryview(block.data)
+    addr = block.addr
+    while addr < block.end:
+        n = min(page_size - addr % page_size, block.end - addr)
+        yield addr, view[addr - block.addr:addr - block.addr + n]
+        addr += n
+
+
+def download(chip: ChipInterface, path: str | Path, page_size: int = PAGE_SIZE,
+             max_gap: int = MAX_GAP) -> FirmwareReport:
+    """Load the image at *path* into *chip*, writing only the pages whose
+    on-chip CRC differs from the image (or, without ``chip.target_crc``,
+    those the per-probe cache does not list as loaded)."""
+    start = time.perf_counter()
+    report = FirmwareReport(str(path))
+    verify = chip.target_crc
+    with _cache_lock:
+        cache = _loaded_pages.setdefault(chip.probe_id, {})
+
+    for block in coalesce(load_image(path), max_gap):
+        pages = [(addr, view, zlib.crc32(view)) for addr, view in _pages(block, page_size)]
+        report.bytes_total += len(block.data)
+
+        # Fast path: the cache says this whole block is loaded; confirm with one check
+        if all(cache.get(addr) == crc for addr, _, crc in pages) \
+                and (not verify
+                     or chip.mem_crc32(block.addr, len(block.data)) == zlib.crc32(block.data)):
+            report.bytes_skipped += len(block.data)
+            report.pages_skipped += len(pages)
+            continue
+
+        run_addr, run, run_crcs = None, [], []
+        for addr, view, crc in pages + [(None, None, None)]:
+            if addr is None:
+                dirty = False
+            elif verify:
+                dirty = chip.mem_crc32(addr, len(view)) != crc
+            else:
+                dirty = cache.get(addr) != crc
+            if dirty:
+                if not run:
+                    run_addr = addr
+                run.append(view)
+                run_crcs.append((addr, crc))
+                report.pages_written += 1
+                report.bytes_transferred += len(view)
+            else:
+                if run:
+                    chip.mem_write(run_addr, b"".join(run))
+                    report.bursts += 1
+                    # Only now: if the burst failed the pages are not loaded
+                    cache.update(run_crcs)
+                    run, run_crcs = [], []
+                if addr is not None:
+                    report.pages_skipped += 1
+                    report.bytes_skipped += len(view)
+                    cache[addr] = crc
+
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,154 @@
+import time
+
+from .chip_interface import ChipInterface, ChipProxy, RegOp
+
+# Latency histogram buckets: bucket b counts calls taking [2**(b-1), 2**b) ns
+HIST_BUCKETS = 40
+
+OPS = ("reg_read", "reg_write", "mem_read", "mem_write", "execute_ops",
+       "mem_crc32", "reset", "halt", "run", "download_firmware")
+
+# Per-test counters as user properties / CSV columns, in end_test() key order
+PROPERTY_NAMES = [f"jtag_{key}" for key in (*OPS, "batched_ops", "time_ns", "retries")]
+
+
+class OpStats:
+    """Call count, total time and log2 latency histogram of one operation."""
+    __slots__ = ("calls", "total_ns", "hist")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.hist = [0] * HIST_BUCKETS
+
+    def clear(self) -> None:
+        self.calls = 0
+        self.total_ns = 0
+        hist = self.hist
+        for b in range(HIST_BUCKETS):
+            hist[b] = 0
+
+    def add(self, ns: int) -> None:
+        self.calls += 1
+        self.total_ns += ns
+        self.hist[min(ns.bit_length(), HIST_BUCKETS - 1)] += 1
+
+    def merge(self, other: "OpStats") -> None:
+        self.calls += other.calls
+        self.total_ns += other.total_ns
+        for b, count in enumerate(other.hist):
+            self.hist[b] += count
+
+    def percentile_ns(self, q: float) -> int:
+        """Upper bound of the bucket holding the *q* quantile (0..1)."""
+        target = q * self.calls
+        seen = 0
+        for b, count in enumerate(self.hist):
+            seen += count
+            if count and seen >= target:
+                return 1 << b
+        return 0
+
+
+class InstrumentedChip(ChipProxy):
+    """Counts and times the accesses reaching the wrapped chip.
+
+    Counters are preallocated and updated in place; nothing is logged per
+    call.  ``begin_test()`` / ``end_test()`` bracket one test and return its
+    numbers, while ``session`` accumulates them.  Retries are read from the
+    inner driver's ``retry_count`` (see ``JtagImpl._retry``).
+
+    ``download_firmware`` counts as one call timed as a whole: the driver
+    runs the CRC checks and memory writes itself, below this layer."""
+
+    def __init__(self, inner: ChipInterface):
+        super().__init__(inner)
+        self.current = {op: OpStats() for op in OPS}
+        self.session = {op: OpStats() for op in OPS}
+        self.batched_ops = 0
+        self._retries_at_start = 0
+
+    def _retry_count(self) -> int:
+        return getattr(self.inner, "retry_count", 0)
+
+    def begin_test(self) -> None:
+        for stats in self.current.values():
+            stats.clear()
+        self.batched_ops = 0
+        self._retries_at_start = self._retry_count()
+
+    def end_test(self) -> dict[str, int]:
+        """Fold the current test into the session totals and return its counters."""
+        for op, stats in self.current.items():
+            self.session[op].merge(stats)
+        return {
+            **{op: self.current[op].calls for op in OPS},
+            "batched_ops": self.batched_ops,
+            "time_ns": sum(s.total_ns for s in self.current.values()),
+            "retries": self._retry_count() - self._retries_at_start,
+        }
+
+    def reg_read(self, addr: int) -> int:
+        start = time.perf_counter_ns()
+        try:
+            return self.inner.reg_read(addr)
+        finally:
+            self.current["reg_read"].add(time.perf_counter_ns() - start)
+
+    def reg_write(self, addr: int, value: int) -> None:
+        start = time.perf_counter_ns()
+        try:
+            self.inner.reg_write(addr, value)
+        finally:
+            self.current["reg_write"].add(time.perf_counter_ns() - start)
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        start = time.perf_counter_ns()
+        try:
+            self.inner.execute_ops(ops)
+        finally:
+            self.current["execute_ops"].add(time.perf_counter_ns() - start)
+            self.batched_ops += len(ops)
+
+    def mem_read(self, addr: int, size: int) -> bytes:
+        start = time.perf_counter_ns()
+        try:
+            return self.inner.mem_read(addr, size)
+        finally:
+            self.current["mem_read"].add(time.perf_counter_ns() - start)
+
+    def mem_readinto(self, addr: int, buf) -> int:
+        start = time.perf_counter_ns()
+        try:
+            return self.inner.mem_readinto(addr, buf)
+        finally:
+            self.current["mem_read"].add(time.perf_counter_ns() - start)
+
+    def mem_write(self, addr: int, data: bytes) -> None:
+        start = time.perf_counter_ns()
+        try:
+            self.inner.mem_write(addr, data)
+        finally:
+            self.current["mem_write"].add(time.perf_counter_ns() - start)
+
+    def _timed(self, op: str, func, *args):
+        start = time.perf_counter_ns()
+        try:
+            return func(*args)
+        finally:
+            self.current[op].add(time.perf_counter_ns() - start)
+
+    def mem_crc32(self, addr: int, size: int) -> int:
+        return self._timed("mem_crc32", self.inner.mem_crc32, addr, size)
+
+    def reset(self) -> None:
+        self._timed("reset", self.inner.reset)
+
+    def halt(self) -> None:
+        self._timed("halt", self.inner.halt)
+
+    def run(self) -> None:
+        self._timed("run", self.inner.run)
+
+    def download_firmware(self, path: str):
+        return self._timed("download_firmware", self.inner.download_firmware, path)
@@ -1,52 +1,220 @@
+import random
+import threading
 import time
+import zlib
 from collections import defaultdict
+from dataclasses import dataclass
+
+from . import firmware
+from .chip_interface import ChipInterface, JtagError, ProbeUnavailableError, RegOp
+
+
+@dataclass
+class RetryPolicy:
+    """Attempts per access and the exponential backoff between them.
+
+    The n-th retry waits ``min(max_delay, base_delay * multiplier**n)``,
+    shortened by up to *jitter* (a fraction) at random so that two probes
+    failing together do not retry in lockstep."""
+    max_attempts: int = 3
+    base_delay: float = 0.005  # seconds
+    max_delay: float = 0.2
+    multiplier: float = 2.0
+    jitter: float = 0.5
+
+    def delay(self, retry: int, rng: random.Random) -> float:
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** retry)
+        return delay * (1.0 - self.jitter * rng.random())
+
+
+class CircuitBreaker:
+    """Per-probe breaker: after *failure_threshold* consecutive failed
+    attempts it opens and accesses fail fast with ProbeUnavailableError.
+    After *reset_timeout* seconds one trial access is let through
+    (half-open); success closes the breaker, failure re-opens it."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 5.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.fast_fails = 0
+        self._opened_at = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == "open"
+
+    def before_call(self, name: str) -> None:
+        if self.state != "open":
+            return
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = "half-open"
+            return
+        self.fast_fails += 1
+        raise ProbeUnavailableError(
+            f"{name}: probe circuit open after {self.consecutive_failures} consecutive failures"
+        )
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == "half-open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Retries allowed for a whole session, shared by every probe."""
+
+    def __init__(self, max_retries: int):
+        self.max_retries = max_retries
+        self.used = 0
+        self._lock = threading.Lock()
 
-from .chip_interface import ChipInterface, JtagError
+    @property
+    def remaining(self) -> int:
+        return self.max_retries - self.used
+
+    def take(self) -> bool:
+        """Consume one retry; False once the budget is spent."""
+        with self._lock:
+            if self.used >= self.max_retries:
+                return False
+            self.used += 1
+            return True
 
 
 class JtagImpl(ChipInterface):
-    """Real JTAG driver skeleton. Methods raise NotImplementedError
-    until a concrete toolchain (e.g. pyftdi / OpenOCD) is integrated."""
-
-    MAX_RETRIES = 3
-    RETRY_DELAY = 0.05  # seconds
-
-    def _retry(self, func, *args):
-        """Execute *func* with up to MAX_RETRIES attempts."""
-        last_err = None
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                return func(*args)
-            except JtagError as e:
-                last_err = e
-                time.sleep(self.RETRY_DELAY)
-        raise JtagError(
-            f"{self.name}: operation failed after {self.MAX_RETRIES} retries: {last_err}"
-        )
+    """Real JTAG driver skeleton. Transport methods raise NotImplementedError
+    until a concrete toolchain (e.g. pyftdi / OpenOCD) is integrated.
+
+    Every probe access goes through ``_retry`` under a per-probe lock, so
+    one instance can be shared by several threads (see DualChipExecutor).
+    Failed attempts are retried with backoff (RetryPolicy) while the
+    session RetryBudget lasts; the CircuitBreaker turns a dead probe into
+    immediate ProbeUnavailableError instead of a full retry cycle per
+    access.
+
+    ``mem_crc32`` reads the block back unless the toolchain provides
+    ``_mem_crc32`` (e.g. a flash stub computing it on the target) and sets
+    ``target_crc``."""
+
+    def __init__(self, probe_id: str, name: str = "", policy: RetryPolicy | None = None,
+                 breaker: CircuitBreaker | None = None, budget: RetryBudget | None = None):
+        super().__init__(probe_id, name)
+        self._lock = threading.RLock()
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.budget = budget
+        self._rng = random.Random()
+        self.retry_count = 0    # retries issued
+        self.failure_count = 0  # accesses that failed after all attempts
+
+    def retry_stats(self) -> dict[str, int | str]:
+        return {
+            "retries": self.retry_count,
+            "failures": self.failure_count,
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "fast_fails": self.breaker.fast_fails,
+            "budget_remaining": self.budget.remaining if self.budget else -1,
+        }
+
+    def _retry(self, func, *args, attempts: int | None = None):
+        """Execute *func* with retries per the policy (at most *attempts*
+        tries if given), holding the probe lock."""
+        max_attempts = attempts or self.policy.max_attempts
+        with self._lock:
+            self.breaker.before_call(self.name)
+            attempt = 0
+            while True:
+                try:
+                    result = func(*args)
+                except JtagError as e:
+                    attempt += 1
+                    self.breaker.record_failure()
+                    if (attempt >= max_attempts or self.breaker.is_open
+                            or (self.budget is not None and not self.budget.take())):
+                        self.failure_count += 1
+                        raise JtagError(
+                            f"{self.name}: operation failed after {attempt} attempt(s): {e}"
+                        ) from e
+                    self.retry_count += 1
+                    time.sleep(self.policy.delay(attempt - 1, self._rng))
+                else:
+                    self.breaker.record_success()
+                    return result
 
     def reg_read(self, addr: int) -> int:
-        raise NotImplementedError("Real JTAG reg_read not yet implemented")
+        return self._retry(self._reg_read, addr)
 
     def reg_write(self, addr: int, value: int) -> None:
-        raise NotImplementedError("Real JTAG reg_write not yet implemented")
+        self._retry(self._reg_write, addr, value)
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        # Hold the probe for the whole batch so other threads cannot interleave
+        with self._lock:
+            super().execute_ops(ops)
 
     def mem_read(self, addr: int, size: int) -> bytes:
-        raise NotImplementedError("Real JTAG mem_read not yet implemented")
+        return self._retry(self._mem_read, addr, size)
 
     def mem_write(self, addr: int, data: bytes) -> None:
-        raise NotImplementedError("Real JTAG mem_write not yet implemented")
+        self._retry(self._mem_write, addr, data)
+
+    def mem_crc32(self, addr: int, size: int) -> int:
+        if self.target_crc:
+            return self._retry(self._mem_crc32, addr, size)
+        return super().mem_crc32(addr, size)
 
     def reset(self) -> None:
-        raise NotImplementedError("Real JTAG reset not yet implemented")
+        self._retry(self._reset)
 
     def halt(self) -> None:
-        raise NotImplementedError("Real JTAG halt not yet implemented")
+        self._retry(self._halt)
 
     def run(self) -> None:
-        raise NotImplementedError("Real JTAG run not yet implemented")
+        self._retry(self._run)
+
+    def download_firmware(self, path: str) -> firmware.FirmwareReport:
+        """Halt the core and load only the pages of *path* that differ
+        from what the chip already holds (see ``firmware.download``)."""
+        with self._lock:
+            self.halt()
+            return firmware.download(self, path)
+
+    # -- transport (toolchain specific) --------------------------------------
 
-    def download_firmware(self, path: str) -> None:
-        raise NotImplementedError("Real JTAG download_firmware not yet implemented")
+    def _reg_read(self, addr: int) -> int:
+        raise NotImplementedError("Real JTAG reg_read not yet implemented")
+
+    def _reg_write(self, addr: int, value: int) -> None:
+        raise NotImplementedError("Real JTAG reg_write not yet implemented")
+
+    def _mem_read(self, addr: int, size: int) -> bytes:
+        raise NotImplementedError("Real JTAG mem_read not yet implemented")
+
+    def _mem_write(self, addr: int, data: bytes) -> None:
+        raise NotImplementedError("Real JTAG mem_write not yet implemented")
+
+    def _mem_crc32(self, addr: int, size: int) -> int:
+        raise NotImplementedError("Real JTAG mem_crc32 not yet implemented")
+
+    def _reset(self) -> None:
+        raise NotImplementedError("Real JTAG reset not yet implemented")
+
+    def _halt(self) -> None:
+        raise NotImplementedError("Real JTAG halt not yet implemented")
+
+    def _run(self) -> None:
+        raise NotImplementedError("Real JTAG run not yet implemented")
 
 
 # ---------------------------------------------------------------------------
@@ -68,127 +236,189 @@ _EXTI_PR = 0x14
 
 # GPIO port bases used to identify which port an address belongs to
 _PORT_BASES = [0x40020000, 0x40020400, 0x40020800]
-_PORT_SIZE = 0x400
+_PORT_SIZE = 0x400  # power of two: ports are decoded by addr // _PORT_SIZE
+_PORT_BY_BLOCK = {base // _PORT_SIZE: base for base in _PORT_BASES}
+
+# Mock memory is sparse: fixed-size pages allocated on first write
+_PAGE_SIZE = 0x1000
+_ZERO_PAGE = memoryview(bytes(_PAGE_SIZE))
+
+
+def _compress2(field_bits: int) -> int:
+    """Gather bit 0 of every 2-bit field (bits 0, 2, 4, ...) into a 16-bit mask."""
+    x = field_bits & 0x55555555
+    x = (x | (x >> 1)) & 0x33333333
+    x = (x | (x >> 2)) & 0x0F0F0F0F
+    x = (x | (x >> 4)) & 0x00FF00FF
+    x = (x | (x >> 8)) & 0x0000FFFF
+    return x
+
+
+def _field_eq_01(reg: int) -> int:
+    """Pin mask of the 2-bit fields of *reg* equal to 0b01."""
+    return _compress2(reg & ~(reg >> 1))
+
+
+def _route_masks(pins: list[tuple[int, int]]) -> tuple[tuple[int, int], ...]:
+    """Turn (source pin, destination pin) links into (shift, source mask)
+    groups: every pin moved by the same distance shares one group, so
+    straight wiring is a single shift of 0."""
+    groups: dict[int, int] = {}
+    for src, dst in pins:
+        groups[dst - src] = groups.get(dst - src, 0) | (1 << src)
+    return tuple(sorted(groups.items()))
 
 
 class MockJtagImpl(ChipInterface):
     """Mock JTAG implementation that simulates GPIO register behaviour
-    using an in-memory dict.  Two instances can be linked via *set_peer*
-    so that one MCU's output is visible as the other's input."""
+    using an in-memory dict.  Chips placed on a MockBoard see each other's
+    outputs as inputs through the board's nets; *set_peer* is shorthand
+    for a two-chip board with every pin wired straight across.
+
+    Pin logic is evaluated for a whole port at once with bitmask algebra.
+    Memory is a sparse set of bytearray pages copied with slice operations.
+    Other registers are plain storage unless described with
+    *define_registers*."""
+
+    target_crc = True
 
     def __init__(self, probe_id: str, name: str = ""):
         super().__init__(probe_id, name)
         self._regs: dict[int, int] = defaultdict(int)
-        self._mem: dict[int, int] = {}
-        self._peer: "MockJtagImpl | None" = None
-        # Track previous ODR values per port for EXTI edge detection
-        self._prev_odr: dict[int, int] = defaultdict(int)
-
-    def set_peer(self, other: "MockJtagImpl") -> None:
-        """Link two mock instances so they can see each other's outputs."""
-        self._peer = other
-        other._peer = self
+        # addr -> (reset, writable, w1c, readable) for define_registers()
+        self._model: dict[int, tuple[int, int, int, int]] = {}
+        self._pages: dict[int, bytearray] = {}
+        # Wiring compiled by MockBoard, keyed by port base.  routes_in: the
+        # ports driving this one, as (their regs, MODER, OTYPER and ODR
+        # addresses, route masks); routes_out: the chips this port drives,
+        # as (their regs, route masks).
+        self._routes_in: dict[int, tuple] = {}
+        self._routes_out: dict[int, tuple] = {}
+        self.board: "MockBoard | None" = None
+        # Number of probe round trips served (a flushed batch counts once)
+        self.scan_count = 0
+        # Linked mocks share one lock since writes on one side touch the other
+        self._lock = threading.RLock()
+
+    def set_peer(self, other: "MockJtagImpl") -> "MockBoard":
+        """Link two mock instances so they can see each other's outputs,
+        every GPIO pin wired to the same port and pin on the other chip."""
+        return MockBoard.straight([self, other])
+
+    def define_registers(self, specs) -> None:
+        """Give registers access semantics: *specs* yields
+        ``(addr, reset, writable, w1c, readable)`` masks.  Writes only land
+        in *writable* bits, a 1 written to a *w1c* bit clears it, bits
+        outside *readable* read as 0 and ``reset()`` restores *reset*."""
+        with self._lock:
+            for addr, reset, writable, w1c, readable in specs:
+                self._model[addr] = (reset, writable, w1c, readable)
+                self._regs[addr] = reset
 
     # -- helpers -------------------------------------------------------------
 
     def _is_gpio_addr(self, addr: int) -> bool:
-        for base in _PORT_BASES:
-            if base <= addr < base + _PORT_SIZE:
-                return True
-        return False
+        return addr // _PORT_SIZE in _PORT_BY_BLOCK
 
     def _port_base_of(self, addr: int) -> int | None:
-        for base in _PORT_BASES:
-            if base <= addr < base + _PORT_SIZE:
-                return base
-        return None
+        return _PORT_BY_BLOCK.get(addr // _PORT_SIZE)
 
-    def _get_pin_mode(self, port_base: int, pin: int) -> int:
-        """Return 2-bit MODER value for a pin (0=input,1=output,2=AF,3=analog)."""
-        moder = self._regs[port_base + _MODER_OFFSET]
-        return (moder >> (pin * 2)) & 0x3
-
-    def _get_pull(self, port_base: int, pin: int) -> int:
-        """Return 2-bit PUPDR value (0=none,1=up,2=down)."""
-        pupdr = self._regs[port_base + _PUPDR_OFFSET]
-        return (pupdr >> (pin * 2)) & 0x3
+    def _output_mask(self, port_base: int) -> int:
+        """Pins of a port in output mode (MODER == 01)."""
+        return _field_eq_01(self._regs[port_base + _MODER_OFFSET])
 
     def _compute_idr(self, port_base: int) -> int:
-        """Compute the IDR value for a GPIO port based on peer's ODR
-        and local MODER/PUPDR settings."""
-        idr = 0
-        for pin in range(16):
-            mode = self._get_pin_mode(port_base, pin)
-            bit = self._compute_pin_input(port_base, pin, mode)
-            if bit:
-                idr |= (1 << pin)
-        return idr
-
-    def _compute_pin_input(self, port_base: int, pin: int, mode: int) -> int:
-        """Compute what a single pin reads as input.
-
-        Logic:
-        - If this pin is output mode, IDR reflects own ODR.
-        - If this pin is input mode and peer's matching pin is output,
-          IDR reflects peer's ODR bit.
-        - If peer is floating (input, no drive), use local PUPDR
-          (pull-up → 1, pull-down → 0, none → 0).
+        """Compute the IDR value for a GPIO port from the board wiring and
+        local MODER/PUPDR settings.
+
+        Per pin:
+        - Output mode: IDR mirrors own ODR.
+        - Otherwise the pin follows the outputs wired to it that actively
+          drive (push-pull, or open-drain writing 0); a net driven both
+          ways reads 0.  Open-drain high leaves the line floating.
+        - A floating line reads the local pull: pull-up -> 1, else 0.
         """
-        # Output mode: IDR mirrors own ODR
-        if mode == 1:  # output
-            odr = self._regs[port_base + _ODR_OFFSET]
-            return (odr >> pin) & 1
-
-        # Input mode: check peer
-        if self._peer is not None:
-            peer_mode = self._peer._get_pin_mode(port_base, pin)
-            if peer_mode == 1:  # peer is driving output
-                peer_odr = self._peer._regs[port_base + _ODR_OFFSET]
-                peer_bit = (peer_odr >> pin) & 1
-                # Open-drain: if peer outputs 1 with open-drain, line is floating
-                peer_otype = self._peer._regs[port_base + _OTYPER_OFFSET]
-                peer_od = (peer_otype >> pin) & 1
-                if peer_od == 1 and peer_bit == 1:
-                    # Open-drain high = floating, fall through to pull
-                    pass
+        regs = self._regs
+        out = self._output_mask(port_base)
+        pull_up = _field_eq_01(regs[port_base + _PUPDR_OFFSET])
+        idr = regs[port_base + _ODR_OFFSET] & out
+
+        high = low = 0
+        for src_regs, moder, otyper, odr_addr, masks in self._routes_in.get(port_base, ()):
+            odr = src_regs[odr_addr]
+            drive = _field_eq_01(src_regs[moder]) & ~(src_regs[otyper] & odr)
+            drive_high, drive_low = drive & odr, drive & ~odr
+            for shift, mask in masks:
+                if shift >= 0:
+                    high |= (drive_high & mask) << shift
+                    low |= (drive_low & mask) << shift
                 else:
-                    return peer_bit
+                    high |= (drive_high & mask) >> -shift
+                    low |= (drive_low & mask) >> -shift
 
-        # No external drive — use pull resistor
-        pull = self._get_pull(port_base, pin)
-        if pull == 1:  # pull-up
-            return 1
-        return 0  # pull-down or none
+        inputs = ~out
+        idr |= inputs & high & ~low
+        idr |= inputs & ~(high | low) & pull_up
+        return idr & 0xFFFF
 
     def _update_exti_on_odr_change(self, port_base: int, old_odr: int, new_odr: int) -> None:
-        """When this MCU's ODR changes, check if the peer has EXTI
-        configured on matching pins and set the peer's PR bits."""
-        if self._peer is None:
-            return
-        changed = old_odr ^ new_odr
+        """When this MCU's ODR changes, set the EXTI PR bits of the chips
+        wired to the changed pins where rising/falling detection is enabled."""
+        changed = (old_odr ^ new_odr) & 0xFFFF
         if changed == 0:
             return
-
-        peer_imr = self._peer._regs[_EXTI_BASE + _EXTI_IMR]
-        peer_rtsr = self._peer._regs[_EXTI_BASE + _EXTI_RTSR]
-        peer_ftsr = self._peer._regs[_EXTI_BASE + _EXTI_FTSR]
-
-        for pin in range(16):
-            if not (changed & (1 << pin)):
-                continue
-            if not (peer_imr & (1 << pin)):
+        rising = changed & new_odr
+        falling = changed & old_odr
+        for dst_regs, masks in self._routes_out.get(port_base, ()):
+            imr = dst_regs[_EXTI_BASE + _EXTI_IMR]
+            if not imr:
                 continue
-            old_bit = (old_odr >> pin) & 1
-            new_bit = (new_odr >> pin) & 1
-            rising = (old_bit == 0 and new_bit == 1)
-            falling = (old_bit == 1 and new_bit == 0)
-            if (rising and (peer_rtsr & (1 << pin))) or \
-               (falling and (peer_ftsr & (1 << pin))):
-                self._peer._regs[_EXTI_BASE + _EXTI_PR] |= (1 << pin)
+            dst_rising = dst_falling = 0
+            for shift, mask in masks:
+                if shift >= 0:
+                    dst_rising |= (rising & mask) << shift
+                    dst_falling |= (falling & mask) << shift
+                else:
+                    dst_rising |= (rising & mask) >> -shift
+                    dst_falling |= (falling & mask) >> -shift
+            triggered = imr & ((dst_rising & dst_regs[_EXTI_BASE + _EXTI_RTSR])
+                               | (dst_falling & dst_regs[_EXTI_BASE + _EXTI_FTSR]))
+            if triggered:
+                dst_regs[_EXTI_BASE + _EXTI_PR] |= triggered
 
     # -- public interface ----------------------------------------------------
 
     def reg_read(self, addr: int) -> int:
+        with self._lock:
+            self.scan_count += 1
+            return self._reg_read(addr)
+
+    def reg_write(self, addr: int, value: int) -> None:
+        with self._lock:
+            self.scan_count += 1
+            self._reg_write(addr, value)
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        """Apply a queued batch as one scan sequence.  Ops run strictly in
+        order, so side effects (BSRR -> ODR -> peer EXTI PR) land exactly
+        as they would with individual accesses."""
+        with self._lock:
+            self.scan_count += 1
+            self._execute_ops(ops)
+
+    def _execute_ops(self, ops: list[RegOp]) -> None:
+        for op in ops:
+            if op.kind == "write":
+                self._reg_write(op.addr, op.value)
+            elif op.kind == "modify":
+                reg_val = self._reg_read(op.addr)
+                reg_val = (reg_val & ~op.mask) | (op.value & op.mask)
+                self._reg_write(op.addr, reg_val)
+                op.resolve(reg_val)
+            else:
+                op.resolve(self._reg_read(op.addr))
+
+    def _reg_read(self, addr: int) -> int:
         port_base = self._port_base_of(addr)
         if port_base is not None:
             offset = addr - port_base
@@ -198,9 +428,12 @@ class MockJtagImpl(ChipInterface):
             # BSRR is write-only, always reads as 0
             if offset == _BSRR_OFFSET:
                 return 0
+        model = self._model.get(addr)
+        if model is not None:
+            return self._regs[addr] & model[3]
         return self._regs[addr] & 0xFFFFFFFF
 
-    def reg_write(self, addr: int, value: int) -> None:
+    def _reg_write(self, addr: int, value: int) -> None:
         value = value & 0xFFFFFFFF
         port_base = self._port_base_of(addr)
 
@@ -227,19 +460,75 @@ class MockJtagImpl(ChipInterface):
             self._update_exti_on_odr_change(port_base, old_odr, value)
             return
 
+        model = self._model.get(addr)
+        if model is not None:
+            _, writable, w1c, _ = model
+            old = self._regs[addr]
+            self._regs[addr] = ((old & ~writable) | (value & writable)) & ~(value & w1c)
+            return
+
         self._regs[addr] = value
 
     def mem_read(self, addr: int, size: int) -> bytes:
-        return bytes(self._mem.get(addr + i, 0) for i in range(size))
+        with self._lock:
+            self.scan_count += 1
+            page_no, offset = divmod(addr, _PAGE_SIZE)
+            if offset + size <= _PAGE_SIZE:
+                # Single page: one copy straight out of the page
+                page = self._pages.get(page_no)
+                view = memoryview(page) if page is not None else _ZERO_PAGE
+                return view[offset:offset + size].tobytes()
+            return b"".join(self._page_views(addr, size))
+
+    def mem_readinto(self, addr: int, buf) -> int:
+        with self._lock:
+            self.scan_count += 1
+            dest = memoryview(buf).cast("B")
+            pos = 0
+            for chunk in self._page_views(addr, len(dest)):
+                dest[pos:pos + len(chunk)] = chunk
+                pos += len(chunk)
+            return pos
 
     def mem_write(self, addr: int, data: bytes) -> None:
-        for i, b in enumerate(data):
-            self._mem[addr + i] = b
+        with self._lock:
+            self.scan_count += 1
+            src = memoryview(data).cast("B")
+            pos = 0
+            while pos < len(src):
+                page_no, offset = divmod(addr + pos, _PAGE_SIZE)
+                n = min(_PAGE_SIZE - offset, len(src) - pos)
+                page = self._pages.get(page_no)
+                if page is None:
+                    page = self._pages[page_no] = bytearray(_PAGE_SIZE)
+                page[offset:offset + n] = src[pos:pos + n]
+                pos += n
+
+    def mem_crc32(self, addr: int, size: int) -> int:
+        with self._lock:
+            self.scan_count += 1
+            crc = 0
+            for chunk in self._page_views(addr, size):
+                crc = zlib.crc32(chunk, crc)
+            return crc
+
+    def _page_views(self, addr: int, size: int):
+        """Yield read-only views covering [addr, addr + size), page by page."""
+        end = addr + size
+        while addr < end:
+            page_no, offset = divmod(addr, _PAGE_SIZE)
+            n = min(_PAGE_SIZE - offset, end - addr)
+            page = self._pages.get(page_no)
+            view = memoryview(page) if page is not None else _ZERO_PAGE
+            yield view[offset:offset + n]
+            addr += n
 
     def reset(self) -> None:
-        self._regs.clear()
-        self._mem.clear()
-        self._prev_odr.clear()
+        with self._lock:
+            self._regs.clear()
+            self._pages.clear()
+            for addr, (reset, *_) in self._model.items():
+                self._regs[addr] = reset
 
     def halt(self) -> None:
         pass
@@ -247,5 +536,149 @@ class MockJtagImpl(ChipInterface):
     def run(self) -> None:
         pass
 
-    def download_firmware(self, path: str) -> None:
-        pass
+    def download_firmware(self, path: str) -> firmware.FirmwareReport:
+        with self._lock:
+            return firmware.download(self, path)
+
+
+class MockBoard:
+    """Nets wiring the GPIO pins of several MockJtagImpl chips together.
+
+    A net is a list of ``(chip index, port base, pin)`` endpoints.  The
+    wiring is compiled into per-port routes on each chip: for every pair of
+    connected (chip, port)s, the pins grouped by how far the wiring moves
+    them (one group for straight wiring).  Resolving an IDR or propagating
+    an ODR edge then costs one step per connected port and group, however
+    many pins and chips share nets.  All chips on a board share one lock,
+    since a write on one chip changes what the others read."""
+
+    def __init__(self, chips: list[MockJtagImpl], nets=()):
+        self.chips = list(chips)
+        self.nets: list[list[tuple[int, int, int]]] = [list(net) for net in nets]
+        lock = threading.RLock()
+        for chip in self.chips:
+            chip._lock = lock
+            chip.board = self
+        self._compile()
+
+    @classmethod
+    def straight(cls, chips: list[MockJtagImpl]) -> "MockBoard":
+        """Every GPIO pin of each chip wired to the same port and pin of all the others."""
+        return cls(chips, [[(i, base, pin) for i in range(len(chips))]
+                           for base in _PORT_BASES for pin in range(16)])
+
+    @classmethod
+    def from_pin_map(cls, pin_map, chips: list[MockJtagImpl], reg_map) -> "MockBoard":
+        """Board for a two-MCU rig: ``chips`` are (MCU-A, MCU-B), wired as
+        the pin map's pin pairs say.  Excluded pins are left unconnected.
+        *reg_map* (GpioRegMap) gives the port base addresses."""
+        ports = reg_map.ports
+        excluded = {(p["port"], p["pin"]) for p in pin_map.excluded_pins}
+        nets = [[(0, ports[pp.mcu_a_port].base_addr, pp.mcu_a_pin),
+                 (1, ports[pp.mcu_b_port].base_addr, pp.mcu_b_pin)]
+                for pp in pin_map.pin_pairs
+                if (pp.mcu_a_port, pp.mcu_a_pin) not in excluded
+                and (pp.mcu_b_port, pp.mcu_b_pin) not in excluded]
+        return cls(chips, nets)
+
+    @classmethod
+    def from_nets(cls, chips: dict[str, MockJtagImpl], nets, reg_map) -> "MockBoard":
+        """Board for any topology: each net lists ``(chip name, port name,
+        pin)`` endpoints, e.g. a bus shared by three chips."""
+        index = {name: i for i, name in enumerate(chips)}
+        ports = reg_map.ports
+        return cls(list(chips.values()),
+                   [[(index[chip], ports[port].base_addr, pin) for chip, port, pin in net]
+                    for net in nets])
+
+    def connect(self, *endpoints: tuple[int, int, int]) -> None:
+        """Add one net joining ``(chip index, port base, pin)`` endpoints."""
+        with self.chips[0]._lock:
+            self.nets.append(list(endpoints))
+            self._compile()
+
+    def _compile(self) -> None:
+        # (dst chip, dst port, src chip, src port) -> [(src pin, dst pin)]
+        links: dict[tuple[int, int, int, int], list[tuple[int, int]]] = defaultdict(list)
+        for net in self.nets:
+            for src, src_base, src_pin in net:
+                for dst, dst_base, dst_pin in net:
+                    if (src, src_base, src_pin) != (dst, dst_base, dst_pin):
+                        links[dst, dst_base, src, src_base].append((src_pin, dst_pin))
+
+        routes_in = [defaultdict(list) for _ in self.chips]
+        routes_out = [defaultdict(list) for _ in self.chips]
+        for (dst, dst_base, src, src_base), pins in links.items():
+            masks = _route_masks(pins)
+            src_regs = self.chips[src]._regs
+            routes_in[dst][dst_base].append((
+                src_regs, src_base + _MODER_OFFSET, src_base + _OTYPER_OFFSET,
+                src_base + _ODR_OFFSET, masks))
+            routes_out[src][src_base].append((self.chips[dst]._regs, masks))
+        for chip, r_in, r_out in zip(self.chips, routes_in, routes_out):
+            chip._routes_in = {base: tuple(r) for base, r in r_in.items()}
+            chip._routes_out = {base: tuple(r) for base, r in r_out.items()}
+
+
+class FaultyJtagImpl(JtagImpl):
+    """JtagImpl whose transport is a MockJtagImpl that fails at random.
+
+    Each transport call raises JtagError with probability *fault_rate*
+    (1.0 simulates a dead probe), so the retry, breaker and budget logic
+    of JtagImpl run for real.  Attributes not defined here (``scan_count``,
+    ``define_registers``, ...) are looked up on the backend."""
+
+    target_crc = True
+
+    def __init__(self, backend: MockJtagImpl, fault_rate: float = 0.0, seed: int | None = None,
+                 **kwargs):
+        super().__init__(backend.probe_id, backend.name, **kwargs)
+        self.backend = backend
+        self.fault_rate = fault_rate
+        self.injected = 0
+        self._fault_rng = random.Random(seed)
+
+    def __getattr__(self, name):
+        if name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def set_peer(self, other) -> None:
+        self.backend.set_peer(getattr(other, "backend", other))
+
+    def _inject(self) -> None:
+        if self.fault_rate and self._fault_rng.random() < self.fault_rate:
+            self.injected += 1
+            raise JtagError(f"{self.name}: injected fault")
+
+    def _reg_read(self, addr: int) -> int:
+        self._inject()
+        return self.backend.reg_read(addr)
+
+    def _reg_write(self, addr: int, value: int) -> None:
+        self._inject()
+        self.backend.reg_write(addr, value)
+
+    def _mem_read(self, addr: int, size: int) -> bytes:
+        self._inject()
+        return self.backend.mem_read(addr, size)
+
+    def _mem_write(self, addr: int, data: bytes) -> None:
+        self._inject()
+        self.backend.mem_write(addr, data)
+
+    def _mem_crc32(self, addr: int, size: int) -> int:
+        self._inject()
+        return self.backend.mem_crc32(addr, size)
+
+    def _reset(self) -> None:
+        self._inject()
+        self.backend.reset()
+
+    def _halt(self) -> None:
+        self._inject()
+        self.backend.halt()
+
+    def _run(self) -> None:
+        self._inject()
+        self.backend.run()
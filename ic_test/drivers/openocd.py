@@ -0,0 +1,275 @@
+"""JtagImpl backend speaking OpenOCD's TCL RPC protocol.
+
+OpenOCD listens on port 6666 for Tcl commands, each terminated by a 0x1A
+byte, and answers every command with its result, also 0x1A terminated.
+Commands are processed in order, so many can be sent back to back and the
+answers collected afterwards: a batch of register accesses costs one TCP
+round trip instead of one per access.
+
+Registers go through ``mdw`` / ``mww`` and a small helper proc for
+read-modify-write; memory blocks go through ``read_memory`` /
+``write_memory`` (OpenOCD 0.11 or later), split into chunks of
+``MEM_CHUNK_WORDS`` words.  Every command is wrapped in ``catch`` so that
+a failing access comes back as an error instead of an indistinguishable
+result string.
+
+The connection is opened on first use and dropped on any socket error;
+the JtagError raised then goes through the normal retry policy of
+JtagImpl, whose next attempt reconnects.
+"""
+import socket
+import sys
+from array import array
+
+from .chip_interface import JtagError, RegOp
+from .jtag_impl import JtagImpl
+
+DEFAULT_PORT = 6666
+TERMINATOR = b"\x1a"
+
+# Commands sent per pipelined write before reading their answers back; keeps
+# both socket directions from filling up at the same time.
+PIPELINE_DEPTH = 512
+MEM_CHUNK_WORDS = 4096
+
+# Defined on every new connection; lets a "modify" op run without a round trip
+RMW_PROC = "ic_test_rmw"
+_RMW_DEFINITION = (
+    f"proc {RMW_PROC} {{addr mask value}} {{"
+    " set v [expr {([lindex [read_memory $addr 32 1] 0] & ~$mask) | $value}];"
+    " mww $addr $v; return $v }"
+)
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """Split ``host[:port]`` into host and port."""
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, DEFAULT_PORT
+    return host, int(port)
+
+
+def _wrap(command: str) -> str:
+    """Return a command whose result is ``<code> <result>`` as a Tcl list."""
+    return f"list [catch {{{command}}} _r] $_r"
+
+
+def _unwrap(reply: str) -> tuple[bool, str]:
+    """Split a wrapped reply into (ok, result)."""
+    code, _, result = reply.partition(" ")
+    if result.startswith("{") and result.endswith("}"):
+        result = result[1:-1]
+    return code == "0", result
+
+
+def _parse_mdw(result: str) -> int:
+    """Value of a one-word ``mdw`` answer such as ``0x40020014: 0000a5a5``."""
+    return int(result.partition(":")[2].split()[0], 16)
+
+
+def words_to_bytes(words) -> bytes:
+    """Little-endian bytes of 32-bit words (the target byte order)."""
+    buf = array("I", words)
+    if sys.byteorder == "big":
+        buf.byteswap()
+    return buf.tobytes()
+
+
+def bytes_to_words(data) -> array:
+    buf = array("I")
+    buf.frombytes(data)
+    if sys.byteorder == "big":
+        buf.byteswap()
+    return buf
+
+
+class OpenOcdJtagImpl(JtagImpl):
+    """JtagImpl over one persistent OpenOCD TCL RPC connection.
+
+    *address* is ``host[:port]`` of the OpenOCD instance driving this
+    probe.  ``execute_ops`` sends a whole transaction in one pipelined
+    write.  Only read-only batches are retried.  When a batch with writes
+    fails part way, some of its commands may already have run (OpenOCD
+    runs the pipelined commands after a failing one, and a dropped
+    connection loses the replies of commands that did), and running them
+    again is not safe: a second write of 1 to EXTI PR, or a BSRR/ODR
+    sequence replayed, adds edges or clears flags the test checks.  Such
+    a batch is sent once, after connecting with retries, and its failure
+    is reported.
+
+    OpenOCD has no command returning the CRC of a memory block, so
+    ``target_crc`` stays off and firmware downloads trust the per-probe
+    page cache instead of reading the image back."""
+
+    def __init__(self, probe_id: str, name: str = "", address: str = "localhost",
+                 timeout: float = 5.0, **kwargs):
+        super().__init__(probe_id, name, **kwargs)
+        self.host, self.port = parse_address(address)
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._rx = bytearray()
+        self.connects = 0    # connections opened, including reconnects
+        self.round_trips = 0
+        self.commands = 0
+
+    # -- connection ------------------------------------------------------------
+
+    def _alive(self) -> bool:
+        """False if OpenOCD has closed the connection; no round trip."""
+        try:
+            self._sock.setblocking(False)
+            try:
+                return self._sock.recv(1, socket.MSG_PEEK) != b""
+            finally:
+                self._sock.settimeout(self.timeout)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _connect(self) -> socket.socket:
+        # Reconnect before sending rather than lose a batch to a dead socket
+        if self._sock is not None and not self._alive():
+            self.close()
+        if self._sock is None:
+            try:
+                sock = socket.create_connection((self.host, self.port), self.timeout)
+            except OSError as e:
+                raise JtagError(f"{self.name}: cannot connect to OpenOCD at "
+                                f"{self.host}:{self.port}: {e}") from e
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._sock = sock
+            self._rx.clear()
+            self.connects += 1
+            self._send([_RMW_DEFINITION])
+        return self._sock
+
+    def close(self) -> None:
+        """Drop the connection; the next access reconnects."""
+        with self._lock:
+            if self._sock is not None:
+                try:
+                    self._sock.close()
+                except OSError:
+                    pass
+            self._sock = None
+            self._rx.clear()
+
+    def _send(self, commands: list[str]) -> list[str]:
+        """Send *commands* in one write and return their raw replies."""
+        sock = self._sock
+        try:
+            sock.sendall(TERMINATOR.join(c.encode() for c in commands) + TERMINATOR)
+            replies = []
+            rx = self._rx
+            while len(replies) < len(commands):
+                end = rx.find(TERMINATOR)
+                if end < 0:
+                    chunk = sock.recv(1 << 16)
+                    if not chunk:
+                        raise ConnectionResetError("connection closed by OpenOCD")
+                    rx += chunk
+                    continue
+                replies.append(rx[:end].decode())
+                del rx[:end + 1]
+        except OSError as e:
+            self.close()
+            raise JtagError(f"{self.name}: OpenOCD connection lost: {e}") from e
+        self.round_trips += 1
+        self.commands += len(commands)
+        return replies
+
+    def command(self, *commands: str) -> list[str]:
+        """Run Tcl commands in one round trip and return their results;
+        raise JtagError on the first that failed."""
+        self._connect()
+        results = []
+        for start in range(0, len(commands), PIPELINE_DEPTH):
+            chunk = commands[start:start + PIPELINE_DEPTH]
+            for cmd, reply in zip(chunk, self._send([_wrap(c) for c in chunk])):
+                ok, result = _unwrap(reply)
+                if not ok:
+                    raise JtagError(f"{self.name}: '{cmd[:60]}' failed: {result.strip()}")
+                results.append(result)
+        return results
+
+    # -- batches ---------------------------------------------------------------
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        if all(op.kind == "read" for op in ops):
+            self._retry(self._execute_ops, ops)
+            return
+        self._retry(self._connect)
+        self._retry(self._execute_ops, ops, attempts=1)
+
+    def _execute_ops(self, ops: list[RegOp]) -> None:
+        commands = []
+        for op in ops:
+            if op.kind == "write":
+                commands.append(f"mww 0x{op.addr:x} 0x{op.value:x}")
+            elif op.kind == "modify":
+                commands.append(f"{RMW_PROC} 0x{op.addr:x} 0x{op.mask:x} 0x{op.value & op.mask:x}")
+            else:
+                commands.append(f"mdw 0x{op.addr:x}")
+        for op, result in zip(ops, self.command(*commands)):
+            if op.kind == "read":
+                op.resolve(_parse_mdw(result))
+            elif op.kind == "modify":
+                op.resolve(int(result, 0) & 0xFFFFFFFF)
+
+    # -- transport -------------------------------------------------------------
+
+    def _reg_read(self, addr: int) -> int:
+        return _parse_mdw(self.command(f"mdw 0x{addr:x}")[0])
+
+    def _reg_write(self, addr: int, value: int) -> None:
+        self.command(f"mww 0x{addr:x} 0x{value & 0xFFFFFFFF:x}")
+
+    def _mem_read(self, addr: int, size: int) -> bytes:
+        commands, widths = [], []
+        for start, width, count in _mem_chunks(addr, size):
+            commands.append(f"read_memory 0x{start:x} {width} {count}")
+            widths.append(width)
+        out = bytearray()
+        for width, result in zip(widths, self.command(*commands)):
+            values = [int(tok, 16) for tok in result.split()]
+            out += words_to_bytes(values) if width == 32 else bytes(values)
+        return bytes(out)
+
+    def _mem_write(self, addr: int, data: bytes) -> None:
+        data = memoryview(data).cast("B")
+        commands = []
+        for start, width, count in _mem_chunks(addr, len(data)):
+            piece = data[start - addr:start - addr + count * width // 8]
+            values = bytes_to_words(piece) if width == 32 else piece
+            commands.append(f"write_memory 0x{start:x} {width} "
+                            f"{{{' '.join(map(hex, values))}}}")
+        self.command(*commands)
+
+    def _reset(self) -> None:
+        self.command("reset halt")
+
+    def _halt(self) -> None:
+        self.command("halt")
+
+    def _run(self) -> None:
+        self.command("resume")
+
+
+def _mem_chunks(addr: int, size: int):
+    """Yield (addr, width, count) pieces covering [addr, addr + size):
+    bytes up to the first word boundary, whole words in chunks, then the
+    trailing bytes."""
+    end = addr + size
+    head = min(-addr % 4, size)
+    if head:
+        yield addr, 8, head
+        addr += head
+    words = (end - addr) // 4
+    while words:
+        count = min(words, MEM_CHUNK_WORDS)
+        yield addr, 32, count
+        addr += 4 * count
+        words -= count
+    if addr < end:
+        yield addr, 8, end - addr
@@ -0,0 +1,210 @@
+"""Local stand-in for an OpenOCD TCL RPC server, backed by MockJtagImpl.
+
+Lets OpenOcdJtagImpl (and its pipelining, bulk memory and reconnects) be
+exercised without a probe:
+
+    python -m ic_test.drivers.openocd_standin [--port 6666]
+
+serves two linked mock chips on ``--port`` (MCU-A) and ``--port + 1``
+(MCU-B).  Only the commands the backend sends are understood -- ``mdw``,
+``mww``, ``read_memory``, ``write_memory``, ``reset``, ``halt``,
+``resume`` and the backend's read-modify-write helper, which is
+implemented natively rather than by interpreting its ``proc`` body.
+Register commands map to the mock's registers and the memory commands to
+its memory.
+"""
+import argparse
+import re
+import socket
+import socketserver
+import threading
+import time
+
+from .chip_interface import JtagError
+from .jtag_impl import MockJtagImpl
+from .openocd import RMW_PROC, TERMINATOR, bytes_to_words, words_to_bytes
+
+_WRAPPED = re.compile(r"list \[catch \{(.*)\} _r\] \$_r", re.DOTALL)
+
+
+class _CommandError(Exception):
+    pass
+
+
+def _tcl_word(text: str) -> str:
+    """Quote *text* as one element of a Tcl list."""
+    if not text or any(c.isspace() for c in text):
+        return "{" + text + "}"
+    return text
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server: OpenOcdStandIn = self.server.standin
+        sock = self.request
+        server._opened(sock)
+        buf = bytearray()
+        try:
+            while True:
+                chunk = sock.recv(1 << 16)
+                if not chunk:
+                    return
+                buf += chunk
+                *commands, rest = buf.split(TERMINATOR)
+                if not commands:
+                    continue
+                buf = bytearray(rest)
+                # Answer everything that arrived together in one write
+                replies = [server.execute(c.decode()).encode() for c in commands]
+                if server.latency:
+                    time.sleep(server.latency)
+                sock.sendall(TERMINATOR.join(replies) + TERMINATOR)
+        except OSError:
+            return
+        finally:
+            server._closed(sock)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class OpenOcdStandIn:
+    """TCL RPC server for one mock chip, run in a background thread.
+
+    *latency* (seconds) delays every answer, to model the round trip of a
+    real probe behind USB or a network."""
+
+    def __init__(self, chip: MockJtagImpl, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0):
+        self.chip = chip
+        self.latency = latency
+        self._server = _Server((host, port), _Handler, bind_and_activate=True)
+        self._server.standin = self
+        self._thread: threading.Thread | None = None
+        self._clients: set[socket.socket] = set()
+        self._clients_lock = threading.Lock()
+        self.connections = 0
+        self.commands = 0
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> "OpenOcdStandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name=f"openocd-{self.chip.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self.drop_connections()
+
+    def __enter__(self) -> "OpenOcdStandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def drop_connections(self) -> None:
+        """Close every client connection, as a crashed or restarted OpenOCD would."""
+        with self._clients_lock:
+            clients, self._clients = self._clients, set()
+        for sock in clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _opened(self, sock) -> None:
+        with self._clients_lock:
+            self._clients.add(sock)
+            self.connections += 1
+
+    def _closed(self, sock) -> None:
+        with self._clients_lock:
+            self._clients.discard(sock)
+
+    # -- commands --------------------------------------------------------------
+
+    def execute(self, line: str) -> str:
+        """Run one command line and return the reply text."""
+        self.commands += 1
+        match = _WRAPPED.fullmatch(line.strip())
+        if match is None:
+            try:
+                return self._run(line.strip())
+            except (_CommandError, JtagError) as e:
+                return str(e)
+        try:
+            return f"0 {_tcl_word(self._run(match.group(1)))}"
+        except (_CommandError, JtagError, ValueError) as e:
+            return f"1 {_tcl_word(str(e))}"
+
+    def _run(self, command: str) -> str:
+        name, _, args = command.partition(" ")
+        chip = self.chip
+        if name == "proc":
+            return ""
+        if name == "mdw":
+            addr, *count = (int(a, 0) for a in args.split())
+            values = [chip.reg_read(addr + 4 * i) for i in range(count[0] if count else 1)]
+            return f"0x{addr:08x}: " + " ".join(f"{v:08x}" for v in values) + " \n"
+        if name == "mww":
+            addr, value = (int(a, 0) for a in args.split())
+            chip.reg_write(addr, value)
+            return ""
+        if name == RMW_PROC:
+            addr, mask, value = (int(a, 0) for a in args.split())
+            new = (chip.reg_read(addr) & ~mask) | (value & mask)
+            chip.reg_write(addr, new)
+            return str(new)
+        if name == "read_memory":
+            addr, width, count = (int(a, 0) for a in args.split())
+            data = chip.mem_read(addr, count * width // 8)
+            values = bytes_to_words(data) if width == 32 else data
+            return " ".join(map(hex, values))
+        if name == "write_memory":
+            addr, width, values = args.split(" ", 2)
+            addr, width = int(addr, 0), int(width)
+            values = [int(v, 16) for v in values.strip("{}").split()]
+            chip.mem_write(addr, words_to_bytes(values) if width == 32 else bytes(values))
+            return ""
+        if name == "reset":
+            chip.reset()
+            return ""
+        if name == "halt":
+            chip.halt()
+            return ""
+        if name == "resume":
+            chip.run()
+            return ""
+        raise _CommandError(f'invalid command name "{name}"')
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="OpenOCD TCL RPC stand-in (two linked mock chips)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6666,
+                        help="Port for MCU-A; MCU-B listens on the next one")
+    args = parser.parse_args(argv)
+    chip_a = MockJtagImpl("STANDIN-A", name="MCU-A")
+    chip_b = MockJtagImpl("STANDIN-B", name="MCU-B")
+    chip_a.set_peer(chip_b)
+    servers = [OpenOcdStandIn(chip_a, args.host, args.port).start(),
+               OpenOcdStandIn(chip_b, args.host, args.port + 1).start()]
+    for server in servers:
+        print(f"{server.chip.name}: {server.address}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
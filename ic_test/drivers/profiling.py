@@ -0,0 +1,85 @@
+import time
+
+from .chip_interface import ChipInterface, ChipProxy, RegOp
+
+
+class ProfilingChip(ChipProxy):
+    """Wall time spent in each ChipInterface method called through it.
+
+    Unlike InstrumentedChip, which counts the accesses reaching the probe,
+    this sits above the other driver layers and times what the framework
+    calls: ``reg_write_field`` is one ``reg_write_field`` however the
+    layers below implement it.  ``take()`` returns and clears the numbers
+    of the current test; ``session`` accumulates them."""
+
+    def __init__(self, inner: ChipInterface):
+        super().__init__(inner)
+        self.current: dict[str, list[int]] = {}   # method -> [calls, ns]
+        self.session: dict[str, list[int]] = {}
+
+    def total_ns(self) -> int:
+        """Time in the driver so far in the current test."""
+        return sum(ns for _, ns in self.current.values())
+
+    def take(self) -> dict[str, list[int]]:
+        """Fold the current test into the session totals and return its numbers."""
+        current, self.current = self.current, {}
+        for method, (calls, ns) in current.items():
+            stats = self.session.setdefault(method, [0, 0])
+            stats[0] += calls
+            stats[1] += ns
+        return current
+
+    def _timed(self, method: str, func, *args):
+        start = time.perf_counter_ns()
+        try:
+            return func(*args)
+        finally:
+            stats = self.current.get(method)
+            if stats is None:
+                stats = self.current[method] = [0, 0]
+            stats[0] += 1
+            stats[1] += time.perf_counter_ns() - start
+
+    def reg_read(self, addr: int) -> int:
+        return self._timed("reg_read", self.inner.reg_read, addr)
+
+    def reg_write(self, addr: int, value: int) -> None:
+        self._timed("reg_write", self.inner.reg_write, addr, value)
+
+    def reg_read_field(self, addr: int, bit_offset: int, bit_width: int) -> int:
+        return self._timed("reg_read_field", self.inner.reg_read_field, addr, bit_offset, bit_width)
+
+    def reg_write_field(self, addr: int, bit_offset: int, bit_width: int, value: int) -> None:
+        self._timed("reg_write_field", self.inner.reg_write_field,
+                    addr, bit_offset, bit_width, value)
+
+    def reg_write_masked(self, addr: int, mask: int, value: int) -> None:
+        self._timed("reg_write_masked", self.inner.reg_write_masked, addr, mask, value)
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        self._timed("execute_ops", self.inner.execute_ops, ops)
+
+    def mem_read(self, addr: int, size: int) -> bytes:
+        return self._timed("mem_read", self.inner.mem_read, addr, size)
+
+    def mem_write(self, addr: int, data: bytes) -> None:
+        self._timed("mem_write", self.inner.mem_write, addr, data)
+
+    def mem_readinto(self, addr: int, buf) -> int:
+        return self._timed("mem_readinto", self.inner.mem_readinto, addr, buf)
+
+    def mem_crc32(self, addr: int, size: int) -> int:
+        return self._timed("mem_crc32", self.inner.mem_crc32, addr, size)
+
+    def reset(self) -> None:
+        self._timed("reset", self.inner.reset)
+
+    def halt(self) -> None:
+        self._timed("halt", self.inner.halt)
+
+    def run(self) -> None:
+        self._timed("run", self.inner.run)
+
+    def download_firmware(self, path: str):
+        return self._timed("download_firmware", self.inner.download_firmware, path)
@@ -0,0 +1,120 @@
+from typing import Iterable
+
+from .chip_interface import ChipInterface, ChipProxy, RegOp
+
+
+class ShadowRegChip(ChipProxy):
+    """Write-through shadow register cache in front of a ChipInterface.
+
+    Keeps the last-known value of registers that only change when written
+    over JTAG, so ``reg_write_field``/``reg_write_masked`` become a single
+    write instead of a read-modify-write.  Plain ``reg_read`` and
+    ``reg_read_field`` always go to the chip (readback tests must see real
+    hardware) and refresh the shadow.
+
+    The shadow is dropped on ``reset()``, ``run()`` and
+    ``download_firmware()`` since firmware may reconfigure peripherals.
+
+    Only read-modify-writes benefit.  VectorEngine already models the GPIO
+    registers and sends plain writes, so G-01 ~ G-16 see no hits or
+    misses; the cache helps GpioHelper field writes in other tests."""
+
+    def __init__(self, inner: ChipInterface, cacheable: Iterable[int],
+                 aliases: dict[int, Iterable[int]] | None = None):
+        super().__init__(inner)
+        self._cacheable = frozenset(cacheable)
+        # Write-only registers whose writes modify cached registers (BSRR -> ODR)
+        self._aliases = {addr: tuple(regs) for addr, regs in (aliases or {}).items()}
+        self._shadow: dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_reg_map(cls, inner: ChipInterface, reg_map) -> "ShadowRegChip":
+        """Build a shadow cache whose volatility follows the register map's
+        ``access`` attributes."""
+        return cls(inner, reg_map.cacheable_addrs(), reg_map.write_aliases())
+
+    def invalidate(self, addr: int | None = None) -> None:
+        """Forget one shadowed register, or all of them."""
+        if addr is None:
+            self._shadow.clear()
+        else:
+            self._shadow.pop(addr, None)
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters; every hit is one JTAG read saved."""
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self._shadow)}
+
+    def reg_read(self, addr: int) -> int:
+        value = self.inner.reg_read(addr)
+        if addr in self._cacheable:
+            self._shadow[addr] = value
+        return value
+
+    def reg_write(self, addr: int, value: int) -> None:
+        self.inner.reg_write(addr, value)
+        if addr in self._cacheable:
+            self._shadow[addr] = value & 0xFFFFFFFF
+        else:
+            for alias in self._aliases.get(addr, ()):
+                self._shadow.pop(alias, None)
+
+    def reg_write_masked(self, addr: int, mask: int, value: int) -> None:
+        """Write the bits of *mask* using the shadowed register value when known."""
+        if addr not in self._cacheable:
+            super().reg_write_masked(addr, mask, value)
+            return
+        reg_val = self._shadow.get(addr)
+        if reg_val is None:
+            self.misses += 1
+            reg_val = self.reg_read(addr)
+        else:
+            self.hits += 1
+        reg_val = (reg_val & ~mask) | (value & mask)
+        self.reg_write(addr, reg_val)
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        """Turn field writes on shadowed registers into plain writes, then
+        replay the executed batch onto the shadow in order."""
+        known = dict(self._shadow)
+        batch = []
+        for op in ops:
+            if op.kind == "modify" and op.addr in self._cacheable:
+                reg_val = known.get(op.addr)
+                if reg_val is None:
+                    self.misses += 1
+                    batch.append(op)
+                    continue
+                self.hits += 1
+                reg_val = (reg_val & ~op.mask) | (op.value & op.mask)
+                known[op.addr] = reg_val
+                batch.append(RegOp("write", op.addr, reg_val))
+                continue
+            if op.kind == "write":
+                if op.addr in self._cacheable:
+                    known[op.addr] = op.value & 0xFFFFFFFF
+                for alias in self._aliases.get(op.addr, ()):
+                    known.pop(alias, None)
+            batch.append(op)
+
+        self.inner.execute_ops(batch)
+
+        for op in batch:
+            if op.addr in self._cacheable:
+                self._shadow[op.addr] = op.value & 0xFFFFFFFF
+            elif op.kind == "write":
+                for alias in self._aliases.get(op.addr, ()):
+                    self._shadow.pop(alias, None)
+
+    def reset(self) -> None:
+        self.invalidate()
+        self.inner.reset()
+
+    def run(self) -> None:
+        self.invalidate()
+        self.inner.run()
+
+    def download_firmware(self, path: str):
+        self.invalidate()
+        return self.inner.download_firmware(path)
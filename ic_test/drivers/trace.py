@@ -0,0 +1,601 @@
+"""Record probe traffic to a trace file and replay it without hardware.
+
+RecordingChip wraps any ChipInterface and appends every access that
+reaches it to a compact binary trace.  Each record holds the operation,
+the address, the value or bytes moved and the time since the previous
+access.  ReplayChipInterface serves such a trace back as a chip.  Reads
+return the recorded values and writes are checked against the recording.
+Nothing is timed, so a suite recorded once on a real rig can be re-run
+at memory speed, for example to work on the report pipeline.
+
+Trace format: the header ``JTRC``, a version byte, the probe ID and the
+chip name.  Then come the records: an opcode byte followed by unsigned
+LEB128 varints (the time delta in microseconds, the address, then the
+operation's payload) and raw bytes for memory blocks.
+
+In strict mode (the default) the replay must repeat the recorded access
+sequence exactly.  The first access that differs raises
+TraceDivergenceError, naming the record that was expected.  In loose
+mode, reads are matched per address and a read with no recording left
+returns the last value known for that address, so a test that changed
+its access pattern can still run.
+"""
+import argparse
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterator, NamedTuple
+
+from .chip_interface import ChipInterface, ChipProxy, JtagError, RegOp
+
+if TYPE_CHECKING:
+    from .firmware import FirmwareReport
+
+MAGIC = b"JTRC"
+VERSION = 1
+SUFFIX = ".jtrace"
+
+# Opcodes, in the order of the names below (opcode = index + 1)
+OP_NAMES = ("reg_read", "reg_write", "mem_read", "mem_write", "mem_crc32",
+            "execute_ops", "reset", "halt", "run", "download_firmware")
+_OPCODES = {name: code for code, name in enumerate(OP_NAMES, 1)}
+_BATCH_KINDS = ("read", "write", "modify")
+
+_FLUSH_BYTES = 1 << 16
+
+
+class TraceDivergenceError(JtagError):
+    """A strict replay saw an access that differs from the recording."""
+    pass
+
+
+class TraceRecord(NamedTuple):
+    """One recorded access.
+
+    *value* depends on *op*.  It is the register value for ``reg_read``
+    and ``reg_write``, and the bytes for ``mem_read`` and ``mem_write``.
+    For ``mem_crc32`` it is ``(size, crc)``.  For ``execute_ops`` it is a
+    tuple of ``(kind, addr, value, mask)`` with each op's resolved value,
+    and for ``download_firmware`` it is the image path."""
+    op: str
+    addr: int
+    value: object
+    delta_us: int
+
+
+class TraceHeader(NamedTuple):
+    probe_id: str
+    name: str
+
+
+def trace_path(directory: str | Path, name: str) -> Path:
+    """Trace file of chip *name* in *directory*."""
+    return Path(directory) / f"{name}{SUFFIX}"
+
+
+# -- encoding ------------------------------------------------------------------
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(data: bytes, pos: int) -> tuple[int, int]:
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _put_str(out: bytearray, text: str) -> None:
+    raw = text.encode()
+    _put_varint(out, len(raw))
+    out += raw
+
+
+def _get_str(data: bytes, pos: int) -> tuple[str, int]:
+    size, pos = _get_varint(data, pos)
+    return data[pos:pos + size].decode(), pos + size
+
+
+def encode_record(out: bytearray, record: TraceRecord) -> None:
+    """Append the binary form of *record* to *out*."""
+    op, addr, value, delta_us = record
+    out.append(_OPCODES[op])
+    _put_varint(out, delta_us)
+    if op in ("reset", "halt", "run"):
+        return
+    if op == "download_firmware":
+        _put_str(out, value)
+        return
+    _put_varint(out, addr)
+    if op in ("reg_read", "reg_write"):
+        _put_varint(out, value)
+    elif op in ("mem_read", "mem_write"):
+        _put_varint(out, len(value))
+        out += value
+    elif op == "mem_crc32":
+        _put_varint(out, value[0])
+        _put_varint(out, value[1])
+    else:
+        # execute_ops: addr holds the op count
+        for kind, op_addr, op_value, mask in value:
+            out.append(_BATCH_KINDS.index(kind))
+            _put_varint(out, op_addr)
+            _put_varint(out, op_value)
+            if kind == "modify":
+                _put_varint(out, mask)
+
+
+def _decode_record(data: bytes, pos: int) -> tuple[TraceRecord, int]:
+    op = OP_NAMES[data[pos] - 1]
+    delta_us, pos = _get_varint(data, pos + 1)
+    if op in ("reset", "halt", "run"):
+        return TraceRecord(op, 0, None, delta_us), pos
+    if op == "download_firmware":
+        path, pos = _get_str(data, pos)
+        return TraceRecord(op, 0, path, delta_us), pos
+    addr, pos = _get_varint(data, pos)
+    if op in ("reg_read", "reg_write"):
+        value, pos = _get_varint(data, pos)
+    elif op in ("mem_read", "mem_write"):
+        size, pos = _get_varint(data, pos)
+        value, pos = bytes(data[pos:pos + size]), pos + size
+    elif op == "mem_crc32":
+        size, pos = _get_varint(data, pos)
+        crc, pos = _get_varint(data, pos)
+        value = (size, crc)
+    else:
+        ops = []
+        for _ in range(addr):
+            kind = _BATCH_KINDS[data[pos]]
+            op_addr, pos = _get_varint(data, pos + 1)
+            op_value, pos = _get_varint(data, pos)
+            mask = 0
+            if kind == "modify":
+                mask, pos = _get_varint(data, pos)
+            ops.append((kind, op_addr, op_value, mask))
+        value = tuple(ops)
+    return TraceRecord(op, addr, value, delta_us), pos
+
+
+def read_trace(path: str | Path) -> tuple[TraceHeader, list[TraceRecord]]:
+    """Load a whole trace file."""
+    data = Path(path).read_bytes()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path}: not a JTAG trace")
+    if data[4] != VERSION:
+        raise ValueError(f"{path}: unsupported trace version {data[4]}")
+    probe_id, pos = _get_str(data, 5)
+    name, pos = _get_str(data, pos)
+    records = []
+    try:
+        while pos < len(data):
+            record, pos = _decode_record(data, pos)
+            records.append(record)
+    except IndexError:
+        raise ValueError(f"{path}: truncated after {len(records)} records") from None
+    return TraceHeader(probe_id, name), records
+
+
+class TraceWriter:
+    """Buffered appender of encoded records to one trace file."""
+
+    def __init__(self, path: str | Path, probe_id: str, name: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: BinaryIO | None = open(self.path, "wb")
+        self._buf = bytearray(MAGIC)
+        self._buf.append(VERSION)
+        _put_str(self._buf, probe_id)
+        _put_str(self._buf, name)
+        self.records = 0
+
+    def append(self, record: TraceRecord) -> None:
+        encode_record(self._buf, record)
+        self.records += 1
+        if len(self._buf) >= _FLUSH_BYTES:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._file is not None and self._buf:
+            self._file.write(self._buf)
+            self._file.flush()
+            self._buf.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# -- recording -----------------------------------------------------------------
+
+class RecordingChip(ChipProxy):
+    """Writes every access reaching the wrapped chip to a trace file.
+
+    Only accesses that complete are recorded.  A failed access raises as
+    usual and leaves no record; retries inside the inner driver are not
+    visible here.  Call ``close()`` to flush the trace, and the inner
+    chip's ``close()`` runs as well.  ``download_firmware`` is recorded as
+    a single opaque record, not as the memory traffic it causes."""
+
+    def __init__(self, inner: ChipInterface, path: str | Path):
+        super().__init__(inner)
+        self.writer = TraceWriter(path, inner.probe_id, inner.name)
+        self._lock = threading.Lock()
+        self._last_ns = time.perf_counter_ns()
+
+    def close(self) -> None:
+        with self._lock:
+            self.writer.close()
+        close = getattr(self.inner, "close", None)
+        if close is not None:
+            close()
+
+    def _record(self, start_ns: int, op: str, addr: int = 0, value=None) -> None:
+        # Called with self._lock held; the delta is measured between access starts
+        delta_us = max(0, start_ns - self._last_ns) // 1000
+        self._last_ns = start_ns
+        self.writer.append(TraceRecord(op, addr, value, delta_us))
+
+    def reg_read(self, addr: int) -> int:
+        with self._lock:
+            start = time.perf_counter_ns()
+            value = self.inner.reg_read(addr)
+            self._record(start, "reg_read", addr, value)
+        return value
+
+    def reg_write(self, addr: int, value: int) -> None:
+        with self._lock:
+            start = time.perf_counter_ns()
+            self.inner.reg_write(addr, value)
+            self._record(start, "reg_write", addr, value & 0xFFFFFFFF)
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        with self._lock:
+            start = time.perf_counter_ns()
+            self.inner.execute_ops(ops)
+            self._record(start, "execute_ops", len(ops),
+                         tuple((op.kind, op.addr, op.value, op.mask) for op in ops))
+
+    def mem_read(self, addr: int, size: int) -> bytes:
+        with self._lock:
+            start = time.perf_counter_ns()
+            data = self.inner.mem_read(addr, size)
+            self._record(start, "mem_read", addr, bytes(data))
+        return data
+
+    def mem_readinto(self, addr: int, buf) -> int:
+        with self._lock:
+            start = time.perf_counter_ns()
+            n = self.inner.mem_readinto(addr, buf)
+            self._record(start, "mem_read", addr, memoryview(buf).cast("B")[:n].tobytes())
+        return n
+
+    def mem_write(self, addr: int, data: bytes) -> None:
+        with self._lock:
+            start = time.perf_counter_ns()
+            self.inner.mem_write(addr, data)
+            self._record(start, "mem_write", addr, bytes(data))
+
+    def mem_crc32(self, addr: int, size: int) -> int:
+        with self._lock:
+            start = time.perf_counter_ns()
+            crc = self.inner.mem_crc32(addr, size)
+            self._record(start, "mem_crc32", addr, (size, crc))
+        return crc
+
+    def reset(self) -> None:
+        with self._lock:
+            start = time.perf_counter_ns()
+            self.inner.reset()
+            self._record(start, "reset")
+
+    def halt(self) -> None:
+        with self._lock:
+            start = time.perf_counter_ns()
+            self.inner.halt()
+            self._record(start, "halt")
+
+    def run(self) -> None:
+        with self._lock:
+            start = time.perf_counter_ns()
+            self.inner.run()
+            self._record(start, "run")
+
+    def download_firmware(self, path: str) -> "FirmwareReport | None":
+        with self._lock:
+            start = time.perf_counter_ns()
+            report = self.inner.download_firmware(path)
+            self._record(start, "download_firmware", value=str(path))
+        return report
+
+
+# -- replay --------------------------------------------------------------------
+
+def _describe(record: TraceRecord) -> str:
+    op, addr, value, _ = record
+    if op in ("reset", "halt", "run"):
+        return f"{op}()"
+    if op == "download_firmware":
+        return f"{op}({value!r})"
+    if op in ("mem_read", "mem_write"):
+        return f"{op}(0x{addr:08X}, {len(value)} bytes)"
+    if op == "mem_crc32":
+        return f"{op}(0x{addr:08X}, {value[0]})"
+    if op == "execute_ops":
+        return f"{op}({addr} ops)"
+    if op == "reg_write":
+        return f"{op}(0x{addr:08X}, 0x{value:08X})"
+    return f"{op}(0x{addr:08X}) = 0x{value:08X}"
+
+
+def _describe_access(op: str, addr: int, detail) -> str:
+    """Like _describe, for an access being replayed (*detail* as passed to
+    ``ReplayChipInterface._next``)."""
+    if op in ("reset", "halt", "run"):
+        return f"{op}()"
+    if op == "download_firmware":
+        return f"{op}({detail!r})"
+    if op == "reg_write":
+        return f"{op}(0x{addr:08X}, 0x{detail:08X})"
+    if op in ("mem_read", "mem_crc32"):
+        return f"{op}(0x{addr:08X}, {detail})"
+    if op == "mem_write":
+        return f"{op}(0x{addr:08X}, {len(detail)} bytes)"
+    if op == "execute_ops":
+        return f"{op}({addr} ops)"
+    return f"{op}(0x{addr:08X})"
+
+
+def _describe_batch_op(op: tuple) -> str:
+    kind, addr, value, mask = op
+    if kind == "read":
+        return f"read 0x{addr:08X}"
+    if kind == "write":
+        return f"write 0x{addr:08X} = 0x{value:08X}"
+    return f"modify 0x{addr:08X} mask 0x{mask:08X} = 0x{value:08X}"
+
+
+def _matches(record: TraceRecord, detail) -> bool:
+    """Whether an access with *detail* repeats *record*: the written value
+    or bytes, the size read, or for a batch each op's kind, address and
+    written bits."""
+    op, value = record.op, record.value
+    if op in ("reg_read", "reset", "halt", "run"):
+        return True
+    if op == "mem_read":
+        return len(value) == detail
+    if op == "mem_crc32":
+        return value[0] == detail
+    if op == "execute_ops":
+        for (kind, addr, recorded, mask), (q_kind, q_addr, q_value, q_mask) in zip(value, detail):
+            if kind != q_kind or addr != q_addr:
+                return False
+            if kind == "write" and recorded != q_value:
+                return False
+            # A modify records the register value it wrote
+            if kind == "modify" and (mask != q_mask or recorded & mask != q_value & mask):
+                return False
+        return True
+    return value == detail
+
+
+class ReplayChipInterface(ChipInterface):
+    """ChipInterface answering from a recorded trace instead of a probe.
+
+    *strict* checks that every access repeats the next record: same
+    operation, address, size and written values.  *pace* scales the
+    recorded gaps between accesses; 0 (the default) replays at memory
+    speed and 1.0 at the recorded speed."""
+
+    def __init__(self, header: TraceHeader, records: list[TraceRecord],
+                 strict: bool = True, pace: float = 0.0):
+        super().__init__(header.probe_id, header.name)
+        self.records = records
+        self.strict = strict
+        self.pace = pace
+        self.position = 0    # records consumed (strict)
+        self.served = 0      # accesses answered
+        self.misses = 0      # loose reads with no recorded value left
+        self._lock = threading.Lock()
+        # Loose mode: recorded results per (op, addr[, size]), and the last value seen
+        self._pending: dict[tuple, deque] = {}
+        self._last: dict[tuple, object] = {}
+        if not strict:
+            self._index(records)
+
+    @classmethod
+    def from_file(cls, path: str | Path, **kwargs) -> "ReplayChipInterface":
+        header, records = read_trace(path)
+        return cls(header, records, **kwargs)
+
+    def stats(self) -> dict[str, int]:
+        return {"records": len(self.records), "position": self.position,
+                "served": self.served, "misses": self.misses}
+
+    def _index(self, records: list[TraceRecord]) -> None:
+        pending = self._pending
+        for op, addr, value, _ in records:
+            if op == "reg_read":
+                pending.setdefault(("reg", addr), deque()).append(value)
+            elif op == "mem_read":
+                pending.setdefault(("mem", addr, len(value)), deque()).append(value)
+            elif op == "mem_crc32":
+                pending.setdefault(("crc", addr, value[0]), deque()).append(value[1])
+            elif op == "execute_ops":
+                for kind, op_addr, op_value, _mask in value:
+                    if kind != "write":
+                        pending.setdefault((kind if kind == "modify" else "reg", op_addr),
+                                           deque()).append(op_value)
+
+    # -- strict ----------------------------------------------------------------
+
+    def _next(self, op: str, addr: int = 0, detail=None) -> TraceRecord:
+        """Consume the next record, which must be *op* at *addr* with a
+        matching *detail* (see ``_matches``).  Called with self._lock held."""
+        if self.position >= len(self.records):
+            raise TraceDivergenceError(
+                f"{self.name}: {_describe_access(op, addr, detail)} past the end of "
+                f"the trace ({len(self.records)} records)")
+        record = self.records[self.position]
+        if record.op != op or record.addr != addr or not _matches(record, detail):
+            expected, got = _describe(record), _describe_access(op, addr, detail)
+            if expected == got and op == "execute_ops":
+                # Same batch size: name the first op that differs
+                i, want, have = next((i, r, d) for i, (r, d) in enumerate(zip(record.value, detail))
+                                     if not _matches(record._replace(value=(r,)), (d,)))
+                expected = f"{expected}, op {i} {_describe_batch_op(want)}"
+                got = _describe_batch_op(have)
+            elif expected == got and op == "mem_write":
+                # Same length: name the first byte that differs
+                i = next(i for i, (r, d) in enumerate(zip(record.value, detail)) if r != d)
+                expected = f"{expected}, byte {i} = 0x{record.value[i]:02X}"
+                got = f"{got}, byte {i} = 0x{detail[i]:02X}"
+            raise TraceDivergenceError(
+                f"{self.name}: record {self.position} is {expected}, got {got}")
+        self.position += 1
+        if self.pace and record.delta_us:
+            time.sleep(record.delta_us * self.pace / 1e6)
+        return record
+
+    # -- loose -----------------------------------------------------------------
+
+    def _pop(self, key: tuple, default):
+        queue = self._pending.get(key)
+        if queue:
+            value = queue.popleft()
+        else:
+            self.misses += 1
+            value = self._last.get(key, default)
+        self._last[key] = value
+        return value
+
+    # -- ChipInterface ---------------------------------------------------------
+
+    def reg_read(self, addr: int) -> int:
+        with self._lock:
+            self.served += 1
+            if self.strict:
+                return self._next("reg_read", addr).value
+            return self._pop(("reg", addr), 0)
+
+    def reg_write(self, addr: int, value: int) -> None:
+        value &= 0xFFFFFFFF
+        with self._lock:
+            self.served += 1
+            if self.strict:
+                self._next("reg_write", addr, value)
+            else:
+                # A later read with nothing recorded returns what was written
+                self._last["reg", addr] = value
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        with self._lock:
+            self.served += 1
+            if self.strict:
+                record = self._next("execute_ops", len(ops),
+                                    [(op.kind, op.addr, op.value, op.mask) for op in ops])
+                for op, (_kind, _addr, value, _mask) in zip(ops, record.value):
+                    if op.kind != "write":
+                        op.resolve(value)
+                return
+            for op in ops:
+                if op.kind == "write":
+                    self._last["reg", op.addr] = op.value
+                elif op.kind == "read":
+                    op.resolve(self._pop(("reg", op.addr), 0))
+                else:
+                    queue = self._pending.get(("modify", op.addr))
+                    if queue:
+                        value = queue.popleft()
+                    else:
+                        self.misses += 1
+                        last = self._last.get(("reg", op.addr), 0)
+                        value = (last & ~op.mask) | (op.value & op.mask)
+                    self._last["reg", op.addr] = value
+                    op.resolve(value)
+
+    def mem_read(self, addr: int, size: int) -> bytes:
+        with self._lock:
+            self.served += 1
+            if self.strict:
+                return self._next("mem_read", addr, size).value
+            return self._pop(("mem", addr, size), bytes(size))
+
+    def mem_write(self, addr: int, data: bytes) -> None:
+        with self._lock:
+            self.served += 1
+            if self.strict:
+                self._next("mem_write", addr, bytes(data))
+
+    def mem_crc32(self, addr: int, size: int) -> int:
+        with self._lock:
+            self.served += 1
+            if self.strict:
+                return self._next("mem_crc32", addr, size).value[1]
+            return self._pop(("crc", addr, size), 0)
+
+    def _control(self, op: str) -> None:
+        with self._lock:
+            self.served += 1
+            if self.strict:
+                self._next(op)
+
+    def reset(self) -> None:
+        self._control("reset")
+
+    def halt(self) -> None:
+        self._control("halt")
+
+    def run(self) -> None:
+        self._control("run")
+
+    def download_firmware(self, path: str) -> "FirmwareReport | None":
+        """Nothing is downloaded; the trace only records that it happened."""
+        with self._lock:
+            self.served += 1
+            if self.strict:
+                self._next("download_firmware", 0, str(path))
+        return None
+
+
+def iter_summary(records: list[TraceRecord]) -> Iterator[str]:
+    """Per-operation counts and recorded time of a trace, one line each."""
+    counts = dict.fromkeys(OP_NAMES, 0)
+    for record in records:
+        counts[record.op] += 1
+    for op, count in counts.items():
+        if count:
+            yield f"{op:18s} {count:8d}"
+    total_us = sum(r.delta_us for r in records)
+    yield f"{len(records)} records over {total_us / 1e6:.3f} s"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Print a JTAG trace file")
+    parser.add_argument("trace")
+    parser.add_argument("--records", type=int, default=0, metavar="N",
+                        help="Also list the first N records")
+    args = parser.parse_args(argv)
+    header, records = read_trace(args.trace)
+    print(f"{header.name} (probe {header.probe_id})")
+    for line in iter_summary(records):
+        print(line)
+    at_us = 0
+    for i, record in enumerate(records[:args.records]):
+        at_us += record.delta_us
+        print(f"{i:8d} {at_us / 1e3:12.3f} ms  {_describe(record)}")
+
+
+if __name__ == "__main__":
+    main()
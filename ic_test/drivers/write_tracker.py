@@ -0,0 +1,91 @@
+from typing import Iterable
+
+from .chip_interface import ChipInterface, ChipProxy, RegOp, RegSnapshot
+
+
+class WriteTracker(ChipProxy):
+    """Remembers which watched registers were written through it.
+
+    ``restore()`` then puts back only those registers, in one batch with no
+    reads, instead of reading the whole snapshot to compare.  Writes to an
+    alias (BSRR) mark the registers it modifies (ODR).  ``reset()``,
+    ``run()`` and ``download_firmware()`` mark every watched register,
+    since the state after them is not known.
+
+    ``writes`` counts the accesses that changed watched registers, so
+    callers keeping their own model of them can tell whether anyone else
+    wrote in the meantime.
+
+    Only accesses made through this proxy are seen, so it goes outermost
+    in the driver stack."""
+
+    def __init__(self, inner: ChipInterface, watched: Iterable[int],
+                 aliases: dict[int, Iterable[int]] | None = None):
+        super().__init__(inner)
+        self._watched = frozenset(watched)
+        self._aliases = {addr: tuple(a for a in regs if a in self._watched)
+                         for addr, regs in (aliases or {}).items()}
+        self.dirty: set[int] = set()
+        self.writes = 0
+
+    @classmethod
+    def from_reg_map(cls, inner: ChipInterface, reg_map) -> "WriteTracker":
+        """Track the GPIO/EXTI state registers of *reg_map* (``state_regs``)."""
+        addrs, _ = reg_map.state_regs()
+        return cls(inner, addrs, reg_map.write_aliases())
+
+    def _touch(self, addr: int) -> None:
+        if addr in self._watched:
+            self.dirty.add(addr)
+            self.writes += 1
+        elif self._aliases.get(addr):
+            self.dirty.update(self._aliases[addr])
+            self.writes += 1
+
+    def _touch_all(self) -> None:
+        self.dirty.update(self._watched)
+        self.writes += 1
+
+    def snapshot(self, addrs: Iterable[int], w1c: Iterable[int] = ()) -> RegSnapshot:
+        snap = super().snapshot(addrs, w1c)
+        self.dirty.difference_update(snap.values)
+        return snap
+
+    def restore(self, snapshot: RegSnapshot, dirty: Iterable[int] | None = None) -> int:
+        """Restore *snapshot*, writing only the registers written since the
+        last snapshot or restore (plus its write-1-to-clear registers)."""
+        if dirty is None:
+            dirty = self.dirty & snapshot.values.keys()
+        written = super().restore(snapshot, dirty)
+        self.dirty.difference_update(snapshot.values)
+        return written
+
+    def reg_write(self, addr: int, value: int) -> None:
+        self._touch(addr)
+        self.inner.reg_write(addr, value)
+
+    def reg_write_field(self, addr: int, bit_offset: int, bit_width: int, value: int) -> None:
+        self._touch(addr)
+        self.inner.reg_write_field(addr, bit_offset, bit_width, value)
+
+    def reg_write_masked(self, addr: int, mask: int, value: int) -> None:
+        self._touch(addr)
+        self.inner.reg_write_masked(addr, mask, value)
+
+    def execute_ops(self, ops: list[RegOp]) -> None:
+        for op in ops:
+            if op.kind != "read":
+                self._touch(op.addr)
+        self.inner.execute_ops(ops)
+
+    def reset(self) -> None:
+        self._touch_all()
+        self.inner.reset()
+
+    def run(self) -> None:
+        self._touch_all()
+        self.inner.run()
+
+    def download_firmware(self, path: str):
+        self._touch_all()
+        return self.inner.download_firmware(path)
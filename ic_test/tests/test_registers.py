@@ -0,0 +1,70 @@
+"""R-01 ~ R-06: full register coverage (test plan chapter 12).
+
+Each test sweeps a whole register table at once through RegisterCoverage
+and records one CSV row per register through the ``pin_results`` user
+property.  Tables come from ``--reg-table``; with ``--use-mock``,
+``--synthetic-regs N`` generates a synthetic one instead, modelled by
+MockJtagImpl (a check of the coverage engine, not of a chip).  Without a
+table the tests are skipped."""
+import pytest
+
+from ..utils.reg_coverage import RegisterCoverage, mock_specs
+
+
+@pytest.fixture(scope="session")
+def _engines():
+    return {}
+
+
+@pytest.fixture(params=["mcu_a", "mcu_b"], ids=["MCU-A", "MCU-B"])
+def coverage(request, reg_table, _engines):
+    """RegisterCoverage for one chip; the mock learns the table's access types once."""
+    key = (request.param, reg_table.name)
+    if key not in _engines:
+        chip = request.getfixturevalue(request.param)
+        # Not when replaying a trace recorded on the mock (--replay-trace)
+        if request.config.getoption("--use-mock") and hasattr(chip, "define_registers"):
+            chip.define_registers(mock_specs(reg_table))
+        _engines[key] = RegisterCoverage(chip, reg_table)
+    return _engines[key]
+
+
+def _record(request, coverage, result):
+    """Attach per-register rows and assert none failed."""
+    request.node.user_properties.append(("pin_results", result.rows(coverage.chip.name)))
+    failures = result.describe_failures()
+    assert not failures, (f"{result.test_id} failed on {len(result.first_failures())} "
+                          f"register(s): " + "; ".join(failures))
+
+
+def test_reset_values(coverage, request):
+    """R-01: all readable bits hold their reset value after chip reset."""
+    _record(request, coverage, coverage.check_reset_values())
+
+
+def test_read_write(coverage, request):
+    """R-02: read-write bits read back 0x55555555 / 0xAAAAAAAA."""
+    _record(request, coverage, coverage.check_read_write())
+
+
+def test_read_only(coverage, request):
+    """R-03: writes do not change read-only bits."""
+    _record(request, coverage, coverage.check_read_only())
+
+
+def test_reserved(coverage, request):
+    """R-04: reserved bits keep their reset value."""
+    _record(request, coverage, coverage.check_reserved())
+
+
+def test_w1c(coverage, request):
+    """R-05: writing 1 clears write-1-to-clear bits."""
+    result = coverage.check_w1c()
+    request.node.user_properties.append(("w1c_bits_exercised", result.exercised_bits))
+    _record(request, coverage, result)
+
+
+def test_field_boundaries(coverage, request):
+    """R-06: every read-write field takes its max and min value without
+    disturbing its neighbours."""
+    _record(request, coverage, coverage.check_field_boundaries())
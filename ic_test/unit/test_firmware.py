@@ -0,0 +1,207 @@
+"""Image parsing, segment coalescing and incremental download of
+``drivers/firmware.py``.  Runs offline, outside the hardware suite in
+tests/: images are built in memory and loaded into MockJtagImpl chips."""
+import struct
+import zlib
+
+import pytest
+
+from ..drivers import firmware
+from ..drivers.chip_interface import JtagError
+from ..drivers.firmware import FILL_BYTE, PAGE_SIZE, Segment, coalesce, parse_elf, parse_ihex
+from ..drivers.jtag_impl import FaultyJtagImpl, MockJtagImpl
+
+_PT_LOAD, _PT_NOTE = 1, 4
+
+
+def _elf(segments, is_64=False, big_endian=False) -> bytes:
+    """ELF image with one program header per (p_type, paddr, data, memsz)."""
+    e = ">" if big_endian else "<"
+    header_size, ph_size = (64, 56) if is_64 else (52, 32)
+    ident = b"\x7fELF" + bytes([2 if is_64 else 1, 2 if big_endian else 1, 1]) + bytes(9)
+    if is_64:
+        header = ident + struct.pack(e + "HHIQQQIHHHHHH", 2, 0x28, 1, 0, header_size, 0, 0,
+                                     header_size, ph_size, len(segments), 0, 0, 0)
+    else:
+        header = ident + struct.pack(e + "HHIIIIIHHHHHH", 2, 0x28, 1, 0, header_size, 0, 0,
+                                     header_size, ph_size, len(segments), 0, 0, 0)
+    offset = header_size + ph_size * len(segments)
+    headers, payload = b"", b""
+    for p_type, paddr, data, memsz in segments:
+        vaddr = paddr + 0x1000_0000   # load address differs from run address
+        if is_64:
+            headers += struct.pack(e + "IIQQQQQQ", p_type, 5, offset, vaddr, paddr,
+                                   len(data), memsz, 4)
+        else:
+            headers += struct.pack(e + "IIIIIIII", p_type, offset, vaddr, paddr,
+                                   len(data), memsz, 5, 4)
+        payload += data
+        offset += len(data)
+    return header + headers + payload
+
+
+def _record(rtype: int, offset: int, data: bytes) -> str:
+    body = bytes([len(data), offset >> 8, offset & 0xFF, rtype]) + data
+    return ":" + (body + bytes([-sum(body) & 0xFF])).hex().upper()
+
+
+def _ihex(records) -> str:
+    return "\n".join([*(_record(*r) for r in records), ":00000001FF"]) + "\n"
+
+
+@pytest.mark.parametrize("is_64", [False, True], ids=["elf32", "elf64"])
+@pytest.mark.parametrize("big_endian", [False, True], ids=["le", "be"])
+def test_elf_load_segments(is_64, big_endian):
+    blob = _elf([(_PT_LOAD, 0x0800_0000, b"\x01\x02\x03\x04", 4),
+                 (_PT_NOTE, 0x0800_1000, b"note", 4),
+                 (_PT_LOAD, 0x2000_0000, b"", 0x100),        # .bss: nothing to load
+                 (_PT_LOAD, 0x0800_0100, b"\xaa" * 8, 16)],
+                is_64, big_endian)
+    assert parse_elf(blob) == [Segment(0x0800_0000, b"\x01\x02\x03\x04"),
+                               Segment(0x0800_0100, b"\xaa" * 8)]
+
+
+def test_elf_rejects_other_formats():
+    with pytest.raises(ValueError, match="not an ELF"):
+        parse_elf(b"MZ\x90\x00" + bytes(60))
+
+
+def test_ihex_merges_contiguous_records():
+    text = _ihex([(0x04, 0, b"\x08\x00"),              # upper address 0x0800
+                  (0x00, 0x0000, b"\x00\x01\x02\x03"),
+                  (0x00, 0x0004, b"\x04\x05"),
+                  (0x05, 0, b"\x08\x00\x01\x00"),      # start address: no data
+                  (0x00, 0x0100, b"\xff")])
+    assert parse_ihex(text) == [Segment(0x0800_0000, bytes(range(6))),
+                                Segment(0x0800_0100, b"\xff")]
+
+
+def test_ihex_segment_base_and_eof():
+    text = _ihex([(0x02, 0, b"\x10\x00"),              # segment base 0x1000 << 4
+                  (0x00, 0x0010, b"\xab\xcd")]) + _record(0x00, 0, b"\xee") + "\n"
+    assert parse_ihex(text) == [Segment(0x10010, b"\xab\xcd")]
+
+
+@pytest.mark.parametrize("line, message", [
+    ("0400000001020304F2", "record mark"),
+    (":0400000001020304", "record length"),
+    (":0400000001020304F3", "checksum"),
+])
+def test_ihex_rejects_bad_records(line, message):
+    with pytest.raises(ValueError, match=message):
+        parse_ihex(line)
+
+
+def test_load_image_detects_format(tmp_path):
+    elf = tmp_path / "fw.elf"
+    elf.write_bytes(_elf([(_PT_LOAD, 0x100, b"elf!", 4)]))
+    hex_file = tmp_path / "fw.hex"
+    hex_file.write_text(_ihex([(0x00, 0x200, b"hex!")]))
+    bin_file = tmp_path / "fw.bin"
+    bin_file.write_bytes(b"\x00" * 16)
+    assert firmware.load_image(elf) == [Segment(0x100, b"elf!")]
+    assert firmware.load_image(hex_file) == [Segment(0x200, b"hex!")]
+    with pytest.raises(ValueError, match="unsupported firmware format"):
+        firmware.load_image(bin_file)
+
+
+def test_coalesce_pads_small_gaps():
+    blocks = coalesce([Segment(0x110, b"\x02\x02"), Segment(0x100, b"\x01" * 4)], max_gap=0x10)
+    assert blocks == [Segment(0x100, b"\x01" * 4 + bytes([FILL_BYTE]) * 12 + b"\x02\x02")]
+
+
+def test_coalesce_keeps_distant_segments_apart():
+    blocks = coalesce([Segment(0x100, b"a"), Segment(0x200, b"b")], max_gap=0x10)
+    assert blocks == [Segment(0x100, b"a"), Segment(0x200, b"b")]
+
+
+def test_coalesce_overlap_later_segment_wins():
+    blocks = coalesce([Segment(0x100, b"aaaa"), Segment(0x102, b"bbbb"), Segment(0x104, b"")])
+    assert blocks == [Segment(0x100, b"aabbbb")]
+
+
+class _ReadBackChip(FaultyJtagImpl):
+    """JtagImpl over a mock whose mem_crc32 would read the block back;
+    ``fail_writes`` makes the next burst writes fail."""
+    target_crc = False
+    fail_writes = 0
+
+    def mem_write(self, addr: int, data: bytes) -> None:
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise JtagError(f"{self.probe_id}: write of {len(data)} bytes at 0x{addr:08x} failed")
+        super().mem_write(addr, data)
+
+
+@pytest.fixture
+def image(tmp_path):
+    """Factory writing a HEX image of two blocks, three pages at 0x08000000
+    and 16 bytes at 0x08008000, optionally with one byte of a page changed."""
+    path = tmp_path / "fw.hex"
+
+    def write(fill: int = 0x11, patch_page: int | None = None):
+        main = bytearray([fill]) * (3 * PAGE_SIZE)
+        if patch_page is not None:
+            main[patch_page * PAGE_SIZE] ^= 0xFF
+        records, addr = [(0x04, 0, b"\x08\x00")], 0
+        while addr < len(main):
+            records.append((0x00, addr, bytes(main[addr:addr + 16])))
+            addr += 16
+        records.append((0x00, 0x8000, b"\x22" * 16))
+        path.write_text(_ihex(records))
+        return path
+    yield write
+    firmware.forget_probe()
+
+
+def test_download_target_crc(image):
+    chip = MockJtagImpl("fw-target-crc")
+    first = firmware.download(chip, image())
+    assert first.pages_written == 4 and first.bursts == 2
+    assert chip.mem_read(0x0800_0000, 4) == b"\x11" * 4
+
+    before = chip.scan_count
+    again = firmware.download(chip, image())
+    assert again.pages_written == 0 and again.bytes_skipped == again.bytes_total
+    assert chip.scan_count - before == 2          # one CRC check per block
+
+    patched = firmware.download(chip, image(patch_page=1))
+    assert patched.pages_written == 1 and patched.bursts == 1
+    assert zlib.crc32(chip.mem_read(0x0800_0000, 3 * PAGE_SIZE)) == \
+        zlib.crc32(firmware.load_image(image(patch_page=1))[0].data)
+
+
+def test_download_target_crc_detects_foreign_changes(image):
+    chip = MockJtagImpl("fw-target-crc-reset")
+    firmware.download(chip, image())
+    chip.reset()                                  # mock memory is cleared
+    assert firmware.download(chip, image()).pages_written == 4
+
+
+def test_download_without_target_crc_trusts_cache(image):
+    backend = MockJtagImpl("fw-readback")
+    chip = _ReadBackChip(backend)
+    assert firmware.download(chip, image()).pages_written == 4
+
+    before = backend.scan_count
+    again = firmware.download(chip, image())
+    assert again.pages_written == 0
+    assert backend.scan_count == before           # nothing read back
+
+    patched = firmware.download(chip, image(patch_page=2))
+    assert patched.pages_written == 1
+    assert backend.scan_count - before == 1       # just the write burst
+
+    firmware.forget_probe(chip.probe_id)
+    assert firmware.download(chip, image()).pages_written == 4
+
+
+def test_download_failed_burst_not_cached(image):
+    chip = _ReadBackChip(MockJtagImpl("fw-readback-fail"))
+    chip.fail_writes = 1
+    with pytest.raises(JtagError):
+        firmware.download(chip, image())
+    # The failed burst's pages were never loaded: all of them go again
+    again = firmware.download(chip, image())
+    assert again.pages_written == 4
+    assert chip.mem_read(0x0800_0000, 4) == b"\x11" * 4
@@ -0,0 +1,39 @@
+"""Recording and strict replay of ``drivers/trace.py`` against a MockJtagImpl."""
+import pytest
+
+from ..drivers.chip_interface import RegOp
+from ..drivers.jtag_impl import MockJtagImpl
+from ..drivers.trace import RecordingChip, ReplayChipInterface, TraceDivergenceError
+
+_ADDR = 0x2000_0000
+
+
+@pytest.fixture
+def replay(tmp_path):
+    """Record mem_write(b"abcd") and a two-op batch, return a strict replay."""
+    path = tmp_path / "chip.jtrace"
+    chip = RecordingChip(MockJtagImpl("trace-probe", name="MCU-A"), path)
+    chip.mem_write(_ADDR, b"abcd")
+    chip.execute_ops([RegOp("write", _ADDR + 0x10, 1), RegOp("read", _ADDR + 0x10)])
+    chip.close()
+    return ReplayChipInterface.from_file(path)
+
+
+def test_strict_replay_repeats_recording(replay):
+    replay.mem_write(_ADDR, b"abcd")
+    read = RegOp("read", _ADDR + 0x10)
+    replay.execute_ops([RegOp("write", _ADDR + 0x10, 1), read])
+    assert read.value == 1
+
+
+def test_strict_replay_mem_write_same_length(replay):
+    with pytest.raises(TraceDivergenceError,
+                       match=r"record 0 is .*byte 3 = 0x64, got .*byte 3 = 0x65"):
+        replay.mem_write(_ADDR, b"abce")
+
+
+def test_strict_replay_names_differing_batch_op(replay):
+    replay.mem_write(_ADDR, b"abcd")
+    with pytest.raises(TraceDivergenceError, match=r"op 0 write 0x20000010 = 0x00000001, "
+                                                   r"got write 0x20000010 = 0x00000002"):
+        replay.execute_ops([RegOp("write", _ADDR + 0x10, 2), RegOp("read", _ADDR + 0x10)])
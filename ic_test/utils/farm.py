@@ -0,0 +1,216 @@
+"""Multi-rig test farm.
+
+Shards the collected tests over several two-MCU rigs, runs one pytest
+worker process per rig and merges the per-rig CSV reports into one::
+
+    python -m ic_test.utils.farm --inventory ic_test/config/rigs_mock.yaml \\
+        --csv-report farm.csv -- --port-parallel
+
+Arguments after ``--`` are passed to every worker.  Tests are assigned
+longest-first to the least loaded rig that collects them, using durations
+measured by previous farm runs.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+import yaml
+
+from .report import merge_csv_reports
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+_DEFAULT_PIN_MAP = Path(__file__).resolve().parents[1] / "config" / "pin_map.yaml"
+
+DEFAULT_DURATION = 1.0  # seconds, for tests never measured before
+
+
+@dataclass
+class Rig:
+    name: str
+    jtag_a: str
+    jtag_b: str
+    pin_map: Path
+    mock: bool = False
+
+    def pytest_args(self) -> list[str]:
+        args = ["--jtag-a", self.jtag_a, "--jtag-b", self.jtag_b,
+                "--pin-map", str(self.pin_map)]
+        if self.mock:
+            args.append("--use-mock")
+        return args
+
+
+def load_inventory(yaml_path: str | Path) -> list[Rig]:
+    """Load the rig inventory; pin map paths are relative to the inventory file."""
+    yaml_path = Path(yaml_path)
+    with open(yaml_path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+
+    rigs = []
+    for item in data["rigs"]:
+        pin_map = Path(item.get("pin_map", _DEFAULT_PIN_MAP))
+        if not pin_map.is_absolute():
+            pin_map = (yaml_path.parent / pin_map).resolve()
+        rigs.append(Rig(
+            name=item["name"],
+            jtag_a=item["jtag_a"],
+            jtag_b=item["jtag_b"],
+            pin_map=pin_map,
+            mock=item.get("mock", False),
+        ))
+    return rigs
+
+
+class DurationRecorder:
+    """Pytest plugin writing setup + call + teardown time per test to JSON."""
+
+    def __init__(self, json_path: str):
+        self.json_path = Path(json_path)
+        self.durations: dict[str, float] = {}
+
+    def pytest_runtest_logreport(self, report):
+        self.durations[report.nodeid] = self.durations.get(report.nodeid, 0.0) + report.duration
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        if self.durations:
+            self.json_path.write_text(json.dumps(self.durations), encoding="utf-8")
+
+
+def load_durations(json_path: str | Path) -> dict[str, float]:
+    json_path = Path(json_path)
+    if not json_path.exists():
+        return {}
+    return json.loads(json_path.read_text(encoding="utf-8"))
+
+
+class CollectError(Exception):
+    """A rig's ``pytest --collect-only`` failed; carries its exit code and output."""
+
+    def __init__(self, rig: Rig, returncode: int, output: str):
+        super().__init__(f"{rig.name}: collection failed, exit {returncode}")
+        self.returncode = returncode
+        self.output = output
+
+
+def collect(rig: Rig, tests: list[str], extra_args: list[str]) -> list[str]:
+    """Return the node IDs the rig's pin map produces.
+
+    Raises CollectError if pytest fails to collect (bad pin map, unknown
+    option, import error); a rig with no tests to collect is not an error."""
+    cmd = [sys.executable, "-m", "pytest", "--collect-only", "-q",
+           f"--rootdir={_PROJECT_ROOT}", *tests, *rig.pytest_args(), *extra_args]
+    proc = subprocess.run(cmd, cwd=_PROJECT_ROOT, capture_output=True, text=True)
+    if proc.returncode not in (pytest.ExitCode.OK, pytest.ExitCode.NO_TESTS_COLLECTED):
+        raise CollectError(rig, proc.returncode, proc.stdout + proc.stderr)
+    return [line.strip() for line in proc.stdout.splitlines() if "::" in line]
+
+
+def shard(rig_tests: dict[str, list[str]], durations: dict[str, float]) -> dict[str, list[str]]:
+    """Assign every test to one rig, longest-processing-time first.
+
+    *rig_tests* maps rig name to the node IDs it can run.  Each rig's share
+    keeps collection order."""
+    default = statistics.median(durations.values()) if durations else DEFAULT_DURATION
+    order: dict[str, int] = {}
+    supported: dict[str, list[str]] = {}
+    for rig_name, nodeids in rig_tests.items():
+        for nodeid in nodeids:
+            order.setdefault(nodeid, len(order))
+            supported.setdefault(nodeid, []).append(rig_name)
+
+    load = {rig_name: 0.0 for rig_name in rig_tests}
+    plan: dict[str, list[str]] = {rig_name: [] for rig_name in rig_tests}
+    for nodeid in sorted(order, key=lambda n: -durations.get(n, default)):
+        rig_name = min(supported[nodeid], key=lambda r: load[r])
+        load[rig_name] += durations.get(nodeid, default)
+        plan[rig_name].append(nodeid)
+
+    for nodeids in plan.values():
+        nodeids.sort(key=order.__getitem__)
+    return plan
+
+
+def run_farm(rigs: list[Rig], tests: list[str], extra_args: list[str],
+             csv_report: str | None, durations_path: str | Path,
+             workdir: str | Path) -> int:
+    """Collect, shard, run and merge; return the worst worker exit code.
+
+    A rig that fails to collect runs nothing: its output is printed, the
+    other rigs go ahead and the farm exits with its collection exit code
+    (or worse)."""
+    workdir = Path(workdir).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    durations = load_durations(durations_path)
+
+    exit_code = 0
+    rig_tests = {}
+    for rig in rigs:
+        try:
+            rig_tests[rig.name] = collect(rig, tests, extra_args)
+        except CollectError as exc:
+            # The node IDs collected before the error are noise; the end has the errors
+            tail = exc.output.rstrip().splitlines()[-30:]
+            print(f"[farm] {exc}:", *tail, sep="\n")
+            exit_code = max(exit_code, exc.returncode)
+    plan = shard(rig_tests, durations)
+
+    procs = []
+    for rig in rigs:
+        nodeids = plan.get(rig.name)
+        if not nodeids:
+            continue
+        shard_file = workdir / f"{rig.name}.tests"
+        shard_file.write_text("\n".join(nodeids), encoding="utf-8")
+        # Pin rootdir: option values that are paths would otherwise move it
+        cmd = [sys.executable, "-m", "pytest", "-q", f"--rootdir={_PROJECT_ROOT}", *tests,
+               "--run-only", str(shard_file), *rig.pytest_args(), *extra_args,
+               "--csv-report", str(workdir / f"{rig.name}.csv"),
+               "--durations-out", str(workdir / f"{rig.name}.durations.json")]
+        log = open(workdir / f"{rig.name}.log", "w", encoding="utf-8")
+        procs.append((rig, len(nodeids), time.monotonic(), log,
+                      subprocess.Popen(cmd, cwd=_PROJECT_ROOT, stdout=log,
+                                       stderr=subprocess.STDOUT)))
+
+    for rig, count, start, log, proc in procs:
+        code = proc.wait()
+        log.close()
+        exit_code = max(exit_code, code)
+        print(f"[farm] {rig.name}: {count} tests, exit {code}, "
+              f"{time.monotonic() - start:.1f}s (log: {log.name})")
+        durations.update(load_durations(workdir / f"{rig.name}.durations.json"))
+
+    Path(durations_path).write_text(json.dumps(durations), encoding="utf-8")
+    if csv_report:
+        parts = [(workdir / f"{rig.name}.csv", rig.name) for rig, *_ in procs]
+        rows = merge_csv_reports(parts, csv_report, extra_column="rig")
+        print(f"[farm] merged {rows} rows into {csv_report}")
+    return exit_code
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inventory", required=True, help="Rig inventory YAML")
+    parser.add_argument("--tests", nargs="+", default=["ic_test/tests"],
+                        help="Test paths, relative to the project root")
+    parser.add_argument("--csv-report", default=None, help="Merged CSV report path")
+    parser.add_argument("--durations", default=".farm_durations.json",
+                        help="Measured test durations used for load balancing")
+    parser.add_argument("--workdir", default=None,
+                        help="Directory for per-rig logs and reports (default: temp dir)")
+    parser.add_argument("pytest_args", nargs="*", help="Extra pytest arguments (after --)")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ic_farm_")
+    return run_farm(load_inventory(args.inventory), args.tests, args.pytest_args,
+                    args.csv_report, Path(args.durations).resolve(), workdir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,30 @@
-from ..drivers.chip_interface import ChipInterface
+from contextlib import contextmanager
+from typing import Iterable
+
+from ..drivers.chip_interface import ChipInterface, RegFuture, RegSnapshot, Transaction
 from .reg_parser import GpioRegMap
 
 
+def _spread(pin_mask: int, width: int) -> int:
+    """Expand a pin bitmask into a register field mask of *width* bits per pin."""
+    if width == 1:
+        return pin_mask
+    field_mask = (1 << width) - 1
+    out = 0
+    pin = 0
+    while pin_mask:
+        if pin_mask & 1:
+            out |= field_mask << (pin * width)
+        pin_mask >>= 1
+        pin += 1
+    return out
+
+
+def _repeat(value: int, width: int) -> int:
+    """Replicate a *width*-bit field value across all 16 pin slots."""
+    return value * sum(1 << (pin * width) for pin in range(16))
+
+
 class GpioHelper:
     """High-level GPIO register operations."""
 
@@ -30,6 +53,32 @@ class GpioHelper:
         self.chip = chip
         self.reg_map = reg_map
 
+    @contextmanager
+    def batch(self):
+        """Queue every register access made inside the block and flush them
+        to the chip as one transaction.  Read methods return RegFuture
+        objects while batching.  Nested batches join the outer one."""
+        if isinstance(self.chip, Transaction):
+            yield self.chip
+            return
+        chip = self.chip
+        with chip.transaction() as tx:
+            self.chip = tx
+            try:
+                yield tx
+            finally:
+                self.chip = chip
+
+    def snapshot(self) -> RegSnapshot:
+        """Capture the GPIO/EXTI configuration of every port in one batch."""
+        return self.chip.snapshot(*self.reg_map.state_regs())
+
+    def restore(self, snapshot: RegSnapshot, dirty: Iterable[int] | None = None) -> int:
+        """Return the GPIO/EXTI configuration to *snapshot*, writing only
+        the registers that changed (or *dirty*, see ChipInterface.restore);
+        return how many were written."""
+        return self.chip.restore(snapshot, dirty)
+
     def set_mode(self, port: str, pin: int, mode: int) -> None:
         """Set pin mode (input/output/AF/analog)."""
         addr = self.reg_map.get_reg_addr(port, "MODER")
@@ -57,10 +106,11 @@ class GpioHelper:
 
     def reset_pin(self, port: str, pin: int) -> None:
         """Reset pin to default state (input, no pull, push-pull)."""
-        self.set_mode(port, pin, self.MODE_INPUT)
-        self.set_output_type(port, pin, self.OTYPE_PUSH_PULL)
-        self.set_pull(port, pin, self.PULL_NONE)
-        self.write_pin(port, pin, 0)
+        with self.batch():
+            self.set_mode(port, pin, self.MODE_INPUT)
+            self.set_output_type(port, pin, self.OTYPE_PUSH_PULL)
+            self.set_pull(port, pin, self.PULL_NONE)
+            self.write_pin(port, pin, 0)
 
     def configure_exti(self, port: str, pin: int, rising: bool, falling: bool) -> None:
         """Configure EXTI interrupt for a pin."""
@@ -86,7 +136,10 @@ class GpioHelper:
         if exti is None:
             raise ValueError("EXTI not defined in register map")
         pr_addr = exti.base_addr + exti.pr_offset
-        return bool(self.chip.reg_read_field(pr_addr, pin, 1))
+        pending = self.chip.reg_read_field(pr_addr, pin, 1)
+        if isinstance(pending, RegFuture):
+            return pending.then(bool)
+        return bool(pending)
 
     def clear_exti_pending(self, pin: int) -> None:
         """Clear EXTI pending flag (write-1-to-clear)."""
@@ -128,3 +181,92 @@ class GpioHelper:
             raise ValueError("EXTI not defined in register map")
         imr_addr = exti.base_addr + exti.imr_offset
         self.chip.reg_write_field(imr_addr, pin, 1, 0)
+
+    # -- port-wide (mask based) operations -----------------------------------
+
+    def _write_port_field(self, port: str, reg_name: str, pin_mask: int, value: int) -> None:
+        """Write the same field value to every pin in *pin_mask* in one access."""
+        addr = self.reg_map.get_reg_addr(port, reg_name)
+        width = self.reg_map.registers[reg_name].bits_per_pin
+        self.chip.reg_write_masked(addr, _spread(pin_mask, width), _repeat(value, width))
+
+    def set_mode_mask(self, port: str, pin_mask: int, mode: int) -> None:
+        """Set the mode of every pin in *pin_mask*."""
+        self._write_port_field(port, "MODER", pin_mask, mode)
+
+    def set_output_type_mask(self, port: str, pin_mask: int, otype: int) -> None:
+        """Set the output type of every pin in *pin_mask*."""
+        self._write_port_field(port, "OTYPER", pin_mask, otype)
+
+    def set_pull_mask(self, port: str, pin_mask: int, pull: int) -> None:
+        """Set the pull resistor of every pin in *pin_mask*."""
+        self._write_port_field(port, "PUPDR", pin_mask, pull)
+
+    def set_speed_mask(self, port: str, pin_mask: int, speed: int) -> None:
+        """Set the output speed of every pin in *pin_mask*."""
+        self._write_port_field(port, "OSPEEDR", pin_mask, speed)
+
+    def write_port(self, port: str, pin_mask: int, value: int) -> None:
+        """Write ODR bits: pins in *pin_mask* take their bit from *value*."""
+        addr = self.reg_map.get_reg_addr(port, "ODR")
+        self.chip.reg_write_masked(addr, pin_mask, value)
+
+    def read_port(self, port: str) -> int:
+        """Read the whole IDR of a port (bit N = pin N input level)."""
+        addr = self.reg_map.get_reg_addr(port, "IDR")
+        return self.chip.reg_read_field(addr, 0, 16)
+
+    def read_odr_port(self, port: str) -> int:
+        """Read the whole ODR latch of a port."""
+        addr = self.reg_map.get_reg_addr(port, "ODR")
+        return self.chip.reg_read_field(addr, 0, 16)
+
+    def read_speed_port(self, port: str) -> int:
+        """Read the raw OSPEEDR of a port (2 bits per pin)."""
+        addr = self.reg_map.get_reg_addr(port, "OSPEEDR")
+        return self.chip.reg_read(addr)
+
+    def bsrr_write(self, port: str, set_mask: int = 0, reset_mask: int = 0) -> None:
+        """Atomically set and reset several pins through BSRR."""
+        addr = self.reg_map.get_reg_addr(port, "BSRR")
+        self.chip.reg_write(addr, (set_mask & 0xFFFF) | ((reset_mask & 0xFFFF) << 16))
+
+    def reset_port(self, port: str, pin_mask: int) -> None:
+        """Reset every pin in *pin_mask* to the default state in one batch."""
+        with self.batch():
+            self.set_mode_mask(port, pin_mask, self.MODE_INPUT)
+            self.set_output_type_mask(port, pin_mask, self.OTYPE_PUSH_PULL)
+            self.set_pull_mask(port, pin_mask, self.PULL_NONE)
+            self.write_port(port, pin_mask, 0)
+
+    def configure_exti_mask(self, pin_mask: int, rising: bool, falling: bool) -> None:
+        """Configure EXTI lines for every pin in *pin_mask*."""
+        exti = self.reg_map.exti
+        if exti is None:
+            raise ValueError("EXTI not defined in register map")
+        self.chip.reg_write_masked(exti.base_addr + exti.imr_offset, pin_mask, pin_mask)
+        self.chip.reg_write_masked(exti.base_addr + exti.rtsr_offset, pin_mask,
+                                   pin_mask if rising else 0)
+        self.chip.reg_write_masked(exti.base_addr + exti.ftsr_offset, pin_mask,
+                                   pin_mask if falling else 0)
+
+    def disable_exti_mask(self, pin_mask: int) -> None:
+        """Disable EXTI lines for every pin in *pin_mask*."""
+        exti = self.reg_map.exti
+        if exti is None:
+            raise ValueError("EXTI not defined in register map")
+        self.chip.reg_write_masked(exti.base_addr + exti.imr_offset, pin_mask, 0)
+
+    def read_exti_pending_mask(self) -> int:
+        """Read all EXTI pending flags (bit N = line N)."""
+        exti = self.reg_map.exti
+        if exti is None:
+            raise ValueError("EXTI not defined in register map")
+        return self.chip.reg_read_field(exti.base_addr + exti.pr_offset, 0, 16)
+
+    def clear_exti_pending_mask(self, pin_mask: int) -> None:
+        """Clear the EXTI pending flags in *pin_mask* (write-1-to-clear)."""
+        exti = self.reg_map.exti
+        if exti is None:
+            raise ValueError("EXTI not defined in register map")
+        self.chip.reg_write(exti.base_addr + exti.pr_offset, pin_mask)
@@ -0,0 +1,467 @@
+"""Declarative GPIO test vectors (G-01 ~ G-16) and the engine running them.
+
+A GpioVector lists the steps of one test for the stimulator and DUT
+sides -- pin configuration, BSRR writes, clearing EXTI pending flags and
+reads -- plus the values the reads must return.  VectorEngine plans the
+register accesses for any set of pin pairs at once, so the same vector
+runs per pin pair or, with --port-parallel, per port group:
+
+* field settings are merged per register into one write covering every
+  pin, and consecutive steps on the same chip share one batch;
+* the engine models the register values (from the post-reset baseline
+  and its own writes), so writes that would not change a register are
+  dropped and read-modify-writes become plain writes;
+* step order is kept: a batch ends where the other chip acts, and a
+  second write to the same bits within a batch is issued separately, so
+  every edge a vector asks for still happens on the pins.
+
+Results come back per pin pair, labelled and formatted like the rows of
+the CSV report.
+"""
+from dataclasses import dataclass
+from typing import NamedTuple, Sequence
+
+from ..drivers.chip_interface import RegOp
+from .gpio_helper import GpioHelper, _repeat, _spread
+
+ROLES = [
+    ("MCU-A_stim", "MCU-B_dut"),
+    ("MCU-B_stim", "MCU-A_dut"),
+]
+ROLE_IDS = ["A_stim-B_dut", "B_stim-A_dut"]
+
+# Settable fields: per-pin GPIO register fields and per-line EXTI bits
+_PORT_FIELDS = {"mode": "MODER", "otype": "OTYPER", "pull": "PUPDR",
+                "speed": "OSPEEDR", "odr": "ODR"}
+_EXTI_FIELDS = {"irq": "IMR", "rising": "RTSR", "falling": "FTSR"}
+# Readable quantities: register and bits per pin
+_READS = {"idr": ("IDR", 1), "odr": ("ODR", 1), "speed": ("OSPEEDR", 2), "pending": ("PR", 1)}
+
+
+class Step(NamedTuple):
+    """One action of a vector on the ``"stim"`` or ``"dut"`` side.
+
+    *action* is ``set`` (*args*: ``(field, value)`` pairs), ``bsrr_set``,
+    ``bsrr_reset``, ``clear_pending`` or ``read`` (*args*: what to read
+    and the result key)."""
+    side: str
+    action: str
+    args: tuple = ()
+
+
+def configure(side: str, **fields: int) -> Step:
+    """Set pin fields (``mode``, ``otype``, ``pull``, ``speed``, ``odr``)
+    and EXTI line bits (``irq``, ``rising``, ``falling``)."""
+    for name in fields:
+        if name not in _PORT_FIELDS and name not in _EXTI_FIELDS:
+            raise ValueError(f"unknown GPIO field '{name}'")
+    return Step(side, "set", tuple(fields.items()))
+
+
+def bsrr_set(side: str) -> Step:
+    return Step(side, "bsrr_set")
+
+
+def bsrr_reset(side: str) -> Step:
+    return Step(side, "bsrr_reset")
+
+
+def clear_pending(side: str) -> Step:
+    return Step(side, "clear_pending")
+
+
+def read(side: str, what: str, key: str = "") -> Step:
+    """Sample ``idr``, ``odr``, ``speed`` or ``pending`` into result *key*."""
+    if what not in _READS:
+        raise ValueError(f"unknown GPIO read '{what}'")
+    return Step(side, "read", (what, key))
+
+
+@dataclass(frozen=True)
+class GpioVector:
+    """One GPIO test: its steps and the expected value of every read key,
+    in report order.  A single unnamed read reports the bare value."""
+    test_id: str
+    name: str
+    steps: tuple[Step, ...]
+    expected: tuple[tuple[str, object], ...]
+
+    @staticmethod
+    def format(values: Sequence[tuple[str, object]]) -> str:
+        """``"1"`` for one unnamed value, else ``"low=0,high=1"``."""
+        if len(values) == 1 and not values[0][0]:
+            return str(values[0][1])
+        return ",".join(f"{key}={value}" for key, value in values)
+
+
+IN, OUT = GpioHelper.MODE_INPUT, GpioHelper.MODE_OUTPUT
+OD = GpioHelper.OTYPE_OPEN_DRAIN
+NONE, UP, DOWN = GpioHelper.PULL_NONE, GpioHelper.PULL_UP, GpioHelper.PULL_DOWN
+
+
+def _level(test_id, name, stim, dut, reader, level) -> GpioVector:
+    return GpioVector(test_id, name, (configure("stim", **stim), configure("dut", **dut),
+                                      read(reader, "idr")), (("", level),))
+
+
+def _edge(test_id, name, start, rising, falling, expected=True) -> GpioVector:
+    return GpioVector(test_id, name, (
+        configure("stim", mode=OUT, odr=start),
+        configure("dut", mode=IN, irq=1, rising=rising, falling=falling),
+        clear_pending("dut"),
+        configure("stim", odr=1 - start),
+        read("dut", "pending"),
+    ), (("", expected),))
+
+
+VECTORS: dict[str, GpioVector] = {v.name: v for v in (
+    _level("G-01", "output_high", dict(mode=IN, pull=NONE), dict(mode=OUT, odr=1), "stim", 1),
+    _level("G-02", "output_low", dict(mode=IN, pull=NONE), dict(mode=OUT, odr=0), "stim", 0),
+    _level("G-03", "input_read_high", dict(mode=OUT, odr=1), dict(mode=IN, pull=NONE), "dut", 1),
+    _level("G-04", "input_read_low", dict(mode=OUT, odr=0), dict(mode=IN, pull=NONE), "dut", 0),
+    _level("G-05", "pull_up", dict(mode=IN, pull=NONE), dict(mode=IN, pull=UP), "dut", 1),
+    _level("G-06", "pull_down", dict(mode=IN, pull=NONE), dict(mode=IN, pull=DOWN), "dut", 0),
+    GpioVector("G-07", "open_drain", (
+        configure("stim", mode=IN, pull=UP),
+        configure("dut", mode=OUT, otype=OD, odr=0),
+        read("stim", "idr", "low"),
+        configure("dut", odr=1),
+        read("stim", "idr", "high"),
+    ), (("low", 0), ("high", 1))),
+    _edge("G-08", "rising_edge_interrupt", start=0, rising=1, falling=0),
+    _edge("G-09", "falling_edge_interrupt", start=1, rising=0, falling=1),
+    GpioVector("G-10", "both_edge_interrupt", (
+        configure("stim", mode=OUT, odr=0),
+        configure("dut", mode=IN, irq=1, rising=1, falling=1),
+        clear_pending("dut"),
+        configure("stim", odr=1),
+        read("dut", "pending", "rise"),
+        clear_pending("dut"),
+        configure("stim", odr=0),
+        read("dut", "pending", "fall"),
+    ), (("rise", True), ("fall", True))),
+    GpioVector("G-11", "bsrr_set", (
+        configure("stim", mode=IN, pull=NONE),
+        configure("dut", mode=OUT, odr=0),
+        bsrr_set("dut"),
+        read("stim", "idr"),
+    ), (("", 1),)),
+    GpioVector("G-12", "bsrr_reset", (
+        configure("stim", mode=IN, pull=NONE),
+        configure("dut", mode=OUT, odr=1),
+        bsrr_reset("dut"),
+        read("stim", "idr"),
+    ), (("", 0),)),
+    GpioVector("G-14", "odr_readback", (
+        configure("dut", mode=OUT, odr=1),
+        read("dut", "odr", "high"),
+        configure("dut", odr=0),
+        read("dut", "odr", "low"),
+    ), (("high", 1), ("low", 0))),
+    GpioVector("G-15", "exti_disabled", (
+        configure("stim", mode=OUT, odr=0),
+        configure("dut", mode=IN, irq=1, rising=1, falling=1),
+        clear_pending("dut"),
+        configure("dut", irq=0),
+        configure("stim", odr=1),
+        read("dut", "pending"),
+    ), (("", False),)),
+    GpioVector("G-16", "open_drain_pull_down", (
+        configure("stim", mode=IN, pull=DOWN),
+        configure("dut", mode=OUT, otype=OD, odr=0),
+        read("stim", "idr", "low"),
+        configure("dut", odr=1),
+        read("stim", "idr", "release"),
+    ), (("low", 0), ("release", 0))),
+)}
+
+
+def ospeedr_readback(speed: int) -> GpioVector:
+    """G-13 for one OSPEEDR value."""
+    return GpioVector("G-13", "ospeedr_readback", (
+        configure("dut", mode=OUT, speed=speed),
+        read("dut", "speed"),
+    ), (("", speed),))
+
+
+def vector_for(test_name: str, params: dict) -> GpioVector | None:
+    """The vector a GPIO test function runs (``test_output_high`` ->
+    ``VECTORS["output_high"]``), given its parametrize *params*."""
+    name = test_name.removeprefix("test_")
+    if name == "ospeedr_readback":
+        return ospeedr_readback(params["speed_val"])
+    return VECTORS.get(name)
+
+
+class PinResult(NamedTuple):
+    """Outcome of a vector on one pin pair, in CSV row terms."""
+    chip: str       # DUT chip
+    pin: str        # DUT pin label, e.g. MCU-B-PB5
+    expected: str
+    actual: str
+    passed: bool
+
+
+class _Batch:
+    """Accesses to one chip between two actions of the other chip."""
+
+    def __init__(self, side: str):
+        self.side = side
+        self.ops: list[RegOp] = []
+        self.pending: dict[int, list[int]] = {}   # addr -> [mask, value], not yet issued
+        self.reads: list[tuple[str, str, dict[str, RegOp]]] = []  # (key, what, port -> op)
+
+
+class VectorEngine:
+    """Plans and runs GpioVectors on the two chips.
+
+    *known* gives the register values of (MCU-A, MCU-B) after a restore,
+    typically the ``gpio_baseline`` snapshots, also accepted later by
+    ``reset_state()``; without it all GPIO/EXTI state registers are taken
+    as zero, which is only good for estimates.
+    Without *gpio_a* / *gpio_b* the engine plans but cannot run.
+
+    The engine models the current register values from its own writes,
+    so a run does not need the chips restored first: it starts by putting
+    back the fields of its pins that the vector relies on (anything it
+    does not set, or will set to a different value later in the vector)
+    and leaves fields already holding the value the vector will set.
+    ``in_sync()`` tells whether the chips were written by anyone else
+    since, in which case they must be restored and ``reset_state()``
+    called."""
+
+    def __init__(self, reg_map, known: tuple[dict[int, int], dict[int, int]] | None = None,
+                 gpio_a: GpioHelper | None = None, gpio_b: GpioHelper | None = None):
+        self.reg_map = reg_map
+        if known is None:
+            addrs, w1c = reg_map.state_regs()
+            zeros = {addr: 0 for addr in addrs if addr not in w1c}
+            known = (zeros, zeros)
+        self.baseline = {"MCU-A": dict(known[0]), "MCU-B": dict(known[1])}
+        self.gpio = {"MCU-A": gpio_a, "MCU-B": gpio_b}
+        self.state: dict[str, dict[int, int]] | None = None
+        self._generation = None
+        self.writes_skipped = 0
+
+    # -- state -----------------------------------------------------------------
+
+    def reset_state(self, known: tuple[dict[int, int], dict[int, int]] | None = None) -> None:
+        """The chips were just restored to *known*; without it, to the
+        values given last (at construction or to this method)."""
+        if known is not None:
+            self.baseline = {"MCU-A": dict(known[0]), "MCU-B": dict(known[1])}
+        self.state = {chip: dict(values) for chip, values in self.baseline.items()}
+        self._generation = self._generations()
+
+    def in_sync(self) -> bool:
+        """True if the modelled state is still that of the chips: nothing
+        else wrote their GPIO/EXTI registers since the last run.  Chips
+        that do not count writes (no WriteTracker) are never in sync."""
+        return self.state is not None and None not in self._generation \
+            and self._generation == self._generations()
+
+    def changed(self) -> tuple[set[int], set[int]]:
+        """Registers of (MCU-A, MCU-B) whose modelled value differs from
+        *known*; only meaningful while ``in_sync()``."""
+        return tuple({addr for addr, value in self.state[chip].items()
+                      if value != self.baseline[chip].get(addr)}
+                     for chip in ("MCU-A", "MCU-B"))
+
+    def _generations(self) -> tuple:
+        return tuple(getattr(gpio.chip, "writes", None) if gpio is not None else None
+                     for gpio in self.gpio.values())
+
+    # -- running ---------------------------------------------------------------
+
+    def run(self, vector: GpioVector, role, pin_pairs) -> list[PinResult]:
+        """Run *vector* on *pin_pairs* with *role* (an entry of ROLES);
+        return one result per pin pair."""
+        if self.state is None:
+            self.reset_state()
+        chips = self._chips(role)
+        pins = {side: self._side_pins(chip, pin_pairs) for side, chip in chips.items()}
+        batches = self.plan(vector, chips, pins, self.state)
+        try:
+            for batch in batches:
+                if batch.ops:
+                    self.gpio[chips[batch.side]].chip.execute_ops(batch.ops)
+        except Exception:
+            self.state = None   # not known how far the writes got
+            raise
+        self._generation = self._generations()
+
+        dut = chips["dut"]
+        results = []
+        for i, pp in enumerate(pin_pairs):
+            values = {}
+            for batch in batches:
+                for key, what, ops in batch.reads:
+                    port, pin = pins[batch.side][i]
+                    _, width = _READS[what]
+                    value = (ops[port].value >> (pin * width)) & ((1 << width) - 1)
+                    values[key] = bool(value) if what == "pending" else value
+            actual = vector.format([(key, values.get(key)) for key, _ in vector.expected])
+            label = f"{dut}-P{pp.label_b if dut == 'MCU-B' else pp.label_a}"
+            results.append(PinResult(dut, label, vector.format(vector.expected), actual,
+                                     all(values.get(k) == v for k, v in vector.expected)))
+        return results
+
+    def cost(self, vector: GpioVector, role, pin_pairs,
+             state: dict[str, dict[int, int]]) -> tuple[int, int]:
+        """Plan *vector* from *state* (updated in place) without running it;
+        return (register accesses, batches)."""
+        chips = self._chips(role)
+        pins = {side: self._side_pins(chip, pin_pairs) for side, chip in chips.items()}
+        batches = self.plan(vector, chips, pins, state)
+        return sum(len(b.ops) for b in batches), sum(1 for b in batches if b.ops)
+
+    # -- planning --------------------------------------------------------------
+
+    @staticmethod
+    def _chips(role) -> dict[str, str]:
+        stim_is_a = role[0].startswith("MCU-A")
+        return {"stim": "MCU-A" if stim_is_a else "MCU-B",
+                "dut": "MCU-B" if stim_is_a else "MCU-A"}
+
+    @staticmethod
+    def _side_pins(chip: str, pin_pairs) -> list[tuple[str, int]]:
+        if chip == "MCU-A":
+            return [(pp.mcu_a_port, pp.mcu_a_pin) for pp in pin_pairs]
+        return [(pp.mcu_b_port, pp.mcu_b_pin) for pp in pin_pairs]
+
+    def plan(self, vector: GpioVector, chips: dict[str, str],
+             pins: dict[str, list[tuple[str, int]]],
+             state: dict[str, dict[int, int]]) -> list[_Batch]:
+        """Compile *vector* into per-chip batches of RegOps for *pins*
+        (side -> (port, pin) per pin pair), starting from *state* (chip ->
+        register values), which is updated to the state after the run."""
+        regs = {side: state[chip] for side, chip in chips.items()}
+        port_masks = {}
+        for side, side_pins in pins.items():
+            masks = port_masks[side] = {}
+            for port, pin in side_pins:
+                masks[port] = masks.get(port, 0) | (1 << pin)
+
+        # Release the pins first, the side acting second in its own batch
+        first = vector.steps[0].side
+        second = "dut" if first == "stim" else "stim"
+        batches = [_Batch(second)]
+        self._release(vector, second, chips[second], pins[second], regs[second], batches[0])
+        self._flush(batches[0], regs[second])
+        batches.append(_Batch(first))
+        self._release(vector, first, chips[first], pins[first], regs[first], batches[1])
+
+        for step in vector.steps:
+            if batches[-1].side != step.side:
+                self._flush(batches[-1], regs[batches[-1].side])
+                batches.append(_Batch(step.side))
+            batch = batches[-1]
+            known = regs[step.side]
+            masks = port_masks[step.side]
+            line_mask = 0
+            for mask in masks.values():
+                line_mask |= mask
+            if step.action == "set":
+                for field, value in step.args:
+                    if field in _EXTI_FIELDS:
+                        addr = self._exti_addr(_EXTI_FIELDS[field])
+                        self._queue(batch, known, addr, line_mask, line_mask if value else 0)
+                        continue
+                    reg = _PORT_FIELDS[field]
+                    width = self.reg_map.registers[reg].bits_per_pin
+                    for port, mask in masks.items():
+                        self._queue(batch, known, self.reg_map.get_reg_addr(port, reg),
+                                    _spread(mask, width), _repeat(value, width))
+                continue
+            self._flush(batch, known)
+            if step.action in ("bsrr_set", "bsrr_reset"):
+                for port, mask in masks.items():
+                    value = mask if step.action == "bsrr_set" else mask << 16
+                    batch.ops.append(RegOp("write", self.reg_map.get_reg_addr(port, "BSRR"), value))
+                    odr = self.reg_map.get_reg_addr(port, "ODR")
+                    if odr in known:
+                        known[odr] = known[odr] | mask if step.action == "bsrr_set" \
+                            else known[odr] & ~mask
+            elif step.action == "clear_pending":
+                batch.ops.append(RegOp("write", self._exti_addr("PR"), line_mask))
+            else:
+                what, key = step.args
+                reg, _ = _READS[what]
+                if what == "pending":
+                    # One EXTI for all ports
+                    op = RegOp("read", self._exti_addr(reg))
+                    batch.ops.append(op)
+                    ops = dict.fromkeys(masks, op)
+                else:
+                    ops = {}
+                    for port in masks:
+                        ops[port] = RegOp("read", self.reg_map.get_reg_addr(port, reg))
+                        batch.ops.append(ops[port])
+                batch.reads.append((key, what, ops))
+        self._flush(batches[-1], regs[batches[-1].side])
+        return batches
+
+    def _release(self, vector: GpioVector, side: str, chip: str,
+                 side_pins: list[tuple[str, int]], known: dict[int, int], batch: _Batch) -> None:
+        """Queue the writes returning *side_pins* to the baseline, except
+        for fields already holding the first value the vector sets them
+        to, and fields the vector's first step sets (nothing happens on
+        the other chip before it does)."""
+        targets: dict[str, int] = {}
+        for step in vector.steps:
+            if step.side == side and step.action == "set":
+                for field, value in step.args:
+                    targets.setdefault(field, value)
+        immediate = dict(vector.steps[0].args) if vector.steps[0].side == side else {}
+        baseline = self.baseline[chip]
+        for port, pin in side_pins:
+            for field in (*_PORT_FIELDS, *_EXTI_FIELDS):
+                if field in immediate:
+                    continue
+                if field in _EXTI_FIELDS:
+                    addr, width, shift = self._exti_addr(_EXTI_FIELDS[field]), 1, pin
+                else:
+                    reg = _PORT_FIELDS[field]
+                    width = self.reg_map.registers[reg].bits_per_pin
+                    addr, shift = self.reg_map.get_reg_addr(port, reg), pin * width
+                mask = ((1 << width) - 1) << shift
+                if field in targets and addr in known and \
+                        (known[addr] & mask) == (targets[field] << shift) & mask:
+                    continue
+                if addr in baseline:
+                    self._queue(batch, known, addr, mask, baseline[addr] & mask)
+
+    def _exti_addr(self, name: str) -> int:
+        exti = self.reg_map.exti
+        if exti is None:
+            raise ValueError("EXTI not defined in register map")
+        return exti.reg_addrs()[name]
+
+    def _queue(self, batch: _Batch, known: dict[int, int], addr: int, mask: int, value: int) -> None:
+        """Add a field write to the batch's pending writes; a write that
+        changes bits already pending is issued separately, after them."""
+        pending = batch.pending.get(addr)
+        if pending is not None and (pending[1] ^ value) & pending[0] & mask:
+            self._flush(batch, known)
+            pending = None
+        if pending is None:
+            batch.pending[addr] = [mask, value & mask]
+        else:
+            pending[0] |= mask
+            pending[1] = (pending[1] & ~mask) | (value & mask)
+
+    def _flush(self, batch: _Batch, known: dict[int, int]) -> None:
+        """Turn the pending writes into RegOps, skipping those that leave
+        a known register unchanged."""
+        for addr, (mask, value) in batch.pending.items():
+            old = known.get(addr)
+            if old is None:
+                batch.ops.append(RegOp("modify", addr, value, mask))
+                continue
+            new = (old & ~mask) | value
+            if new == old:
+                self.writes_skipped += 1
+                continue
+            batch.ops.append(RegOp("write", addr, new))
+            known[addr] = new
+        batch.pending.clear()
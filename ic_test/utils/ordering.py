@@ -0,0 +1,144 @@
+"""Configuration-aware ordering of the GPIO tests.
+
+In collection order consecutive GPIO tests alternate roles and move from
+pin to pin, so every test starts by undoing the previous test's
+configuration.  GpioOrderPlugin reorders the tests run by ``gpio_engine``
+(G-01 ~ G-16) so that tests sharing a role and pins follow each other,
+chaining the vectors so that each leaves the pins close to the
+configuration the next one needs.  The distance between two tests is the
+number of batches and register accesses VectorEngine plans for the second
+one starting from the state left by the first.
+
+The plugin reports the accesses it estimates before and after reordering;
+``--keep-order`` keeps collection order (e.g. to reproduce a failure) and
+still reports the estimate.
+"""
+from pathlib import Path
+
+import pytest
+
+from .gpio_vectors import ROLES, VectorEngine, vector_for
+from .reg_parser import load_gpio_regs
+
+
+def _case(item):
+    """(vector, role, pin pairs) of a test run by ``gpio_engine``, else None."""
+    if "gpio_engine" not in getattr(item, "fixturenames", ()):
+        return None
+    params = item.callspec.params
+    pins = params.get("gpio_pins")
+    if pins is None:
+        return None
+    pin_pairs = tuple(getattr(pins, "pin_pairs", (pins,)))
+    vector = vector_for(item.originalname, params)
+    if vector is None:
+        return None
+    return vector, params["role"], pin_pairs
+
+
+def _pins_key(pin_pairs) -> tuple:
+    return tuple((pp.mcu_a_port, pp.mcu_a_pin, pp.mcu_b_port, pp.mcu_b_pin) for pp in pin_pairs)
+
+
+class GpioOrderPlugin:
+    """Pytest plugin reordering the GPIO vector tests.
+
+    Each contiguous run of such tests is grouped by role, then by pins
+    (groups keep their first-appearance order).  Within a group the tests
+    are chained greedily: next comes the one cheapest to plan from the
+    state the previous one left, fewest batches first, then fewest
+    accesses.  The chain is worked out once per role and set of vectors
+    and reused for every group with the same ones."""
+
+    def __init__(self, reg_map_path: str | Path, keep_order: bool = False):
+        self.reg_map_path = reg_map_path
+        self.keep_order = keep_order
+        self.estimate = None   # (tests, (accesses, batches) before, after)
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        cases = [_case(item) for item in items]
+        if not any(cases):
+            return
+        engine = VectorEngine(load_gpio_regs(self.reg_map_path))
+        before = self._simulate(engine, cases)
+        if not self.keep_order:
+            order = self._order(engine, cases)
+            items[:] = [items[i] for i in order]
+            cases = [cases[i] for i in order]
+        after = self._simulate(engine, cases) if not self.keep_order else before
+        self.estimate = (sum(1 for case in cases if case is not None), before, after)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.estimate is None:
+            return
+        tests, (acc_before, bat_before), (acc_after, bat_after) = self.estimate
+        terminalreporter.section("GPIO test order")
+        if self.keep_order:
+            terminalreporter.write_line(
+                f"{tests} tests in collection order (--keep-order): estimated "
+                f"{acc_before} register accesses in {bat_before} batches")
+            return
+        terminalreporter.write_line(
+            f"{tests} tests grouped by role and pins: estimated {acc_before} -> {acc_after} "
+            f"register accesses, {bat_before} -> {bat_after} batches "
+            f"({acc_before - acc_after} accesses saved)")
+
+    @staticmethod
+    def _simulate(engine: VectorEngine, cases) -> tuple[int, int]:
+        """Total (accesses, batches) of running *cases* in order.  Any
+        other test in between is assumed to restore the baseline."""
+        accesses = batches = 0
+        state = None
+        for case in cases:
+            if case is None:
+                state = None
+                continue
+            if state is None:
+                state = {chip: dict(values) for chip, values in engine.baseline.items()}
+            a, b = engine.cost(*case, state)
+            accesses += a
+            batches += b
+        return accesses, batches
+
+    def _order(self, engine: VectorEngine, cases) -> list[int]:
+        order: list[int] = []
+        run: list[int] = []
+        chains: dict[tuple, list[int]] = {}
+        for i, case in enumerate([*cases, None]):
+            if case is not None:
+                run.append(i)
+                continue
+            groups: dict[tuple, list[int]] = {}
+            for j in run:
+                _, role, pin_pairs = cases[j]
+                groups.setdefault((ROLES.index(tuple(role)), _pins_key(pin_pairs)), []).append(j)
+            for key in sorted(groups, key=lambda k: k[0]):
+                members = groups[key]
+                signature = (key[0], tuple(cases[j][0] for j in members))
+                if signature not in chains:
+                    chains[signature] = self._chain(engine, [cases[j] for j in members])
+                order.extend(members[k] for k in chains[signature])
+            run = []
+            if i < len(cases):
+                order.append(i)
+        return order
+
+    @staticmethod
+    def _chain(engine: VectorEngine, cases) -> list[int]:
+        """Greedy order of *cases* (same role and pins) from the baseline."""
+        state = {chip: dict(values) for chip, values in engine.baseline.items()}
+        remaining = list(range(len(cases)))
+        chain = []
+
+        def cost(k):
+            trial = {chip: dict(values) for chip, values in state.items()}
+            accesses, batches = engine.cost(*cases[k], trial)
+            return batches, accesses, k
+
+        while remaining:
+            best = min(remaining, key=cost)
+            engine.cost(*cases[best], state)
+            chain.append(best)
+            remaining.remove(best)
+        return chain
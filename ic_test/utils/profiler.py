@@ -0,0 +1,292 @@
+"""Per-test time breakdown and flamegraph stacks (``--profile-jtag``).
+
+Each test's wall time (``pytest_runtest_protocol``) is split into:
+
+* ``driver``  -- time inside ChipInterface methods, per method, measured
+  by the ProfilingChip layer of each chip.  Summed over both chips, so
+  with ``--parallel-probes`` overlapping calls count twice;
+* ``helpers`` -- time in GpioHelper, the vector engine and the
+  reg_parser maps outside any driver call, measured by HelperTimer;
+* ``setup``   -- the rest of fixture setup (``gpio_clean_state``,
+  session fixtures on first use);
+* ``report``  -- ``pytest_runtest_makereport`` / ``pytest_runtest_logreport``
+  hooks (CSV report, results DB, terminal output);
+* ``other``   -- whatever remains: test bodies, teardown, pytest itself.
+
+A test is JTAG-bound when at least half of its time is driver time.  A
+stack sampler writes the stacks of the thread running the tests,
+collapsed into the ``frame;frame;frame count`` format read by
+flamegraph.pl, speedscope and similar tools; it is not used for the
+breakdown.
+"""
+import functools
+import inspect
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from .gpio_helper import GpioHelper
+from .gpio_vectors import VectorEngine
+from .reg_parser import ExtiDef, GpioRegMap, PinMapConfig
+
+_PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+HELPER_CLASSES = (GpioHelper, VectorEngine, GpioRegMap, PinMapConfig, ExtiDef)
+
+PARTS = ("setup", "driver", "helpers", "report", "other")
+
+
+def _frame_label(code) -> str:
+    path = Path(code.co_filename)
+    try:
+        where = path.relative_to(_PACKAGE_ROOT.parent).as_posix()
+    except ValueError:
+        where = path.name
+    return f"{where}:{code.co_qualname}".replace(";", ",").replace(" ", "_")
+
+
+class HelperTimer:
+    """Time spent in the public methods of *classes* on one thread.
+
+    ``install()`` wraps the methods in place.  Only the outermost call is
+    timed, and the driver time (*driver_ns*) elapsed during it is left
+    out, so ``total_ns`` is the helpers' own Python time.  Calls from other
+    threads (``--parallel-probes`` workers) pass through untimed."""
+
+    def __init__(self, classes, driver_ns, target: threading.Thread):
+        self.classes = classes
+        self.total_ns = 0
+        self._driver_ns = driver_ns
+        self._target_id = target.ident
+        self._active = False
+        self._saved: list[tuple] = []
+
+    def install(self) -> None:
+        for cls in self.classes:
+            for name, attr in list(vars(cls).items()):
+                if not name.startswith("_") and inspect.isfunction(attr):
+                    self._saved.append((cls, name, attr))
+                    setattr(cls, name, self._wrap(attr))
+
+    def uninstall(self) -> None:
+        for cls, name, attr in reversed(self._saved):
+            setattr(cls, name, attr)
+        self._saved.clear()
+
+    def _wrap(self, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if self._active or threading.get_ident() != self._target_id:
+                return func(*args, **kwargs)
+            self._active = True
+            start, driver = time.perf_counter_ns(), self._driver_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._active = False
+                spent = time.perf_counter_ns() - start - (self._driver_ns() - driver)
+                self.total_ns += max(0, spent)
+        return timed
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's stack every *interval* seconds; ``stacks``
+    counts the collapsed stacks (root first)."""
+
+    def __init__(self, target: threading.Thread, interval: float = 0.001):
+        super().__init__(name="jtag-profile-sampler", daemon=True)
+        self.target_id = target.ident
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._labels: dict = {}
+        self._stopped = threading.Event()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def sample(self) -> None:
+        frame = sys._current_frames().get(self.target_id)
+        if frame is None:
+            return
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        self.stacks[";".join(self._label(code) for code in codes)] += 1
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def write_folded(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _Window:
+    """Driver and helper time at the start of a phase."""
+
+    def __init__(self, profiler: "JtagProfiler"):
+        self.profiler = profiler
+        self.start = time.perf_counter_ns()
+        self.driver_ns = profiler.driver_ns()
+        self.helpers_ns = profiler.helpers_ns()
+
+    def close(self) -> tuple[int, int, int]:
+        """(wall, driver, helpers) nanoseconds since the window opened."""
+        wall = time.perf_counter_ns() - self.start
+        driver = self.profiler.driver_ns() - self.driver_ns
+        helpers = self.profiler.helpers_ns() - self.helpers_ns
+        return wall, driver, min(helpers, max(0, wall - driver))
+
+
+class JtagProfiler:
+    """Pytest plugin behind ``--profile-jtag DIR``.
+
+    ``chips`` are the ProfilingChip layers of the session's chips (added
+    by ``_wrap_chip``).  At session end DIR/stacks.folded gets the sampled
+    stacks and DIR/tests.json the breakdown of every test."""
+
+    def __init__(self, out_dir: str | Path, interval: float = 0.001, top: int = 15):
+        self.out_dir = Path(out_dir)
+        self.interval = interval
+        self.top = top
+        self.chips: list = []
+        self.sampler: StackSampler | None = None
+        self.helpers: HelperTimer | None = None
+        self.tests: list[dict] = []
+        self._current: dict | None = None
+        self._switch_interval = None
+
+    def driver_ns(self) -> int:
+        return sum(chip.total_ns() for chip in self.chips)
+
+    def helpers_ns(self) -> int:
+        return self.helpers.total_ns if self.helpers else 0
+
+    def pytest_sessionstart(self, session):
+        self.helpers = HelperTimer(HELPER_CLASSES, self.driver_ns, threading.current_thread())
+        self.helpers.install()
+        self._switch_interval = sys.getswitchinterval()
+        # The sampler needs the GIL while CPU-bound tests hold it
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 2))
+        self.sampler = StackSampler(threading.current_thread(), self.interval)
+        self.sampler.start()
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        for chip in self.chips:
+            chip.take()
+        self._current = dict.fromkeys(PARTS, 0) | {"methods": {}}
+        start = time.perf_counter_ns()
+        yield
+        total = time.perf_counter_ns() - start
+        test = self._current
+        self._current = None
+        for chip in self.chips:
+            for method, (calls, ns) in chip.take().items():
+                stats = test["methods"].setdefault(method, [0, 0])
+                stats[0] += calls
+                stats[1] += ns
+        test["driver"] = sum(ns for _, ns in test["methods"].values())
+        test["other"] = max(0, total - sum(test[part] for part in PARTS))
+        test["total"] = total
+        test["bound"] = "JTAG" if 2 * test["driver"] >= total else "CPU"
+        test["nodeid"] = item.nodeid
+        self.tests.append(test)
+
+    def _phase(self, setup: bool):
+        window = _Window(self)
+        yield
+        if self._current is None:
+            return
+        wall, driver, helpers = window.close()
+        self._current["helpers"] += helpers
+        if setup:
+            self._current["setup"] += max(0, wall - driver - helpers)
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_setup(self, item):
+        yield from self._phase(setup=True)
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_call(self, item):
+        yield from self._phase(setup=False)
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        yield from self._phase(setup=False)
+
+    def _report(self):
+        start = time.perf_counter_ns()
+        yield
+        if self._current is not None:
+            self._current["report"] += time.perf_counter_ns() - start
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_makereport(self, item, call):
+        yield from self._report()
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_logreport(self, report):
+        yield from self._report()
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        if self.sampler is None:
+            return
+        self.sampler.stop()
+        self.helpers.uninstall()
+        sys.setswitchinterval(self._switch_interval)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.sampler.write_folded(self.out_dir / "stacks.folded")
+        doc = {"interval": self.interval, "samples": sum(self.sampler.stacks.values()),
+               "methods": self.session_methods(), "tests": self.tests}
+        (self.out_dir / "tests.json").write_text(json.dumps(doc, indent=1), encoding="utf-8")
+
+    def session_methods(self) -> dict[str, list[int]]:
+        """[calls, ns] per ChipInterface method over the session, both chips."""
+        methods: dict[str, list[int]] = {}
+        for chip in self.chips:
+            for method, (calls, ns) in chip.session.items():
+                stats = methods.setdefault(method, [0, 0])
+                stats[0] += calls
+                stats[1] += ns
+        return methods
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.tests:
+            return
+        write = terminalreporter.write_line
+        terminalreporter.section("JTAG profile")
+        totals = {part: sum(t[part] for t in self.tests) for part in PARTS}
+        wall = sum(t["total"] for t in self.tests)
+        jtag = sum(1 for t in self.tests if t["bound"] == "JTAG")
+        write(f"{len(self.tests)} tests, {wall / 1e6:.1f} ms: " + ", ".join(
+            f"{part} {totals[part] / 1e6:.1f} ms" for part in PARTS)
+            + f"; {jtag} JTAG-bound, {len(self.tests) - jtag} CPU-bound")
+        for method, (calls, ns) in sorted(self.session_methods().items(),
+                                          key=lambda kv: -kv[1][1]):
+            write(f"  {method:18s} {calls:8d} calls {ns / 1e6:10.1f} ms "
+                  f"{ns / calls / 1e3:8.1f} us/call")
+        write("slowest tests (ms):")
+        write(f"{'total':>8s} {'setup':>7s} {'driver':>7s} {'helpers':>7s} "
+              f"{'report':>7s} {'other':>7s} {'bound':5s} test")
+        for t in sorted(self.tests, key=lambda t: -t["total"])[:self.top]:
+            write(f"{t['total'] / 1e6:8.2f} " + " ".join(
+                f"{t[part] / 1e6:7.2f}" for part in PARTS) + f" {t['bound']:5s} {t['nodeid']}")
+        write(f"stacks: {self.out_dir / 'stacks.folded'} "
+              f"({sum(self.sampler.stacks.values())} samples every {self.interval * 1e3:g} ms), "
+              f"breakdown: {self.out_dir / 'tests.json'}")
@@ -0,0 +1,259 @@
+"""Register coverage engine for test plan chapter 12 (R-01 ~ R-06).
+
+Per-register masks of a RegTable are packed into *vectors*: Python ints
+holding one 32-bit lane per register (register ``i`` in bits
+``32*i .. 32*i+31``).  A check over the whole table is then a few bitwise
+operations on two vectors instead of a loop over registers, and chip
+traffic is one ``execute_ops`` batch per sweep (write every register, read
+every register back).
+"""
+import random
+import sys
+from array import array
+from dataclasses import dataclass, field, replace
+
+from ..drivers.chip_interface import ChipInterface, RegOp
+from .reg_parser import FieldDef, PeriphRegDef, RegTable
+
+RW = "read-write"
+RO = "read-only"
+WO = "write-only"
+W1C = "write-1-to-clear"
+
+PATTERNS = (0x55555555, 0xAAAAAAAA)
+
+
+def _pack(values) -> int:
+    """Pack 32-bit values into a vector, value ``i`` in lane ``i``."""
+    return int.from_bytes(array("I", values).tobytes(), sys.byteorder)
+
+
+def _unpack(vector: int, n: int) -> array:
+    lanes = array("I")
+    lanes.frombytes(vector.to_bytes(4 * n, sys.byteorder))
+    return lanes
+
+
+def _fill(n: int, value: int) -> int:
+    """Vector with *value* in each of *n* lanes."""
+    return value * (((1 << (32 * n)) - 1) // 0xFFFFFFFF)
+
+
+@dataclass
+class SweepPass:
+    """One compared sweep: lanes of *actual* must equal *expected* on *mask*."""
+    label: str
+    expected: int
+    actual: int
+    mask: int
+
+    def failing_lanes(self, n: int) -> list[int]:
+        diff = (self.expected ^ self.actual) & self.mask
+        if not diff:
+            return []
+        return [i for i, lane in enumerate(_unpack(diff, n)) if lane]
+
+
+@dataclass
+class CoverageResult:
+    """Outcome of one R-xx check over a register table."""
+    test_id: str
+    test_name: str
+    registers: list[PeriphRegDef]
+    passes: list[SweepPass] = field(default_factory=list)
+    exercised_bits: int | None = None  # R-05: w1c bits found set before clearing
+
+    def first_failures(self) -> dict[int, int]:
+        """Map failing register index -> index of the first pass it failed."""
+        failed: dict[int, int] = {}
+        for pass_no, sweep in enumerate(self.passes):
+            for i in sweep.failing_lanes(len(self.registers)):
+                failed.setdefault(i, pass_no)
+        return failed
+
+    def checked(self) -> list[int]:
+        """Indices of registers with at least one bit under test."""
+        covered = 0
+        for sweep in self.passes:
+            covered |= sweep.mask
+        return [i for i, lane in enumerate(_unpack(covered, len(self.registers))) if lane]
+
+    def describe_failures(self, limit: int = 10) -> list[str]:
+        out = []
+        for i, pass_no in list(self.first_failures().items())[:limit]:
+            sweep = self.passes[pass_no]
+            exp, act, mask = (_lane(v, i) for v in (sweep.expected, sweep.actual, sweep.mask))
+            out.append(f"{self.registers[i].name} ({sweep.label}): expected "
+                       f"0x{exp & mask:08X}, got 0x{act & mask:08X} (mask 0x{mask:08X})")
+        return out
+
+    def rows(self, chip: str) -> list[dict]:
+        """One CSV row per checked register, in ``pin_results`` format."""
+        failed = self.first_failures()
+        last = len(self.passes) - 1
+        rows = []
+        for i in self.checked():
+            sweep = self.passes[failed.get(i, last)]
+            mask = _lane(sweep.mask, i)
+            rows.append({
+                "chip": chip,
+                "pin": self.registers[i].name,
+                "test_id": self.test_id,
+                "test_name": self.test_name,
+                "expected": f"0x{_lane(sweep.expected, i) & mask:08X}",
+                "actual": f"0x{_lane(sweep.actual, i) & mask:08X}",
+                "result": "FAIL" if i in failed else "PASS",
+            })
+        return rows
+
+
+def _lane(vector: int, i: int) -> int:
+    return (vector >> (32 * i)) & 0xFFFFFFFF
+
+
+class RegisterCoverage:
+    """Run the chapter 12 register checks for one chip and register table."""
+
+    def __init__(self, chip: ChipInterface, table: RegTable, batch_size: int = 4096):
+        self.chip = chip
+        self.table = table
+        self.batch_size = batch_size
+        regs = table.registers
+        self.n = len(regs)
+        self.addrs = [r.addr for r in regs]
+        self.ones = _fill(self.n, 0xFFFFFFFF)
+        self.reset = _pack(r.reset for r in regs)
+        self.rw = _pack(r.access_mask(RW) for r in regs)
+        self.ro = _pack(r.access_mask(RO) for r in regs)
+        self.wo = _pack(r.access_mask(WO) for r in regs)
+        self.w1c = _pack(r.access_mask(W1C) for r in regs)
+        self.reserved = _pack(r.reserved_mask for r in regs)
+        # Read-write field masks per register, for the R-06 boundary rounds
+        self._rw_fields = [[f.mask for f in r.fields if f.access == RW] for r in regs]
+
+    # -- bulk access -----------------------------------------------------------
+
+    def _run(self, ops: list[RegOp]) -> None:
+        for start in range(0, len(ops), self.batch_size):
+            self.chip.execute_ops(ops[start:start + self.batch_size])
+
+    def read_all(self) -> int:
+        """Read every register of the table; return the result vector."""
+        ops = [RegOp("read", addr) for addr in self.addrs]
+        self._run(ops)
+        return _pack(op.value for op in ops)
+
+    def write_read(self, values: int, lanes: list[int] | None = None) -> int:
+        """Write lane ``i`` of *values* to register ``i``, then read the
+        registers back.  With *lanes*, only those registers are accessed
+        and the other lanes of the result are 0."""
+        lanes = range(self.n) if lanes is None else lanes
+        vals = _unpack(values & self.ones, self.n)
+        reads = [RegOp("read", self.addrs[i]) for i in lanes]
+        self._run([RegOp("write", self.addrs[i], vals[i]) for i in lanes] + reads)
+        out = array("I", bytes(4 * self.n))
+        for i, op in zip(lanes, reads):
+            out[i] = op.value
+        return _pack(out)
+
+    # -- checks ----------------------------------------------------------------
+
+    def check_reset_values(self) -> CoverageResult:
+        """R-01: after reset every readable bit holds its reset value."""
+        self.chip.reset()
+        actual = self.read_all()
+        return CoverageResult("R-01", "reset_value", self.table.registers, [
+            SweepPass("after reset", self.reset, actual, self.ones & ~self.wo)])
+
+    def check_read_write(self, patterns=PATTERNS) -> CoverageResult:
+        """R-02: read-write bits read back each pattern written."""
+        result = CoverageResult("R-02", "read_write", self.table.registers)
+        keep = self.reset & self.reserved
+        for pattern in patterns:
+            value = (_fill(self.n, pattern) & self.rw) | keep
+            actual = self.write_read(value)
+            result.passes.append(SweepPass(f"pattern 0x{pattern:08X}", value, actual, self.rw))
+        return result
+
+    def check_read_only(self) -> CoverageResult:
+        """R-03: writing the complement of read-only bits leaves them unchanged."""
+        before = self.read_all()
+        value = (~before & self.ro) | (before & self.rw) | (self.reset & self.reserved)
+        actual = self.write_read(value)
+        return CoverageResult("R-03", "read_only", self.table.registers, [
+            SweepPass("inverted write", before, actual, self.ro)])
+
+    def check_reserved(self) -> CoverageResult:
+        """R-04: reserved bits keep their reset value when written with 1s."""
+        actual = self.write_read(self.reserved | (self.reset & self.rw))
+        return CoverageResult("R-04", "reserved", self.table.registers, [
+            SweepPass("ones written", self.reset, actual, self.reserved)])
+
+    def check_w1c(self) -> CoverageResult:
+        """R-05: writing 1 to write-1-to-clear bits clears them.
+
+        Only bits already set (by reset or hardware events) exercise the
+        clear; their count is reported in ``exercised_bits``."""
+        before = self.read_all()
+        actual = self.write_read(self.w1c)
+        return CoverageResult("R-05", "w1c", self.table.registers, [
+            SweepPass("ones written", 0, actual, self.w1c)],
+            exercised_bits=(before & self.w1c).bit_count())
+
+    def check_field_boundaries(self) -> CoverageResult:
+        """R-06: each read-write field takes its max and min value without
+        disturbing the other fields.
+
+        Round ``k`` covers the k-th read-write field of every register at
+        once: max over a background of zeros, then min over a background
+        of ones."""
+        result = CoverageResult("R-06", "field_boundary", self.table.registers)
+        keep = self.reset & self.reserved
+        rounds = max((len(f) for f in self._rw_fields), default=0)
+        for k in range(rounds):
+            lanes = [i for i, f in enumerate(self._rw_fields) if len(f) > k]
+            field_masks = array("I", bytes(4 * self.n))
+            selected = array("I", bytes(4 * self.n))
+            for i in lanes:
+                field_masks[i] = self._rw_fields[i][k]
+                selected[i] = 0xFFFFFFFF
+            fields = _pack(field_masks)
+            rw = self.rw & _pack(selected)
+            for label, value in ((f"field #{k} max", fields), (f"field #{k} min", rw & ~fields)):
+                actual = self.write_read(value | keep, lanes)
+                result.passes.append(SweepPass(label, value, actual, rw))
+        return result
+
+
+# ---------------------------------------------------------------------------
+# Synthetic tables for the mock
+# ---------------------------------------------------------------------------
+
+def synthetic_table(n_regs: int = 4096, base_addr: int = 0x50000000, seed: int = 0) -> RegTable:
+    """Generate a reproducible register table with random field layouts
+    mixing every access type and reserved gaps."""
+    rng = random.Random(seed)
+    regs = []
+    for i in range(n_regs):
+        fields = []
+        bit = 0
+        while True:
+            bit += rng.choice((0, 0, 1, 2))  # reserved gap
+            width = min(rng.choice((1, 1, 2, 3, 4, 8)), 32 - bit)
+            if width <= 0:
+                break
+            access = rng.choices((RW, RO, WO, W1C), weights=(6, 2, 1, 1))[0]
+            fields.append(FieldDef(f"F{len(fields)}", bit, width, access))
+            bit += width
+        reg = PeriphRegDef(f"SYN{i // 64}.R{i % 64}", base_addr + 4 * i, fields=tuple(fields))
+        regs.append(replace(reg, reset=rng.getrandbits(32) & (
+            reg.access_mask(RW) | reg.access_mask(RO) | reg.access_mask(W1C))))
+    return RegTable(f"synthetic{n_regs}", tuple(regs))
+
+
+def mock_specs(table: RegTable):
+    """``MockJtagImpl.define_registers`` specs implementing *table*'s access types."""
+    for reg in table.registers:
+        wo = reg.access_mask(WO)
+        yield (reg.addr, reg.reset, reg.access_mask(RW) | wo, reg.access_mask(W1C),
+               ~wo & 0xFFFFFFFF)
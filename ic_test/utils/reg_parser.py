@@ -1,11 +1,35 @@
-from dataclasses import dataclass, field
+import hashlib
+import os
+import pickle
+import struct
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import List
+from typing import Callable, Mapping
 
 import yaml
 
+# Bump when the dataclasses below change shape, to invalidate on-disk caches
+_CACHE_VERSION = 3
 
-@dataclass
+# libyaml's loader when PyYAML was built with it
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class _FrozenDict(dict):
+    """dict that cannot be modified; the loaders below share what they
+    return.  Unlike MappingProxyType it pickles (on-disk cache)."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+@dataclass(frozen=True)
 class RegisterDef:
     name: str
     offset: int
@@ -13,43 +37,121 @@ class RegisterDef:
     access: str = "read-write"
 
 
-@dataclass
+@dataclass(frozen=True)
 class GpioPortDef:
     name: str
     base_addr: int
-    pins: List[int]
+    pins: tuple[int, ...]
 
 
-@dataclass
+@dataclass(frozen=True)
 class ExtiDef:
     base_addr: int
     imr_offset: int
     rtsr_offset: int
     ftsr_offset: int
     pr_offset: int
+    access: Mapping[str, str] = field(default_factory=_FrozenDict)
+
+    def reg_addrs(self) -> dict[str, int]:
+        """Return absolute addresses of the EXTI registers keyed by name."""
+        return {
+            "IMR": self.base_addr + self.imr_offset,
+            "RTSR": self.base_addr + self.rtsr_offset,
+            "FTSR": self.base_addr + self.ftsr_offset,
+            "PR": self.base_addr + self.pr_offset,
+        }
 
 
-@dataclass
+@dataclass(frozen=True)
 class SyscfgDef:
     base_addr: int
-    exticr_offsets: List[int]
+    exticr_offsets: tuple[int, ...]
 
 
-@dataclass
+@dataclass(frozen=True)
 class GpioRegMap:
-    ports: dict[str, GpioPortDef] = field(default_factory=dict)
-    registers: dict[str, RegisterDef] = field(default_factory=dict)
+    """GPIO/EXTI register layout.  Maps returned by ``load_gpio_regs`` are
+    shared and read-only throughout; one built by hand may fill in
+    ``ports`` and ``registers`` afterwards."""
+    ports: Mapping[str, GpioPortDef] = field(default_factory=dict)
+    registers: Mapping[str, RegisterDef] = field(default_factory=dict)
     exti: ExtiDef | None = None
     syscfg: SyscfgDef | None = None
+    # port -> register -> absolute address, filled in by compile()
+    addr_table: Mapping[str, Mapping[str, int]] = field(default_factory=_FrozenDict, repr=False)
+
+    def compile(self) -> "GpioRegMap":
+        """Precompute the absolute address of every register on every port.
+        Call again after editing ``ports`` or ``registers``."""
+        object.__setattr__(self, "addr_table", _FrozenDict(
+            (port, _FrozenDict((name, port_def.base_addr + reg_def.offset)
+                               for name, reg_def in self.registers.items()))
+            for port, port_def in self.ports.items()
+        ))
+        return self
 
     def get_reg_addr(self, port: str, reg_name: str) -> int:
         """Return absolute address for a register on a given port."""
-        port_def = self.ports[port]
-        reg_def = self.registers[reg_name]
-        return port_def.base_addr + reg_def.offset
+        try:
+            return self.addr_table[port][reg_name]
+        except KeyError:
+            # Not compiled (or edited since): compute it
+            return self.ports[port].base_addr + self.registers[reg_name].offset
+
+    def cacheable_addrs(self) -> set[int]:
+        """Return addresses of registers whose value only changes when
+        written over JTAG (``access: read-write``), i.e. safe to shadow."""
+        addrs = set()
+        for port in self.ports:
+            for name, reg_def in self.registers.items():
+                if reg_def.access == "read-write":
+                    addrs.add(self.get_reg_addr(port, name))
+        if self.exti is not None:
+            for name, addr in self.exti.reg_addrs().items():
+                if self.exti.access.get(name, "read-write") == "read-write":
+                    addrs.add(addr)
+        return addrs
 
+    def state_regs(self) -> tuple[list[int], set[int]]:
+        """Return the addresses holding the GPIO/EXTI configuration, in the
+        order to restore them, and the write-1-to-clear ones among them.
 
-@dataclass
+        EXTI triggers and masks come first, then SYSCFG line selection, then
+        every port's read-write registers; pending flags come last so edges
+        caused by the restore itself are cleared too.  Read-only and
+        write-only registers are not part of the state."""
+        addrs, w1c = [], set()
+        exti_regs = self.exti.reg_addrs() if self.exti is not None else {}
+        for name, addr in exti_regs.items():
+            if self.exti.access.get(name, "read-write") == "read-write":
+                addrs.append(addr)
+        if self.syscfg is not None:
+            addrs.extend(self.syscfg.base_addr + offset for offset in self.syscfg.exticr_offsets)
+        for port in self.ports:
+            for name, reg_def in self.registers.items():
+                if reg_def.access == "read-write":
+                    addrs.append(self.get_reg_addr(port, name))
+        for name, addr in exti_regs.items():
+            if self.exti.access.get(name) == "write-1-to-clear":
+                addrs.append(addr)
+                w1c.add(addr)
+        return addrs, w1c
+
+    def write_aliases(self) -> dict[int, set[int]]:
+        """Map each write-only register (e.g. BSRR) to the cacheable
+        registers of the same port that a write to it may modify."""
+        cacheable = self.cacheable_addrs()
+        aliases = {}
+        for port in self.ports:
+            port_regs = {self.get_reg_addr(port, name) for name in self.registers}
+            for name, reg_def in self.registers.items():
+                if reg_def.access == "write-only":
+                    aliases[self.get_reg_addr(port, name)] = port_regs & cacheable
+        return aliases
+
+
+@dataclass(frozen=True)
 class PinPair:
     mcu_a_port: str
     mcu_a_pin: int
@@ -65,67 +167,245 @@ class PinPair:
         return f"{self.mcu_b_port[-1]}{self.mcu_b_pin}"
 
 
-@dataclass
+@dataclass(frozen=True)
+class PortGroup:
+    """All pin pairs wired between one MCU-A port and one MCU-B port."""
+    mcu_a_port: str
+    mcu_b_port: str
+    pin_pairs: tuple[PinPair, ...]
+
+    @property
+    def mask_a(self) -> int:
+        return sum(1 << pp.mcu_a_pin for pp in self.pin_pairs)
+
+    @property
+    def mask_b(self) -> int:
+        return sum(1 << pp.mcu_b_pin for pp in self.pin_pairs)
+
+
+@dataclass(frozen=True)
 class PinMapConfig:
-    pin_pairs: List[PinPair]
-    excluded_pins: List[dict]
+    pin_pairs: tuple[PinPair, ...]
+    excluded_pins: tuple[Mapping, ...]
     jtag_id_a: str
     jtag_id_b: str
 
+    def port_groups(self) -> list[PortGroup]:
+        """Group pin pairs by (MCU-A port, MCU-B port), in pin map order."""
+        groups: dict[tuple[str, str], list[PinPair]] = {}
+        for pp in self.pin_pairs:
+            groups.setdefault((pp.mcu_a_port, pp.mcu_b_port), []).append(pp)
+        return [PortGroup(a, b, tuple(pairs)) for (a, b), pairs in groups.items()]
+
+
+# (kind, resolved path) -> (file stamp, loaded object), shared by the whole process
+_loaded: dict[tuple[str, str], tuple[tuple[int, int], object]] = {}
+
+
+def _load_cached(yaml_path: str | Path, kind: str, build: Callable[[dict], object]):
+    """Return ``build(yaml data)`` for *yaml_path*, reusing earlier results.
+
+    The result is kept in-process, keyed by the file's mtime and size, and
+    pickled to ``__pycache__`` next to the YAML keyed by mtime, size and
+    content hash, so unchanged files are parsed once per edit rather than
+    once per call or per session.  Loaded objects are shared, so they are
+    immutable: frozen dataclasses, tuples and read-only dicts."""
+    abs_path = os.path.abspath(yaml_path)
+    st = os.stat(abs_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = (kind, abs_path)
+    hit = _loaded.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+
+    path = Path(abs_path)
+    cache_file = path.parent / "__pycache__" / f"{path.name}.{kind}.pickle"
+    cached = None
+    try:
+        with open(cache_file, "rb") as f:
+            cached = pickle.load(f)
+        if cached["version"] != _CACHE_VERSION:
+            cached = None
+    except Exception:
+        cached = None  # missing, stale or unreadable: rebuild
+
+    if cached is not None and cached["stamp"] == stamp:
+        obj = cached["obj"]
+    else:
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached is not None and cached["sha256"] == digest:
+            obj = cached["obj"]  # touched (e.g. by a checkout) but not changed
+        else:
+            obj = build(yaml.load(raw, Loader=_YamlLoader))
+        _store_cache(cache_file, {"version": _CACHE_VERSION, "stamp": stamp,
+                                  "sha256": digest, "obj": obj})
+
+    _loaded[key] = (stamp, obj)
+    return obj
+
+
+def _store_cache(cache_file: Path, entry: dict) -> None:
+    try:
+        cache_file.parent.mkdir(exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass  # read-only checkout: the in-process cache still applies
+
+
+@dataclass(frozen=True)
+class FieldDef:
+    """One bit field of a peripheral register."""
+    name: str
+    lsb: int
+    width: int
+    access: str = "read-write"  # read-only / write-only / write-1-to-clear
+
+    @property
+    def mask(self) -> int:
+        return ((1 << self.width) - 1) << self.lsb
+
+
+@dataclass(frozen=True)
+class PeriphRegDef:
+    """A register of the full register table (chapter 12 coverage tests).
+
+    Bits not covered by any field are reserved."""
+    name: str
+    addr: int
+    reset: int = 0
+    fields: tuple[FieldDef, ...] = ()
+
+    def access_mask(self, access: str) -> int:
+        """OR of the masks of all fields with the given access type."""
+        mask = 0
+        for f in self.fields:
+            if f.access == access:
+                mask |= f.mask
+        return mask
+
+    @property
+    def reserved_mask(self) -> int:
+        used = 0
+        for f in self.fields:
+            used |= f.mask
+        return ~used & 0xFFFFFFFF
+
+
+@dataclass(frozen=True)
+class RegTable:
+    """Registers of one or more peripherals, in address order."""
+    name: str
+    registers: tuple[PeriphRegDef, ...] = ()
+
+
+# Result-region field types: struct format character per schema type name
+RESULT_TYPES = {
+    "u8": "B", "u16": "H", "u32": "I", "u64": "Q",
+    "i8": "b", "i16": "h", "i32": "i", "i64": "q",
+    "f32": "f", "f64": "d",
+}
+
+
+@dataclass(frozen=True)
+class ResultField:
+    """A leaf field of a firmware result region; nested struct members are
+    flattened to dotted names such as ``uart.errors``."""
+    name: str
+    offset: int
+    type: str
+    count: int | None = None  # array length; None for a scalar
+
+    @property
+    def format(self) -> str:
+        code = RESULT_TYPES[self.type]
+        return code if self.count is None else f"{self.count}{code}"
+
+
+@dataclass(frozen=True)
+class ResultRegion:
+    """Layout of one memory region written by the test firmware."""
+    name: str
+    addr: int
+    size: int
+    endian: str = "little"
+    fields: tuple[ResultField, ...] = ()
+
+    def field_names(self) -> list[str]:
+        return [f.name for f in self.fields]
+
 
 def load_gpio_regs(yaml_path: str | Path) -> GpioRegMap:
-    """Load GPIO register definitions from a YAML file."""
-    with open(yaml_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+    """Load GPIO register definitions from a YAML file (cached, see
+    ``_load_cached``)."""
+    return _load_cached(yaml_path, "gpio_regs", _build_gpio_regs)
+
 
+def _build_gpio_regs(data: dict) -> GpioRegMap:
     gpio = data["gpio"]
-    reg_map = GpioRegMap()
 
     # Parse ports
-    for name, info in gpio["ports"].items():
-        reg_map.ports[name] = GpioPortDef(
-            name=name,
-            base_addr=info["base_addr"],
-            pins=info["pins"],
-        )
+    ports = _FrozenDict(
+        (name, GpioPortDef(name=name, base_addr=info["base_addr"], pins=tuple(info["pins"])))
+        for name, info in gpio["ports"].items()
+    )
 
     # Parse registers
-    for name, info in gpio["registers"].items():
-        reg_map.registers[name] = RegisterDef(
+    registers = _FrozenDict(
+        (name, RegisterDef(
             name=name,
             offset=info["offset"],
             bits_per_pin=info["bits_per_pin"],
             access=info.get("access", "read-write"),
-        )
+        ))
+        for name, info in gpio["registers"].items()
+    )
 
     # Parse EXTI
+    exti_def = None
     if "exti" in gpio:
         exti = gpio["exti"]
-        regs = exti["registers"]
-        reg_map.exti = ExtiDef(
+        offsets = {}
+        access = {}
+        for name, info in exti["registers"].items():
+            # Either a bare offset or { offset: ..., access: ... }
+            if isinstance(info, dict):
+                offsets[name] = info["offset"]
+                access[name] = info.get("access", "read-write")
+            else:
+                offsets[name] = info
+                access[name] = "read-write"
+        exti_def = ExtiDef(
             base_addr=exti["base_addr"],
-            imr_offset=regs["IMR"],
-            rtsr_offset=regs["RTSR"],
-            ftsr_offset=regs["FTSR"],
-            pr_offset=regs["PR"],
+            imr_offset=offsets["IMR"],
+            rtsr_offset=offsets["RTSR"],
+            ftsr_offset=offsets["FTSR"],
+            pr_offset=offsets["PR"],
+            access=_FrozenDict(access),
         )
 
     # Parse SYSCFG
+    syscfg_def = None
     if "syscfg" in gpio:
         sc = gpio["syscfg"]
-        reg_map.syscfg = SyscfgDef(
+        syscfg_def = SyscfgDef(
             base_addr=sc["base_addr"],
-            exticr_offsets=sc["exticr_offsets"],
+            exticr_offsets=tuple(sc["exticr_offsets"]),
         )
 
-    return reg_map
+    return GpioRegMap(ports, registers, exti_def, syscfg_def).compile()
 
 
 def load_pin_map(yaml_path: str | Path) -> PinMapConfig:
-    """Load pin mapping configuration from a YAML file."""
-    with open(yaml_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+    """Load pin mapping configuration from a YAML file (cached, see
+    ``_load_cached``)."""
+    return _load_cached(yaml_path, "pin_map", _build_pin_map)
+
 
+def _build_pin_map(data: dict) -> PinMapConfig:
     pairs = []
     for item in data["pin_pairs"]:
         a = item["mcu_a"]
@@ -138,8 +418,124 @@ def load_pin_map(yaml_path: str | Path) -> PinMapConfig:
         ))
 
     return PinMapConfig(
-        pin_pairs=pairs,
-        excluded_pins=data.get("excluded_pins", []),
+        pin_pairs=tuple(pairs),
+        excluded_pins=tuple(_FrozenDict(p) for p in data.get("excluded_pins", [])),
         jtag_id_a=data["jtag"]["mcu_a"],
         jtag_id_b=data["jtag"]["mcu_b"],
     )
+
+
+def load_reg_table(yaml_path: str | Path) -> RegTable:
+    """Load a peripheral register table (cached, see ``_load_cached``).
+
+    Layout::
+
+        peripherals:
+          TIM2:
+            base_addr: 0x40000000
+            registers:
+              CR1:
+                offset: 0x00
+                reset: 0x0000
+                fields:
+                  CEN: { bits: 0 }
+                  CMS: { bits: "6:5" }
+                  UIF: { bits: 0, access: write-1-to-clear }
+
+    ``bits`` is a bit number or an ``"msb:lsb"`` range; ``access`` defaults
+    to read-write.  Register names are qualified as ``TIM2.CR1``."""
+    table = _load_cached(yaml_path, "reg_table", _build_reg_table)
+    if not table.name:
+        table = replace(table, name=Path(yaml_path).stem)
+    return table
+
+
+def _parse_bits(bits) -> tuple[int, int]:
+    """Return (lsb, width) for ``5`` or ``"6:5"``."""
+    if isinstance(bits, int):
+        return bits, 1
+    msb, lsb = (int(b) for b in str(bits).split(":"))
+    return lsb, msb - lsb + 1
+
+
+def _build_reg_table(data: dict) -> RegTable:
+    regs = []
+    for periph, pinfo in data["peripherals"].items():
+        base = pinfo["base_addr"]
+        for name, info in pinfo["registers"].items():
+            fields = []
+            for fname, finfo in info.get("fields", {}).items():
+                lsb, width = _parse_bits(finfo["bits"])
+                fields.append(FieldDef(fname, lsb, width, finfo.get("access", "read-write")))
+            regs.append(PeriphRegDef(
+                name=f"{periph}.{name}",
+                addr=base + info["offset"],
+                reset=info.get("reset", 0),
+                fields=tuple(fields),
+            ))
+    regs.sort(key=lambda r: r.addr)
+    return RegTable(data.get("name", ""), tuple(regs))
+
+
+def load_result_regions(yaml_path: str | Path) -> dict[str, ResultRegion]:
+    """Load firmware result-region layouts (cached, see ``_load_cached``).
+
+    Layout::
+
+        regions:
+          stats:
+            addr: 0x2000F100
+            endian: little          # default
+            packed: false           # default: C alignment
+            fields:
+              uart:    { fields: { total: { type: u32 }, errors: { type: u32 } } }
+              samples: { type: i16, count: 64 }
+              flags:   { type: u8, offset: 0x40 }
+
+    Fields follow each other with natural alignment unless the region is
+    ``packed`` or a field has an explicit ``offset`` (relative to the
+    enclosing struct)."""
+    return _load_cached(yaml_path, "result_regions", _build_result_regions)
+
+
+def _build_result_regions(data: dict) -> dict[str, ResultRegion]:
+    regions = {}
+    for name, info in data["regions"].items():
+        fields: list[ResultField] = []
+        size, _ = _layout_struct(info["fields"], "", 0, info.get("packed", False), fields)
+        regions[name] = ResultRegion(name, info["addr"], info.get("size", size),
+                                     info.get("endian", "little"), tuple(fields))
+    return _FrozenDict(regions)
+
+
+def _layout_struct(members: dict, prefix: str, base: int, packed: bool,
+                   out: list[ResultField]) -> tuple[int, int]:
+    """Append the leaf fields of a struct at *base* to *out*; return the
+    struct's (size, alignment)."""
+    pos, struct_align = 0, 1
+    for name, info in members.items():
+        count = info.get("count")
+        if "fields" in info:
+            # Lay the member out once to learn its size, then once per element
+            elem_size, align = _layout_struct(info["fields"], "", 0, packed, [])
+        else:
+            if info["type"] not in RESULT_TYPES:
+                raise ValueError(f"{prefix}{name}: unknown type {info['type']!r}")
+            elem_size = align = _type_size(info["type"])
+        if packed:
+            align = 1
+        pos = info["offset"] if "offset" in info else -(-pos // align) * align
+        struct_align = max(struct_align, align)
+        if "fields" in info:
+            for i in range(count or 1):
+                sub = f"{prefix}{name}[{i}]." if count else f"{prefix}{name}."
+                _layout_struct(info["fields"], sub, base + pos + i * elem_size, packed, out)
+        else:
+            out.append(ResultField(f"{prefix}{name}", base + pos, info["type"], count))
+        pos += elem_size * (count or 1)
+    return -(-pos // struct_align) * struct_align, struct_align
+
+
+def _type_size(type_name: str) -> int:
+    """Size in bytes of a result field type."""
+    return struct.calcsize("<" + RESULT_TYPES[type_name])
@@ -1,45 +1,257 @@
 import csv
-import datetime
+import os
+import queue
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
 
+FIELDNAMES = [
+    "chip", "pin", "test_id", "test_name",
+    "expected", "actual", "result", "timestamp",
+]
+
+_STOP = object()
+
+
+def result_rows(user_props, passed: bool) -> list[list]:
+    """Turn a test's user properties into report rows (FIELDNAMES minus
+    the timestamp).  Port-parallel and register tests report one row per
+    pin themselves through ``pin_results``.  A ``status`` of ``ERROR``
+    (probe failure, set by conftest) overrides FAIL, on every failed row
+    of ``pin_results`` too; if all of those passed, a row for the test
+    itself carries the error."""
+    props = dict(user_props)
+    status = None if passed else props.get("status")
+    test_row = [
+        props.get("chip", ""),
+        props.get("pin", ""),
+        props.get("test_id", ""),
+        props.get("test_name", ""),
+        props.get("expected", ""),
+        props.get("actual", ""),
+        "PASS" if passed else status or "FAIL",
+    ]
+    rows = props.get("pin_results")
+    if rows is None:
+        return [test_row]
+    out = [[row.get(k, "") for k in FIELDNAMES[:-1]] for row in rows]
+    if status:
+        failed = [row for row in out if row[-1] != "PASS"]
+        for row in failed:
+            row[-1] = status
+        if not failed:
+            out.append(test_row)
+    return out
+
+
+def _extra_values(user_props, extra_fields: list[str]) -> list:
+    props = dict(user_props)
+    return [props.get(k, "") for k in extra_fields]
+
+
 class CsvReportPlugin:
-    """Pytest plugin that generates a CSV report of test results."""
+    """Pytest plugin that streams a CSV report of test results.
 
-    def __init__(self, csv_path: str):
+    Rows are handed to a write-behind thread through a bounded queue and
+    flushed to disk as they arrive (fsync at most every *fsync_interval*
+    seconds), so a crash loses at most the rows still queued.  The main
+    thread only captures the report time and the test's user properties;
+    row building and timestamp formatting happen in the writer.
+
+    With *append* an existing report is continued: a truncated last line
+    left by a crash is dropped and no second header is written.  Under
+    pytest-xdist each worker writes ``<csv>.<worker id>`` and the
+    controller (*merge_workers*) merges the parts into *csv_path* at
+    session end.
+
+    *extra_fields* names user properties appended as extra columns; a
+    test reporting several rows carries them on its first row only.
+
+    If the report cannot be written the tests still run; the error is
+    shown in the terminal summary and the session exits non-zero."""
+
+    def __init__(self, csv_path: str, append: bool = False, worker_id: str | None = None,
+                 merge_workers: bool = False, extra_fields: list[str] | None = None,
+                 queue_size: int = 1024, fsync_interval: float = 1.0):
         self.csv_path = Path(csv_path)
-        self.results: list[dict] = []
+        # User properties written as extra columns after the timestamp
+        self.extra_fields = list(extra_fields or [])
+        self.fieldnames = FIELDNAMES + self.extra_fields
+        self.append = append
+        self.worker_id = worker_id
+        self.merge_workers = merge_workers
+        self.path = self.csv_path.with_name(f"{self.csv_path.name}.{worker_id}") \
+            if worker_id else self.csv_path
+        self.fsync_interval = fsync_interval
+        self.rows_written = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._error: BaseException | None = None
 
     @pytest.hookimpl(hookwrapper=True)
     def pytest_runtest_makereport(self, item, call):
         outcome = yield
         report = outcome.get_result()
-        if report.when != "call":
+        if report.when != "call" or self._error is not None:
             return
-
-        # Extract metadata stored by the test via item.user_properties
-        props = dict(item.user_properties)
-        self.results.append({
-            "chip": props.get("chip", ""),
-            "pin": props.get("pin", ""),
-            "test_id": props.get("test_id", ""),
-            "test_name": props.get("test_name", ""),
-            "expected": props.get("expected", ""),
-            "actual": props.get("actual", ""),
-            "result": "PASS" if report.passed else "FAIL",
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        })
+        if self._thread is None:
+            try:
+                self._start()
+            except (OSError, ValueError) as e:
+                self._error = e
+                return
+        self._queue.put((time.time(), tuple(item.user_properties), report.passed))
 
     def pytest_sessionfinish(self, session, exitstatus):
-        if not self.results:
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        if self.merge_workers:
+            try:
+                self._merge_worker_parts()
+            except (OSError, ValueError) as e:
+                self._error = self._error or e
+        if self._error is not None and session.exitstatus == pytest.ExitCode.OK:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self._error is not None:
+            terminalreporter.section("CSV report", red=True)
+            terminalreporter.write_line(
+                f"{self.path}: report incomplete after {self.rows_written} rows: "
+                f"{type(self._error).__name__}: {self._error}", red=True)
+
+    # -- writer thread ---------------------------------------------------------
+
+    def _start(self) -> None:
+        f = _open_for_append(self.path, self.fieldnames) if self.append \
+            else open(self.path, "w", newline="", encoding="utf-8")
+        if f.tell() == 0:
+            csv.writer(f).writerow(self.fieldnames)
+        self._thread = threading.Thread(target=self._write_loop, args=(f,),
+                                        name="csv-report", daemon=True)
+        self._thread.start()
+
+    def _write_loop(self, f) -> None:
+        writer = csv.writer(f)
+        last_second, stamp = None, ""
+        last_sync = time.monotonic()
+        stop = False
+        try:
+            with f:
+                while True:
+                    entries = [self._queue.get()]
+                    while not self._queue.empty():
+                        entries.append(self._queue.get_nowait())
+                    stop = entries[-1] is _STOP
+                    if stop:
+                        entries.pop()
+
+                    for when, user_props, passed in entries:
+                        second = int(when)
+                        if second != last_second:
+                            last_second = second
+                            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+                        rows = result_rows(user_props, passed)
+                        if self.extra_fields:
+                            extra = _extra_values(user_props, self.extra_fields)
+                            blank = [""] * len(extra)
+                            writer.writerows([row + [stamp] + (blank if i else extra)
+                                              for i, row in enumerate(rows)])
+                        else:
+                            writer.writerows([row + [stamp] for row in rows])
+                        self.rows_written += len(rows)
+
+                    f.flush()
+                    if stop or time.monotonic() - last_sync >= self.fsync_interval:
+                        os.fsync(f.fileno())
+                        last_sync = time.monotonic()
+                    if stop:
+                        return
+        except BaseException as e:
+            self._error = e
+            # Keep draining so the test process never blocks on a full queue
+            while not stop:
+                stop = self._queue.get() is _STOP
+
+    def _merge_worker_parts(self) -> None:
+        parts = sorted(self.csv_path.parent.glob(f"{self.csv_path.name}.gw*"))
+        if not parts:
             return
-        fieldnames = [
-            "chip", "pin", "test_id", "test_name",
-            "expected", "actual", "result", "timestamp",
-        ]
-        with open(self.csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(self.results)
+        append = self.append or self.rows_written > 0
+        merge_csv_reports(parts, self.csv_path, append=append)
+        for part in parts:
+            part.unlink()
+
+
+def _drop_partial_line(f) -> None:
+    """Truncate a binary file object after its last newline, removing the
+    partial row a crash can leave behind."""
+    size = f.seek(0, os.SEEK_END)
+    pos = size
+    while pos > 0:
+        step = min(4096, pos)
+        f.seek(pos - step)
+        nl = f.read(step).rfind(b"\n")
+        if nl != -1:
+            pos = pos - step + nl + 1
+            break
+        pos -= step
+    if pos < size:
+        f.truncate(pos)
+
+
+def _open_for_append(path: Path, fieldnames: list[str]):
+    """Open a CSV report for appending rows after checking its header and
+    dropping a partial last line.  A missing file is created empty."""
+    with open(path, "a+b") as f:
+        if f.seek(0, os.SEEK_END):
+            f.seek(0)
+            header = f.readline().decode("utf-8").rstrip("\r\n")
+            if header.split(",") != fieldnames:
+                raise ValueError(f"{path}: existing CSV header does not match {fieldnames}")
+            _drop_partial_line(f)
+    return open(path, "a", newline="", encoding="utf-8")
+
+
+def merge_csv_reports(parts, out_path, extra_column: str | None = None,
+                      append: bool = False) -> int:
+    """Concatenate CSV reports into *out_path*; return the number of rows.
+
+    *parts* is a list of paths, or of ``(path, tag)`` tuples when
+    *extra_column* is given, in which case each row gets its tag in that
+    column (e.g. the rig that produced it).  Missing parts are skipped.
+    With *append* rows are added to an existing *out_path* without a
+    second header."""
+    writer = None
+    rows = 0
+    out_path = Path(out_path)
+    append = append and out_path.exists() and out_path.stat().st_size > 0
+    if append:
+        with open(out_path, "r+b") as f:
+            _drop_partial_line(f)
+    with open(out_path, "a" if append else "w", newline="", encoding="utf-8") as out:
+        for part in parts:
+            path, tag = part if extra_column else (part, None)
+            path = Path(path)
+            if not path.exists():
+                continue
+            with open(path, newline="", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                if writer is None:
+                    fieldnames = list(reader.fieldnames or [])
+                    if extra_column:
+                        fieldnames.append(extra_column)
+                    writer = csv.DictWriter(out, fieldnames=fieldnames)
+                    if not append:
+                        writer.writeheader()
+                for row in reader:
+                    if extra_column:
+                        row[extra_column] = tag
+                    writer.writerow(row)
+                    rows += 1
+    return rows
@@ -0,0 +1,351 @@
+"""SQLite results store and CSV/HTML report generation.
+
+Every session adds one run; every result row is stored with its run, chip,
+pin, test ID and timestamp, indexed for per-pin history queries::
+
+    pytest ic_test/tests --use-mock --results-db results.db
+
+    python -m ic_test.utils.results_db failures --db results.db --last 10
+    python -m ic_test.utils.results_db report --db results.db --out report/ --last 10
+"""
+import argparse
+import csv
+import html
+import re
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from .report import FIELDNAMES, result_rows
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id         INTEGER PRIMARY KEY,
+    uid        TEXT UNIQUE NOT NULL,
+    started    REAL NOT NULL,
+    finished   REAL,
+    host       TEXT,
+    args       TEXT,
+    exitstatus INTEGER
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id    INTEGER NOT NULL REFERENCES runs(id),
+    chip      TEXT NOT NULL,
+    pin       TEXT NOT NULL,
+    test_id   TEXT NOT NULL,
+    test_name TEXT,
+    expected  TEXT,
+    actual    TEXT,
+    result    TEXT NOT NULL,
+    ts        REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_pin ON results (chip, pin, test_id, run_id);
+CREATE INDEX IF NOT EXISTS results_test ON results (test_id, result, run_id);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id, result);
+"""
+
+
+class ResultsStore:
+    """Results database; safe to share between processes (WAL journal)."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # -- writing ---------------------------------------------------------------
+
+    def begin_run(self, uid: str | None = None, args: str = "") -> int:
+        """Register a run; calling again with the same *uid* returns its ID."""
+        uid = uid or uuid.uuid4().hex
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO runs (uid, started, host, args) VALUES (?, ?, ?, ?)",
+                (uid, time.time(), socket.gethostname(), args))
+        return self.conn.execute("SELECT id FROM runs WHERE uid = ?", (uid,)).fetchone()[0]
+
+    def end_run(self, run_id: int, exitstatus: int) -> None:
+        with self.conn:
+            self.conn.execute("UPDATE runs SET finished = ?, exitstatus = ? WHERE id = ?",
+                              (time.time(), int(exitstatus), run_id))
+
+    def insert(self, run_id: int, rows: list[tuple]) -> None:
+        """Insert ``(chip, pin, test_id, test_name, expected, actual, result, ts)``
+        rows in one transaction."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO results (run_id, chip, pin, test_id, test_name, expected, actual,"
+                " result, ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in rows])
+
+    # -- queries ---------------------------------------------------------------
+
+    def last_runs(self, n: int) -> list[int]:
+        """IDs of the *n* most recent runs, newest first."""
+        return [r[0] for r in self.conn.execute(
+            "SELECT id FROM runs ORDER BY id DESC LIMIT ?", (n,))]
+
+    def failures(self, runs: list[int], chip: str | None = None) -> list[tuple]:
+        """``(chip, pin, test_id, fails, executions, last_fail_ts)`` for every
+        (chip, pin, test) that failed or errored in *runs*, most first."""
+        marks = ",".join("?" * len(runs))
+        sql = ("SELECT chip, pin, test_id, SUM(result IN ('FAIL', 'ERROR')) AS fails,"
+               " COUNT(*), MAX(CASE WHEN result IN ('FAIL', 'ERROR') THEN ts END)"
+               f" FROM results WHERE run_id IN ({marks})")
+        params: list = list(runs)
+        if chip:
+            sql += " AND chip = ?"
+            params.append(chip)
+        sql += " GROUP BY chip, pin, test_id HAVING fails > 0 ORDER BY fails DESC, chip, pin, test_id"
+        return self.conn.execute(sql, params).fetchall()
+
+    def pin_history(self, chip: str, pin: str, test_id: str | None = None,
+                    last: int = 20) -> list[tuple]:
+        """``(run_id, test_id, expected, actual, result, ts)`` for one pin
+        over its *last* runs, newest first."""
+        sql = ("SELECT run_id, test_id, expected, actual, result, ts FROM results"
+               " WHERE chip = ? AND pin = ?")
+        params: list = [chip, pin]
+        if test_id:
+            sql += " AND test_id = ?"
+            params.append(test_id)
+        sql += (" AND run_id IN (SELECT DISTINCT run_id FROM results WHERE chip = ? AND pin = ?"
+                " ORDER BY run_id DESC LIMIT ?) ORDER BY run_id DESC, test_id")
+        params += [chip, pin, last]
+        return self.conn.execute(sql, params).fetchall()
+
+    def heatmap(self, runs: list[int]) -> list[tuple]:
+        """``(chip, pin, test_id, fails, executions)`` over *runs*."""
+        marks = ",".join("?" * len(runs))
+        return self.conn.execute(
+            "SELECT chip, pin, test_id, SUM(result IN ('FAIL', 'ERROR')), COUNT(*) FROM results"
+            f" WHERE run_id IN ({marks}) GROUP BY chip, pin, test_id", runs).fetchall()
+
+    def summary(self, runs: list[int]) -> dict[str, int]:
+        marks = ",".join("?" * len(runs))
+        counts = dict(self.conn.execute(
+            f"SELECT result, COUNT(*) FROM results WHERE run_id IN ({marks}) GROUP BY result",
+            runs).fetchall())
+        return {"total": sum(counts.values()), **counts}
+
+    def rows(self, runs: list[int]):
+        """Result rows of *runs* in FIELDNAMES order (timestamp as epoch)."""
+        marks = ",".join("?" * len(runs))
+        return self.conn.execute(
+            "SELECT chip, pin, test_id, test_name, expected, actual, result, ts FROM results"
+            f" WHERE run_id IN ({marks}) ORDER BY run_id, rowid", runs)
+
+
+class ResultsDbPlugin:
+    """Pytest plugin recording every result row into a ResultsStore.
+
+    Rows are buffered and inserted *batch_size* at a time, each batch in a
+    single transaction.  Reports are taken from ``pytest_runtest_logreport``,
+    so under pytest-xdist registering it on the controller alone records
+    every worker's results."""
+
+    def __init__(self, db_path: str, batch_size: int = 500):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.store: ResultsStore | None = None
+        self.run_id: int | None = None
+        self._pending: list[tuple] = []
+
+    def pytest_sessionstart(self, session):
+        self.store = ResultsStore(self.db_path)
+        self.run_id = self.store.begin_run(args=" ".join(session.config.invocation_params.args))
+
+    def pytest_runtest_logreport(self, report):
+        if report.when != "call":
+            return
+        ts = time.time()
+        props = report.user_properties
+        self._pending.extend((*row, ts) for row in result_rows(props, report.passed))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        if self.store is None:
+            return
+        self._flush()
+        self.store.end_run(self.run_id, exitstatus)
+        self.store.close()
+        self.store = None
+
+    def _flush(self) -> None:
+        if self._pending:
+            self.store.insert(self.run_id, self._pending)
+            self._pending = []
+
+
+# ---------------------------------------------------------------------------
+# Report generation
+# ---------------------------------------------------------------------------
+
+_HEATMAP_MAX_ROWS = 200  # larger families (register tables) only list failing rows
+
+
+def _natural_key(text: str):
+    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", text)]
+
+
+def _fmt_ts(ts: float | None) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) if ts else ""
+
+
+def write_csv_report(store: ResultsStore, runs: list[int], out_path: str | Path) -> int:
+    """Write the rows of *runs* as a CsvReportPlugin-format CSV; return the row count."""
+    count = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
+        for row in store.rows(runs):
+            writer.writerow([*row[:-1], _fmt_ts(row[-1])])
+            count += 1
+    return count
+
+
+def _cell_style(fails: int, total: int) -> str:
+    if not total:
+        return "background:#eee"
+    if not fails:
+        return "background:#8c8"
+    # Light to dark red with the failure ratio
+    lightness = 85 - int(45 * fails / total)
+    return f"background:hsl(0,70%,{lightness}%)"
+
+
+def _heatmap_html(cells: list[tuple]) -> str:
+    """One pin-by-test table per chip and test family (G, R, ...)."""
+    groups: dict[tuple[str, str], dict[str, dict[str, tuple[int, int]]]] = {}
+    for chip, pin, test_id, fails, total in cells:
+        family = test_id.split("-")[0]
+        groups.setdefault((chip, family), {}).setdefault(pin, {})[test_id] = (fails, total)
+
+    parts = []
+    for (chip, family), pins in sorted(groups.items()):
+        tests = sorted({t for by_test in pins.values() for t in by_test}, key=_natural_key)
+        rows = sorted(pins, key=_natural_key)
+        note = ""
+        if len(rows) > _HEATMAP_MAX_ROWS:
+            failing = [p for p in rows if any(f for f, _ in pins[p].values())]
+            note = (f"<p>{len(rows)} rows; showing the {len(failing)} with failures.</p>")
+            rows = failing
+        head = "".join(f"<th>{html.escape(t)}</th>" for t in tests)
+        body = []
+        for pin in rows:
+            tds = []
+            for t in tests:
+                fails, total = pins[pin].get(t, (0, 0))
+                label = f"{fails}/{total}" if fails else ""
+                tds.append(f'<td style="{_cell_style(fails, total)}" '
+                           f'title="{html.escape(pin)} {t}: {fails} of {total} failed">{label}</td>')
+            body.append(f"<tr><th>{html.escape(pin)}</th>{''.join(tds)}</tr>")
+        parts.append(f"<h3>{html.escape(chip)} &middot; {html.escape(family)}</h3>{note}"
+                     f"<table class=heat><tr><th>pin</th>{head}</tr>{''.join(body)}</table>")
+    return "\n".join(parts)
+
+
+def write_html_report(store: ResultsStore, runs: list[int], out_path: str | Path) -> None:
+    """Write a self-contained HTML report: summary, failures, heatmaps."""
+    summary = store.summary(runs)
+    total = summary["total"]
+    passed = summary.get("PASS", 0)
+    rate = f"{100 * passed / total:.2f}%" if total else "-"
+    failures = store.failures(runs)
+
+    fail_rows = "".join(
+        f"<tr><td>{html.escape(chip)}</td><td>{html.escape(pin)}</td><td>{html.escape(test_id)}</td>"
+        f"<td>{fails}/{count}</td><td>{_fmt_ts(last)}</td></tr>"
+        for chip, pin, test_id, fails, count, last in failures)
+
+    doc = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>IC test report</title>
+<style>
+body {{ font-family: sans-serif; margin: 1em 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 1em; }}
+td, th {{ border: 1px solid #ccc; padding: 2px 6px; font-size: 12px; }}
+table.heat td {{ min-width: 2.5em; text-align: center; }}
+</style></head><body>
+<h1>IC test report</h1>
+<p>Runs: {", ".join(map(str, sorted(runs)))}</p>
+<h2>Summary</h2>
+<table>
+<tr><th>Total</th><th>Pass</th><th>Fail</th><th>Error</th><th>Pass rate</th></tr>
+<tr><td>{total}</td><td>{passed}</td><td>{summary.get("FAIL", 0)}</td><td>{summary.get("ERROR", 0)}</td><td>{rate}</td></tr>
+</table>
+<h2>Failures ({len(failures)})</h2>
+<table><tr><th>Chip</th><th>Pin</th><th>Test</th><th>Failed</th><th>Last failure</th></tr>
+{fail_rows}</table>
+<h2>Pin &times; test heatmap</h2>
+{_heatmap_html(store.heatmap(runs))}
+</body></html>
+"""
+    Path(out_path).write_text(doc, encoding="utf-8")
+
+
+def generate_reports(db_path: str | Path, out_dir: str | Path, last: int = 1) -> tuple[Path, Path]:
+    """Write report.csv and report.html for the *last* runs into *out_dir*."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    store = ResultsStore(db_path)
+    try:
+        runs = store.last_runs(last)
+        if not runs:
+            raise ValueError(f"{db_path}: no runs recorded")
+        csv_path, html_path = out_dir / "report.csv", out_dir / "report.html"
+        # CSV rows are per execution, so only the newest run goes there
+        write_csv_report(store, runs[:1], csv_path)
+        write_html_report(store, runs, html_path)
+    finally:
+        store.close()
+    return csv_path, html_path
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the results store and build reports")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_fail = sub.add_parser("failures", help="Pins/tests that failed in the last N runs")
+    p_fail.add_argument("--chip", default=None)
+    p_hist = sub.add_parser("history", help="Results of one pin across runs")
+    p_hist.add_argument("--chip", required=True)
+    p_hist.add_argument("--pin", required=True)
+    p_hist.add_argument("--test-id", default=None)
+    p_rep = sub.add_parser("report", help="Generate report.csv and report.html")
+    p_rep.add_argument("--out", required=True, help="Output directory")
+    for p in (p_fail, p_hist, p_rep):
+        p.add_argument("--db", required=True, help="Results database")
+        p.add_argument("--last", type=int, default=10, help="Number of most recent runs")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "report":
+        csv_path, html_path = generate_reports(args.db, args.out, args.last)
+        print(f"wrote {csv_path} and {html_path}")
+        return 0
+
+    store = ResultsStore(args.db)
+    try:
+        if args.cmd == "failures":
+            for chip, pin, test_id, fails, count, last in store.failures(
+                    store.last_runs(args.last), args.chip):
+                print(f"{chip:6s} {pin:14s} {test_id:6s} {fails}/{count} failed, last {_fmt_ts(last)}")
+        else:
+            for run_id, test_id, expected, actual, result, ts in store.pin_history(
+                    args.chip, args.pin, args.test_id, args.last):
+                print(f"run {run_id:4d} {test_id:6s} {result:4s} expected={expected} "
+                      f"actual={actual} {_fmt_ts(ts)}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""Long-duration stability monitor (test plan chapter 16, LT-01 ~ LT-08).
+
+The firmware under test keeps per-peripheral counters (packets and errors)
+in a stats block; the monitor reads that block from every chip on a fixed
+schedule and keeps:
+
+* per chip and peripheral, running totals and the error rate, updated
+  incrementally from the counter deltas of each poll;
+* a ring buffer of the last ``ring_size`` raw samples;
+* the error time distribution: a fixed number of time bins whose width
+  doubles whenever the run outgrows them, plus the most recent error
+  events with their timestamps.
+
+Everything is bounded, so memory stays flat however long the run is.  The
+state is checkpointed to a JSON file, and a monitor created with an
+existing checkpoint resumes counting where the previous session stopped.
+"""
+import asyncio
+import json
+import os
+import struct
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from ..drivers.async_chip import AsyncChipInterface
+from .reg_parser import RESULT_TYPES, ResultRegion
+
+DEFAULT_PERIPHS = ("uart", "spi", "i2c")
+
+_CHECKPOINT_VERSION = 1
+
+
+class CounterLayout:
+    """Default stats block: for each peripheral, a little-endian u32
+    transfer count followed by a u32 error count."""
+
+    def __init__(self, periphs=DEFAULT_PERIPHS, fmt: str | None = None):
+        self.periphs = tuple(periphs)
+        self._struct = struct.Struct(fmt or "<" + "II" * len(self.periphs))
+        self.size = self._struct.size
+
+    @classmethod
+    def from_region(cls, region: ResultRegion) -> "CounterLayout":
+        """Counters of a schema region (``config/results``): every struct
+        member with ``total`` and ``errors`` fields is a peripheral.  Only
+        the bytes up to the last counter are read."""
+        by_name = {f.name: f for f in region.fields}
+        groups = dict.fromkeys(f.name.rpartition(".")[0] for f in region.fields)
+        pairs = sorted(((by_name[f"{p}.total"], by_name[f"{p}.errors"]) for p in groups
+                        if f"{p}.total" in by_name and f"{p}.errors" in by_name),
+                       key=lambda pair: pair[0].offset)
+        fmt, pos = "<" if region.endian == "little" else ">", 0
+        periphs = []
+        for total, errors in pairs:
+            for f in (total, errors):
+                fmt += f"{f.offset - pos}x{RESULT_TYPES[f.type]}"
+                pos = f.offset + struct.calcsize("<" + RESULT_TYPES[f.type])
+            periphs.append(total.name.rpartition(".")[0])
+        return cls(periphs, fmt)
+
+    def decode(self, data: bytes) -> dict[str, tuple[int, int]]:
+        """Map peripheral -> (total, errors)."""
+        values = self._struct.unpack_from(data)
+        return {p: (values[2 * i], values[2 * i + 1]) for i, p in enumerate(self.periphs)}
+
+
+def _delta(new: int, last: int | None) -> int:
+    """Counter increase since the last poll.  A counter that went down
+    means the firmware restarted and counts from zero again."""
+    if last is None or new < last:
+        return new
+    return new - last
+
+
+@dataclass
+class ChannelStats:
+    """Running totals of one peripheral on one chip."""
+    total: int = 0
+    errors: int = 0
+    last_total: int | None = None   # raw firmware counters at the last poll
+    last_errors: int | None = None
+    first_error_at: float | None = None  # seconds since the start of the run
+    last_error_at: float | None = None
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.total if self.total else 0.0
+
+    def update(self, raw_total: int, raw_errors: int, elapsed: float) -> int:
+        """Fold in one poll; return the number of new errors."""
+        self.total += _delta(raw_total, self.last_total)
+        new_errors = _delta(raw_errors, self.last_errors)
+        self.last_total, self.last_errors = raw_total, raw_errors
+        if new_errors:
+            self.errors += new_errors
+            if self.first_error_at is None:
+                self.first_error_at = elapsed
+            self.last_error_at = elapsed
+        return new_errors
+
+
+class ErrorHistogram:
+    """Error counts over run time in *n_bins* bins.  When the run passes
+    the last bin, adjacent bins are merged and the width doubles."""
+
+    def __init__(self, n_bins: int = 256, bin_width: float = 60.0):
+        self.bin_width = bin_width
+        self.bins = [0] * n_bins
+
+    def add(self, elapsed: float, count: int) -> None:
+        n = len(self.bins)
+        while elapsed >= n * self.bin_width:
+            merged = [self.bins[i] + self.bins[i + 1] for i in range(0, n - 1, 2)]
+            self.bins = merged + [0] * (n - len(merged))
+            self.bin_width *= 2
+        self.bins[int(elapsed // self.bin_width)] += count
+
+    def buckets(self) -> list[tuple[float, float, int]]:
+        """Non-empty bins as (start, end, errors), in seconds."""
+        w = self.bin_width
+        return [(i * w, (i + 1) * w, c) for i, c in enumerate(self.bins) if c]
+
+
+class Sample(NamedTuple):
+    """One poll: raw (total, errors) per channel, in ``channels`` order."""
+    elapsed: float
+    counters: tuple[int, ...]
+
+
+class ErrorEvent(NamedTuple):
+    elapsed: float
+    chip: str
+    periph: str
+    count: int
+
+
+@dataclass
+class MonitorResult:
+    elapsed: float
+    polls: int
+    channels: dict[tuple[str, str], ChannelStats]
+    aborted: bool = False
+    reason: str = ""
+    error_distribution: list[tuple[float, float, int]] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.aborted and all(s.errors == 0 for s in self.channels.values())
+
+    def rows(self, test_id: str, test_name: str) -> list[dict]:
+        """One CSV row per chip and peripheral, in ``pin_results`` format."""
+        return [{
+            "chip": chip,
+            "pin": periph,
+            "test_id": test_id,
+            "test_name": test_name,
+            "expected": "errors=0",
+            "actual": f"errors={s.errors}/{s.total} ({s.error_rate:.2e})",
+            "result": "PASS" if s.errors == 0 else "FAIL",
+        } for (chip, periph), s in self.channels.items()]
+
+
+class StabilityMonitor:
+    """Poll the stats block of several chips on a fixed schedule.
+
+    *chips* maps a chip name to its AsyncChipInterface; all chips are read
+    concurrently at each poll.  The run stops early when any channel has
+    more than *error_threshold* errors or an error rate above
+    *max_error_rate*.  *progress*, if given, is called with a one-line
+    status after every poll."""
+
+    def __init__(self, chips: dict[str, AsyncChipInterface], stats_addr: int,
+                 layout: CounterLayout | None = None, interval: float = 10.0,
+                 error_threshold: int | None = None, max_error_rate: float | None = None,
+                 ring_size: int = 1024, max_events: int = 1000,
+                 checkpoint: str | Path | None = None, checkpoint_interval: float = 60.0,
+                 progress: Callable[[str], None] | None = None):
+        self.chips = chips
+        self.stats_addr = stats_addr
+        self.layout = layout or CounterLayout()
+        self.interval = interval
+        self.error_threshold = error_threshold
+        self.max_error_rate = max_error_rate
+        self.checkpoint_path = Path(checkpoint) if checkpoint else None
+        self.checkpoint_interval = checkpoint_interval
+        self.progress = progress
+
+        self.channels = {(chip, p): ChannelStats() for chip in chips for p in self.layout.periphs}
+        self.samples: deque[Sample] = deque(maxlen=ring_size)
+        self.events: deque[ErrorEvent] = deque(maxlen=max_events)
+        self.histogram = ErrorHistogram()
+        self.elapsed = 0.0   # run time so far, including resumed sessions
+        self.polls = 0
+        self.resumed = False
+        if self.checkpoint_path is not None and self.checkpoint_path.exists():
+            self.load_checkpoint()
+
+    # -- polling ---------------------------------------------------------------
+
+    async def poll(self) -> Sample:
+        """Read every chip's stats block once and update the statistics."""
+        names = list(self.chips)
+        blocks = await asyncio.gather(
+            *(self.chips[n].mem_read(self.stats_addr, self.layout.size) for n in names))
+        counters = []
+        for chip, block in zip(names, blocks):
+            for periph, (total, errors) in self.layout.decode(block).items():
+                counters += (total, errors)
+                new_errors = self.channels[chip, periph].update(total, errors, self.elapsed)
+                if new_errors:
+                    self.histogram.add(self.elapsed, new_errors)
+                    self.events.append(ErrorEvent(self.elapsed, chip, periph, new_errors))
+        sample = Sample(self.elapsed, tuple(counters))
+        self.samples.append(sample)
+        self.polls += 1
+        return sample
+
+    def abort_reason(self) -> str:
+        """Why the run should stop now, or "" to continue."""
+        for (chip, periph), s in self.channels.items():
+            if self.error_threshold is not None and s.errors > self.error_threshold:
+                return f"{chip} {periph}: {s.errors} errors > threshold {self.error_threshold}"
+            if self.max_error_rate is not None and s.error_rate > self.max_error_rate:
+                return (f"{chip} {periph}: error rate {s.error_rate:.2e} "
+                        f"> {self.max_error_rate:.2e}")
+        return ""
+
+    def status_line(self) -> str:
+        parts = [f"{chip} {periph.upper()}: {s.total} pkts, {s.errors} errs"
+                 for (chip, periph), s in self.channels.items()]
+        return f"[{self.elapsed:.0f}s] " + " | ".join(parts)
+
+    async def run(self, duration: float) -> MonitorResult:
+        """Poll until the total run time reaches *duration* seconds (counting
+        any resumed sessions) or an abort condition is met."""
+        loop = asyncio.get_running_loop()
+        start, base = loop.time(), self.elapsed
+        next_checkpoint = start + self.checkpoint_interval
+        slot = 0
+        while True:
+            self.elapsed = base + loop.time() - start
+            await self.poll()
+            if self.progress is not None:
+                self.progress(self.status_line())
+            reason = self.abort_reason()
+            if reason or self.elapsed >= duration:
+                break
+            if self.checkpoint_path is not None and loop.time() >= next_checkpoint:
+                self.save_checkpoint()
+                next_checkpoint += self.checkpoint_interval
+            # Fixed schedule: slow reads do not push later polls back
+            slot += 1
+            wait = start + slot * self.interval - loop.time()
+            await asyncio.sleep(max(0.0, min(wait, duration - self.elapsed)))
+        if self.checkpoint_path is not None:
+            self.save_checkpoint()
+        return MonitorResult(self.elapsed, self.polls, self.channels, aborted=bool(reason),
+                             reason=reason, error_distribution=self.histogram.buckets())
+
+    # -- checkpoints -----------------------------------------------------------
+
+    def save_checkpoint(self) -> None:
+        """Write the monitor state atomically to the checkpoint file."""
+        state = {
+            "version": _CHECKPOINT_VERSION,
+            "stats_addr": self.stats_addr,
+            "periphs": list(self.layout.periphs),
+            "elapsed": self.elapsed,
+            "polls": self.polls,
+            "channels": [[chip, periph, asdict(s)] for (chip, periph), s in self.channels.items()],
+            "histogram": {"bin_width": self.histogram.bin_width, "bins": self.histogram.bins},
+            "events": [list(e) for e in self.events],
+            "samples": [[s.elapsed, list(s.counters)] for s in self.samples],
+        }
+        path = self.checkpoint_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def load_checkpoint(self) -> None:
+        """Restore the state saved by ``save_checkpoint``."""
+        state = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+        if state.get("version") != _CHECKPOINT_VERSION:
+            raise ValueError(f"{self.checkpoint_path}: unsupported checkpoint version")
+        if state["stats_addr"] != self.stats_addr or tuple(state["periphs"]) != self.layout.periphs:
+            raise ValueError(f"{self.checkpoint_path}: checkpoint is for a different stats layout")
+        self.elapsed = state["elapsed"]
+        self.polls = state["polls"]
+        for chip, periph, values in state["channels"]:
+            if (chip, periph) in self.channels:
+                self.channels[chip, periph] = ChannelStats(**values)
+        self.histogram.bin_width = state["histogram"]["bin_width"]
+        self.histogram.bins = state["histogram"]["bins"]
+        self.events.extend(ErrorEvent(*e) for e in state["events"])
+        self.samples.extend(Sample(t, tuple(c)) for t, c in state["samples"])
+        self.resumed = True